@@ -0,0 +1,418 @@
+import os
+import time
+import asyncio
+import logging
+import aiohttp
+import http_session
+import domain_probe
+import dns_filter
+import page_reader
+import page_cache
+import hit_stats
+import deadline
+import metrics
+import tracing
+from scraper_parsing import (
+    CONTACT_PAGES, DIRECT_GUESS_TLDS, BUSINESS_SUBDOMAINS, clean_company_name,
+    extract_emails_from_html, prioritize_emails, build_search_engines, generate_direct_website_guesses,
+    extract_business_urls_from_search, is_valid_business_url, guess_email_format,
+    extract_contact_links, subdomain_base, build_social_platforms,
+    extract_social_media_urls, extract_email_from_social_text,
+    guessed_tld, contact_path_of, strategy_of
+)
+
+logger = logging.getLogger(__name__)
+
+# Companies processed at the same time
+COMPANY_CONCURRENCY = int(os.environ.get('SCRAPER_CONCURRENCY', 20))
+# Open connections across all hosts / to a single host
+CONNECTION_LIMIT = int(os.environ.get('SCRAPER_CONNECTION_LIMIT', 100))
+CONNECTION_LIMIT_PER_HOST = int(os.environ.get('SCRAPER_CONNECTION_LIMIT_PER_HOST', http_session.POOL_PER_HOST))
+
+
+class AsyncEmailFinder:
+    """Async version of the find_company_email strategy ladder"""
+
+    def __init__(self, session):
+        self.session = session
+
+    async def fetch_text(self, url, timeout=5):
+        """GET a page (through the page cache) and return its size-capped text, raising on HTTP errors"""
+        page = await page_reader.fetch_page_async(self.session, url, timeout=timeout)
+        page.raise_for_status()
+        return page.text
+
+    async def fetch_page_text(self, url, timeout=5):
+        """Page body as text (size-capped), or None if it can't be fetched"""
+        try:
+            return await self.fetch_text(url, timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Error fetching {url}: {str(e)}")
+            return None
+
+    async def website_exists(self, url):
+        """Quickly test if a website exists and is accessible"""
+        try:
+            page = await page_reader.fetch_head_async(self.session, url, timeout=3)
+            return page.status in [200, 301, 302, 403]  # 403 might still have contact info
+        except Exception:
+            return False
+
+    async def find_emails_on_page(self, url, timeout=5):
+        """Enhanced email extraction from webpages with better filtering"""
+        try:
+            # Capped, text-only, stops at the site's own info@/sales@/wholesale@; served from the page cache if seen
+            return prioritize_emails(await page_reader.fetch_page_emails_async(self.session, url, timeout=timeout))
+        except asyncio.TimeoutError:
+            logger.warning(f"Timeout fetching {url}")
+            return []
+        except Exception as e:
+            logger.warning(f"Error fetching {url}: {str(e)}")
+            return []
+
+    async def guessed_website_exists(self, url):
+        """website_exists for a direct guess, counted toward the TLD hit rates"""
+        exists = await self.website_exists(url)
+        tld = guessed_tld(url)
+        # Probes cut short by the time budget say nothing about the TLD
+        if tld and not deadline.expired():
+            hit_stats.record('tld', tld, exists)
+        return exists
+
+    async def search_company_website(self, company_name):
+        """Enhanced multi-strategy website search with direct guessing and fallbacks"""
+        try:
+            if not company_name:
+                return None
+
+            clean_name = clean_company_name(company_name)
+            if not clean_name:
+                return None
+
+            # Strategy 1: Direct Website Guessing (Most Reliable)
+            # Drop guesses whose domain doesn't resolve before any HTTP probe
+            # TLDs are tried in the order that has found sites most often
+            with metrics.stage('direct_guess'):
+                direct_urls = await dns_filter.filter_resolvable_async(
+                    generate_direct_website_guesses(clean_name, tlds=hit_stats.ranked('tld', DIRECT_GUESS_TLDS))
+                )
+                url = await domain_probe.first_success_async(direct_urls, self.guessed_website_exists)
+            if url:
+                logger.info(f"Found via direct guess: {url}")
+                return url
+
+            # Strategy 2: Simplified Search Engines
+            with metrics.stage('search_engines'):
+                for engine in build_search_engines(clean_name):
+                    try:
+                        html = await self.fetch_text(engine['url'], timeout=engine['timeout'])
+                        urls = extract_business_urls_from_search(html, clean_name)
+                        for url in urls[:3]:  # Check top 3 results
+                            if is_valid_business_url(url):
+                                logger.info(f"Found via {engine['name']}: {url}")
+                                return url
+                    except Exception as e:
+                        logger.warning(f"{engine['name']} search failed: {str(e)}")
+                        continue
+
+            logger.info(f"No website found for {clean_name}")
+            return None
+
+        except Exception as e:
+            logger.error(f"Error searching for {company_name}: {str(e)}")
+            return None
+
+    async def find_contact_links(self, website_url, homepage_html=None):
+        """Dynamically find contact page links from homepage (pass the HTML if it was already fetched)"""
+        try:
+            if homepage_html is None:
+                homepage_html = await self.fetch_page_text(website_url)
+            return extract_contact_links(homepage_html or '', website_url)
+        except Exception as e:
+            logger.warning(f"Error finding contact links on {website_url}: {str(e)}")
+            return []
+
+    async def check_subdomains_for_emails(self, main_website, company_name):
+        """Check common business subdomains for contact emails"""
+        try:
+            base_domain = subdomain_base(main_website)
+
+            subdomain_urls = await dns_filter.filter_resolvable_async(
+                [f"https://{subdomain}.{base_domain}" for subdomain in BUSINESS_SUBDOMAINS]
+            )
+
+            for subdomain_url in subdomain_urls:
+                if await self.website_exists(subdomain_url):
+                    emails = await self.find_emails_on_page(subdomain_url)
+                    if emails:
+                        logger.info(f"Found email on subdomain for {company_name}: {emails[0]}")
+                        return emails[0], subdomain_url
+
+            return None
+
+        except Exception as e:
+            logger.warning(f"Error checking subdomains: {str(e)}")
+            return None
+
+    async def extract_email_from_social_profile(self, profile_url, platform_name):
+        """Extract email from individual social media profile"""
+        try:
+            text = await self.fetch_text(profile_url, timeout=5)
+            return extract_email_from_social_text(text)
+        except Exception as e:
+            logger.warning(f"Error extracting from {platform_name} profile {profile_url}: {str(e)}")
+            return None
+
+    async def extract_email_from_social_media(self, company_name):
+        """Extract emails from social media profiles (Instagram, Facebook, LinkedIn, Twitter)"""
+        try:
+            logger.info(f"Checking social media for {company_name}")
+
+            clean_name = clean_company_name(company_name)
+            if not clean_name:
+                return None
+
+            for platform in build_social_platforms(clean_name):
+                try:
+                    html = await self.fetch_text(platform['search_url'], timeout=platform['timeout'])
+                    profile_urls = extract_social_media_urls(html, platform['profile_indicators'], clean_name)
+
+                    for profile_url in profile_urls[:2]:  # Check top 2 profiles per platform
+                        email = await self.extract_email_from_social_profile(profile_url, platform['name'])
+                        if email:
+                            logger.info(f"Found email on {platform['name']} for {company_name}: {email}")
+                            return email, f"{platform['name']} profile"
+
+                except Exception as e:
+                    logger.warning(f"Error searching {platform['name']}: {str(e)}")
+                    continue
+
+            return None
+
+        except Exception as e:
+            logger.warning(f"Error in social media extraction: {str(e)}")
+            return None
+
+    async def find_company_email(self, company_name):
+        """Find email for a company - same ladder and source strings as the sync version"""
+        result = await self.find_company_result(company_name)
+        return result['email'], result['source']
+
+    async def find_company_result(self, company_name):
+        """Run the full ladder for one company; returns {'email', 'source', 'website'}"""
+        result = {'email': None, 'source': None, 'website': None}
+        try:
+            if not company_name:
+                return result
+
+            logger.info(f"Searching for emails for: {company_name}")
+
+            website = await self.search_company_website(company_name)
+            if not website:
+                # Falls through to the cut-off check: the search may have run out of time
+                logger.info(f"No website found for {company_name}")
+                result['source'] = f"No website found"
+            else:
+                logger.info(f"Found website for {company_name}: {website}")
+                result['website'] = website
+                result['email'], result['source'] = await self.find_email_on_website(company_name, website)
+
+        except Exception as e:
+            logger.error(f"Error finding email for {company_name}: {str(e)}")
+            result['source'] = f"Error: {str(e)}"
+
+        if not result['email'] and deadline.expired():
+            # Not a real "not found": the ladder stopped when the company's budget ran out
+            result['source'] = deadline.cut_off_source(deadline.current().budget)
+        else:
+            hit_stats.record('strategy', strategy_of(result['source'] if result['email'] else None), bool(result['email']))
+        return result
+
+    async def find_email_on_site_pages(self, website):
+        """Homepage, contact paths and homepage contact links, fetched speculatively.
+
+        The first wave fetches the homepage and the top contact paths at once; the contact links
+        found on the homepage start as soon as it arrives. Results are taken in priority order
+        (homepage, first-wave paths, homepage links, remaining paths) and outstanding fetches
+        are cancelled once a winner is known. Returns (email, source) or None.
+        """
+        # Contact paths in the order that has produced emails most often
+        contact_urls = [website.rstrip('/') + page for page in hit_stats.ranked('contact_path', CONTACT_PAGES)]
+        first_paths = contact_urls[:domain_probe.FIRST_WAVE_CONTACT_PAGES]
+
+        async def find_emails_on_contact_path(url):
+            emails = await self.find_emails_on_page(url)
+            if not deadline.expired():
+                hit_stats.record('contact_path', contact_path_of(url, website), bool(emails))
+            return emails
+
+        homepage_task = asyncio.ensure_future(self.fetch_page_text(website))
+        paths_task = asyncio.ensure_future(
+            domain_probe.first_result_async(first_paths, find_emails_on_contact_path, wave_size=len(first_paths) or 1)
+        )
+        tasks = [homepage_task, paths_task]
+        try:
+            homepage_html = await homepage_task
+            emails = extract_emails_from_html(homepage_html or '')
+            if emails:
+                return emails[0], f"Main page: {website}"
+
+            # Links already covered by the first-wave paths aren't fetched twice
+            in_first_wave = {page_cache.normalize_url(url) for url in first_paths}
+            contact_links = [
+                link for link in await self.find_contact_links(website, homepage_html or '')
+                if page_cache.normalize_url(link) not in in_first_wave
+            ]
+            links_task = asyncio.ensure_future(
+                domain_probe.first_result_async(contact_links, self.find_emails_on_page, wave_size=len(contact_links) or 1)
+            )
+            tasks.append(links_task)
+
+            found = await paths_task
+            if found:
+                return found[1][0], f"Contact page: {found[0]}"
+
+            found = await links_task
+            if found:
+                return found[1][0], f"Dynamic contact page: {found[0]}"
+        finally:
+            await domain_probe.cancel_pending(tasks)
+
+        # Second wave: the remaining contact paths, still read in list order
+        found = await domain_probe.first_result_async(
+            contact_urls[len(first_paths):], find_emails_on_contact_path,
+            wave_size=domain_probe.FIRST_WAVE_CONTACT_PAGES
+        )
+        if found:
+            return found[1][0], f"Contact page: {found[0]}"
+        return None
+
+    async def find_email_on_website(self, company_name, website):
+        """Email ladder once the website is known: site pages, guess, subdomains, social"""
+        try:
+            with metrics.stage('site_pages'):
+                found = await self.find_email_on_site_pages(website)
+            if found:
+                email, source = found
+                logger.info(f"Found email for {company_name}: {email} ({source})")
+                return email, source
+
+            logger.info(f"No emails found for {company_name} on {website}")
+
+            # Strategy 3: Email format guessing if website found but no emails
+            with metrics.stage('email_guess'):
+                guessed_email = guess_email_format(company_name, website)
+            if guessed_email:
+                logger.info(f"Guessed email format for {company_name}: {guessed_email}")
+                return guessed_email, f"Email format guess: {website}"
+
+            # Strategy 5: Subdomain checking
+            with metrics.stage('subdomains'):
+                subdomain_email = await self.check_subdomains_for_emails(website, company_name)
+            if subdomain_email:
+                return subdomain_email[0], f"Subdomain: {subdomain_email[1]}"
+
+            # Strategy 6: Social Media Email Extraction
+            with metrics.stage('social_media'):
+                social_email = await self.extract_email_from_social_media(company_name)
+            if social_email:
+                return social_email[0], f"Social media: {social_email[1]}"
+
+            return None, f"No emails found on {website}"
+
+        except Exception as e:
+            logger.error(f"Error finding email for {company_name}: {str(e)}")
+            return None, f"Error: {str(e)}"
+
+
+# Builds the connector of each client session (mock_web.routed swaps in the mock web's)
+_connector_factory = aiohttp.TCPConnector
+
+
+def set_connector_factory(factory):
+    """Build client session connectors with factory(**TCPConnector options) (None = aiohttp's)"""
+    global _connector_factory
+    _connector_factory = factory or aiohttp.TCPConnector
+
+
+def create_client_session():
+    """aiohttp session with pooled keep-alive connections and shared headers"""
+    connector = _connector_factory(
+        limit=CONNECTION_LIMIT,
+        limit_per_host=CONNECTION_LIMIT_PER_HOST,
+        ttl_dns_cache=300
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=http_session.DEFAULT_HEADERS,
+        # Fills in DNS and connect times of traced requests
+        trace_configs=[tracing.aiohttp_trace_config()]
+    )
+
+
+async def find_emails_for_companies(company_names, concurrency=None, on_result=None, job_budget=None, trace_path=None):
+    """Run the ladder for many companies at once.
+
+    Returns {'email', 'source', 'website', 'elapsed'} dicts in the same order as company_names.
+    on_result(index, company_name, result) is called as each company finishes.
+    Each company runs under a time budget handed out by a deadline.JobBudget (job_budget
+    seconds for the whole batch, JOB_TIME_BUDGET by default); companies the budget can't
+    cover are reported as cut off without being searched.
+    With trace_path, each company's trace (requests, timings, stages) is stored there.
+    """
+    concurrency = concurrency or COMPANY_CONCURRENCY
+    semaphore = asyncio.Semaphore(concurrency)
+    budget = deadline.JobBudget(len(company_names), concurrency, seconds=job_budget)
+    traces = tracing.TraceStore(trace_path) if trace_path else None
+
+    async with create_client_session() as session:
+        finder = AsyncEmailFinder(session)
+
+        # One page cache per company, or one for the whole batch (PAGE_CACHE_SCOPE=job)
+        job_cache = page_cache.PageCache() if page_cache.PAGE_CACHE_SCOPE == 'job' else None
+
+        async def process(index, company_name):
+            async with semaphore:
+                started = time.monotonic()
+                company_budget = budget.next_company_budget()
+                with tracing.scope(company_name) as trace:
+                    if company_budget is None:
+                        result = {'email': None, 'source': deadline.cut_off_source(0), 'website': None}
+                    else:
+                        with page_cache.scope(job_cache), deadline.scope(company_budget):
+                            try:
+                                # Backstop for time spent outside fetches (queueing on busy hosts, parsing)
+                                result = await asyncio.wait_for(
+                                    finder.find_company_result(company_name),
+                                    timeout=company_budget + 1 if company_budget else None
+                                )
+                            except asyncio.TimeoutError:
+                                result = {'email': None, 'source': deadline.cut_off_source(company_budget), 'website': None}
+                result['elapsed'] = round(time.monotonic() - started, 3)
+            if deadline.is_cut_off(result['source']):
+                strategy = 'cut_off'
+            else:
+                strategy = strategy_of(result['source']) if result['email'] else 'not_found'
+            metrics.record_company(strategy, result['elapsed'])
+            if traces is not None and trace is not None:
+                traces.save(trace, result, strategy)
+            if on_result:
+                try:
+                    on_result(index, company_name, result)
+                except Exception as e:
+                    logger.warning(f"Result callback failed for {company_name}: {str(e)}")
+            return result
+
+        try:
+            return await asyncio.gather(*(process(i, name) for i, name in enumerate(company_names)))
+        finally:
+            if traces is not None:
+                # The last batch of traces is written off the event loop too
+                await asyncio.get_running_loop().run_in_executor(None, traces.close)
+
+
+def run_companies(company_names, concurrency=None, on_result=None, job_budget=None, trace_path=None):
+    """Blocking entry point for Flask routes and scripts"""
+    return asyncio.run(find_emails_for_companies(
+        company_names, concurrency=concurrency, on_result=on_result, job_budget=job_budget, trace_path=trace_path
+    ))
@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import argparse
+import tempfile
+import resource
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+import deadline
+import mock_web
+
+logger = logging.getLogger(__name__)
+
+# Engine profiles benchmarked (scraper_engine.profiles), and 'async' for the aiohttp engine
+# (async_engine) of the accurate app's uploads
+SCRAPERS = ('fast', 'accurate', 'exhaustive', 'async')
+
+
+def _run_scraper(scraper, companies, records, port, concurrency, pacing, verbose, results):
+    """Process entry point: search every company with one profile against the mock web"""
+    logging.basicConfig(level=logging.INFO if verbose else logging.WARNING)
+    try:
+        import scraper_engine
+        import async_engine
+        find = scraper_engine.Pipeline(scraper).find_email if scraper != 'async' else None
+        # A log line per company (or per tripped breaker) skews the timings
+        if not verbose:
+            logging.getLogger().setLevel(logging.ERROR)
+        if not pacing:
+            import host_scheduler
+            host_scheduler.set_scheduler(host_scheduler.HostScheduler(min_interval=0, budgets={}))
+
+        def timed(company):
+            started = time.monotonic()
+            try:
+                email, source = find(company)
+            except Exception as e:
+                email, source = None, f"Error: {str(e)}"
+            return company, email, source, time.monotonic() - started
+
+        with mock_web.routed(records, port) as adapter:
+            started = time.monotonic()
+            if find is None:
+                results_async = async_engine.run_companies(companies, concurrency=concurrency)
+                rows = [(company, result['email'], result['source'], result['elapsed'])
+                        for company, result in zip(companies, results_async)]
+            else:
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    rows = list(executor.map(timed, companies))
+            wall = time.monotonic() - started
+
+        results.put({
+            'rows': rows,
+            'wall': wall,
+            'requests': adapter.sent,
+            # Kilobytes on Linux; the high-water mark of this process only (imports included)
+            'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        })
+    except Exception as e:
+        results.put({'error': f"{type(e).__name__}: {str(e)}"})
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(scraper, run, sites, served):
+    """Metrics of one scraper run, scored against what each site actually publishes"""
+    expected = {site.company: site for site in sites}
+    rows = run['rows']
+    latencies = [seconds for _, _, _, seconds in rows]
+    found = [(company, email) for company, email, _, _ in rows if email]
+    correct = sum(1 for company, email in found if email.lower() == (expected[company].email or '').lower())
+    return {
+        'scraper': scraper,
+        'companies': len(rows),
+        'seconds': round(run['wall'], 2),
+        'companies_per_sec': round(len(rows) / run['wall'], 3) if run['wall'] else None,
+        'found': len(found),
+        'correct': correct,
+        'reachable': sum(1 for site in sites if site.reachable_email),
+        'cut_off': sum(1 for _, _, source, _ in rows if deadline.is_cut_off(source)),
+        'requests': run['requests'],
+        'requests_served': served,
+        'requests_per_found_email': round(run['requests'] / len(found), 2) if found else None,
+        'p50_seconds': round(percentile(latencies, 0.5), 3) if latencies else None,
+        'p95_seconds': round(percentile(latencies, 0.95), 3) if latencies else None,
+        'peak_rss_mb': round(run['peak_rss_kb'] / 1024, 1)
+    }
+
+
+def run_benchmark(sites, scrapers, concurrency=10, pacing=True, verbose=False, web_options=None):
+    """Benchmark each scraper in a fresh process against one mock web; returns a summary per scraper"""
+    companies = [site.company for site in sites]
+    records = mock_web.dns_records(sites)
+    context = multiprocessing.get_context('spawn')
+    summaries = []
+    with mock_web.MockWeb(sites, **(web_options or {})) as web:
+        for scraper in scrapers:
+            web.reset_counts()
+            results = context.Queue()
+            process = context.Process(
+                target=_run_scraper,
+                args=(scraper, companies, records, web.port, concurrency, pacing, verbose, results),
+                daemon=True
+            )
+            process.start()
+            while True:
+                try:
+                    run = results.get(timeout=1)
+                    break
+                except queue.Empty:
+                    if not process.is_alive():
+                        run = {'error': f"exited with code {process.exitcode}"}
+                        break
+            process.join(timeout=5)
+            if 'error' in run:
+                logger.error(f"{scraper} run failed: {run['error']}")
+                continue
+            summaries.append(summarize(scraper, run, sites, sum(web.served.values())))
+    return summaries
+
+
+def print_report(summaries, sites):
+    with_site = sum(1 for site in sites if site.domain)
+    reachable = sum(1 for site in sites if site.reachable_email)
+    print(f"\n{len(sites)} companies, {with_site} with a website, {reachable} publishing an email\n")
+    header = f"{'scraper':<12}{'co/s':>8}{'found':>7}{'correct':>9}{'cut off':>9}{'requests':>10}{'req/email':>11}{'p50 s':>8}{'p95 s':>8}{'RSS MB':>8}"
+    print(header)
+    print('-' * len(header))
+    for s in summaries:
+        per_found = s['requests_per_found_email'] if s['requests_per_found_email'] is not None else '-'
+        print(f"{s['scraper']:<12}{s['companies_per_sec']:>8}{s['found']:>7}{s['correct']:>9}{s['cut_off']:>9}"
+              f"{s['requests']:>10}{per_found:>11}{s['p50_seconds']:>8}{s['p95_seconds']:>8}{s['peak_rss_mb']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the engine profiles against a local mock web (no internet needed)')
+    parser.add_argument('--scrapers', default=','.join(SCRAPERS), help='comma-separated: ' + ', '.join(SCRAPERS))
+    parser.add_argument('--companies', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--concurrency', type=int, default=10, help='companies searched at once')
+    parser.add_argument('--latency', type=float, default=0.05, help='mean site response delay (seconds)')
+    parser.add_argument('--page-kb', type=int, default=30, help='mean homepage size (KB)')
+    parser.add_argument('--search-kb', type=int, default=60, help='search results page size (KB)')
+    parser.add_argument('--no-site-rate', type=float, default=0.1)
+    parser.add_argument('--search-only-rate', type=float, default=0.15, help='sites only found through search')
+    parser.add_argument('--redirect-rate', type=float, default=0.2)
+    parser.add_argument('--obfuscated-rate', type=float, default=0.15)
+    parser.add_argument('--timeout-rate', type=float, default=0.05, help='sites that never answer')
+    parser.add_argument('--dead-rate', type=float, default=0.05, help='sites that refuse connections')
+    parser.add_argument('--hang-seconds', type=float, default=30)
+    parser.add_argument('--no-pacing', action='store_true', help='turn off per-host politeness delays')
+    parser.add_argument('--json', help='also write the summaries to this file')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    scrapers = [name.strip() for name in args.scrapers.split(',') if name.strip()]
+    unknown = [name for name in scrapers if name not in SCRAPERS]
+    if unknown:
+        parser.error(f"unknown scrapers: {', '.join(unknown)}")
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    # Hit stats, caches and job state of the runs go to a scratch directory, never the real one
+    os.environ['SCRAPER_DATA_DIR'] = tempfile.mkdtemp(prefix='scraper_benchmark_')
+
+    sites = mock_web.generate_sites(
+        args.companies, seed=args.seed, latency=args.latency, page_kb=args.page_kb,
+        no_site_rate=args.no_site_rate, search_only_rate=args.search_only_rate,
+        redirect_rate=args.redirect_rate, obfuscated_rate=args.obfuscated_rate,
+        timeout_rate=args.timeout_rate, dead_rate=args.dead_rate
+    )
+    summaries = run_benchmark(
+        sites, scrapers, concurrency=args.concurrency, pacing=not args.no_pacing, verbose=args.verbose,
+        web_options={'search_kb': args.search_kb, 'hang_seconds': args.hang_seconds}
+    )
+    print_report(summaries, sites)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': vars(args), 'results': summaries}, f, indent=2)
+    return 0 if len(summaries) == len(scrapers) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+import os
+import logging
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Rows parsed per chunk when streaming an upload (memory stays flat whatever the file size)
+INGEST_CHUNK_ROWS = int(os.environ.get('INGEST_CHUNK_ROWS', 10000))
+
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+
+
+def file_kind(filename):
+    """'csv', 'xlsx' or 'xls' from an upload's name"""
+    name = filename.lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith('.xlsx'):
+        return 'xlsx'
+    if name.endswith('.xls'):
+        return 'xls'
+    raise ValueError('Unsupported format')
+
+
+def _dedupe_header(values):
+    """Header cells as pandas names them: blanks become 'Unnamed: i', repeats get .1, .2, ..."""
+    columns = []
+    seen = {}
+    for i, value in enumerate(values):
+        name = f"Unnamed: {i}" if value is None or str(value).strip() == '' else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def _open_sheet(filepath):
+    from openpyxl import load_workbook
+    # read_only streams rows from the sheet XML instead of building every cell up front
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    return workbook, workbook.worksheets[0]
+
+
+def read_header(filepath, filename):
+    """Column names of an upload, without parsing any data rows"""
+    kind = file_kind(filename)
+    if kind == 'csv':
+        return list(pd.read_csv(filepath, nrows=0).columns)
+    if kind == 'xlsx':
+        workbook, sheet = _open_sheet(filepath)
+        try:
+            first_row = next(sheet.iter_rows(max_row=1, values_only=True), ())
+        finally:
+            workbook.close()
+        return _dedupe_header(first_row)
+    return list(pd.read_excel(filepath, nrows=0).columns)
+
+
+def iter_chunks(filepath, filename, usecols=None, chunksize=None):
+    """Stream an upload as DataFrames of at most chunksize rows, restricted to usecols"""
+    chunksize = chunksize or INGEST_CHUNK_ROWS
+    kind = file_kind(filename)
+
+    if kind == 'csv':
+        with pd.read_csv(filepath, usecols=usecols, chunksize=chunksize) as reader:
+            yield from reader
+        return
+
+    if kind == 'xls':
+        # The legacy format has no streaming reader; it's read in one go and handed out in chunks
+        df = pd.read_excel(filepath, usecols=usecols)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+        return
+
+    workbook, sheet = _open_sheet(filepath)
+    try:
+        columns = _dedupe_header(next(sheet.iter_rows(max_row=1, values_only=True), ()))
+        wanted = [i for i, column in enumerate(columns) if usecols is None or column in usecols]
+        if not wanted:
+            return
+        names = [columns[i] for i in wanted]
+        # Cells outside the wanted span aren't materialised at all
+        first, last = wanted[0], wanted[-1]
+        offsets = [i - first for i in wanted]
+        batch = []
+        # Empty rows only count when data follows them (like pandas, which drops trailing ones)
+        empty_rows = 0
+        for row in sheet.iter_rows(min_row=2, min_col=first + 1, max_col=last + 1, values_only=True):
+            if not any(cell is not None for cell in row):
+                empty_rows += 1
+                continue
+            batch.extend([None] * len(offsets) for _ in range(empty_rows))
+            empty_rows = 0
+            batch.append([row[i] if i < len(row) else None for i in offsets])
+            if len(batch) >= chunksize:
+                yield pd.DataFrame(batch, columns=names)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=names)
+    finally:
+        workbook.close()
+
+
+def _company_name(value):
+    if pd.isna(value) or str(value).strip() == '':
+        return None
+    return str(value).strip()
+
+
+def iter_unique_rows(filepath, filename, company_column, usecols=None, key=None):
+    """(row dict, company name) for the first row of each distinct company name, in file order.
+
+    Rows with a blank company are skipped. Duplicates are dropped while streaming, so only the
+    kept rows are ever held. key maps a raw company value to the value rows are deduplicated
+    on (the stripped name that is searched by default, so "Acme" and "Acme " are one company;
+    return None to skip the row).
+    """
+    seen = set()
+    for chunk in iter_chunks(filepath, filename, usecols=usecols):
+        # Pick the new companies off the one column first; only their rows are converted
+        kept = []
+        for position, value in enumerate(chunk[company_column].tolist()):
+            company_name = _company_name(value)
+            if company_name is None:
+                continue
+            dedupe_key = key(value) if key else company_name
+            if dedupe_key is None or dedupe_key in seen:
+                continue
+            seen.add(dedupe_key)
+            kept.append((position, company_name))
+        if kept:
+            rows = chunk.iloc[[position for position, _ in kept]].to_dict('records')
+            yield from zip(rows, (company_name for _, company_name in kept))
+
+
+def count_rows(filepath, filename, column):
+    """(total rows, distinct non-blank values) of one column, streamed"""
+    total = 0
+    distinct = set()
+    for chunk in iter_chunks(filepath, filename, usecols=[column]):
+        total += len(chunk)
+        distinct.update(name for name in map(_company_name, chunk[column]) if name is not None)
+    return total, len(distinct)
+
+
+def read_sample(filepath, filename, rows=3):
+    """First few data rows of an upload (all columns)"""
+    kind = file_kind(filename)
+    if kind == 'csv':
+        return pd.read_csv(filepath, nrows=rows)
+    if kind == 'xlsx':
+        chunks = iter_chunks(filepath, filename, chunksize=rows)
+        try:
+            sample = next(chunks, None)
+        finally:
+            chunks.close()
+        return sample if sample is not None else pd.DataFrame(columns=read_header(filepath, filename))
+    return pd.read_excel(filepath, nrows=rows)
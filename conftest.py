@@ -0,0 +1,6 @@
+"""pytest setup: the repository root is importable (this file's directory goes on sys.path) and
+every on-disk store (job queue, hit stats, result cache) lives in a throwaway directory."""
+import os
+import tempfile
+
+os.environ.setdefault('SCRAPER_DATA_DIR', tempfile.mkdtemp(prefix='scraper_tests_'))
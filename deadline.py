@@ -0,0 +1,187 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Seconds one company's search may take (0 = no limit)
+COMPANY_TIME_BUDGET = float(os.environ.get('COMPANY_TIME_BUDGET', 60))
+# Seconds a whole upload job may take (0 = no limit)
+JOB_TIME_BUDGET = float(os.environ.get('JOB_TIME_BUDGET', 0))
+# A company is never started with less than this (seconds); below it the job stops starting companies
+MIN_COMPANY_BUDGET = float(os.environ.get('MIN_COMPANY_BUDGET', 5))
+
+CUT_OFF_SOURCE = 'Cut off by time budget'
+
+
+class BudgetExceeded(Exception):
+    """The active time budget ran out before a fetch could start"""
+
+
+class Deadline:
+    """Point in (monotonic) time by which the enclosed work has to be done"""
+
+    __slots__ = ('expires_at', 'budget', 'cut_short', 'cancelled', 'outer')
+
+    def __init__(self, seconds, outer=None):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+        # Set once work was refused for lack of time, which may happen a moment before expiry
+        self.cut_short = False
+        # Set by cancel(): the work under this deadline was abandoned (the outer one goes on)
+        self.cancelled = False
+        self.outer = outer
+
+    def remaining(self):
+        """Seconds left, or None for a branch() outside any budget"""
+        return self.expires_at - time.monotonic() if self.expires_at is not None else None
+
+    @property
+    def expired(self):
+        if self.cancelled or self.cut_short:
+            return True
+        left = self.remaining()
+        return left is not None and left <= 0
+
+    def cancel(self):
+        """Stop the work under this deadline (from any thread): its next request slot or body
+        read raises BudgetExceeded"""
+        self.cancelled = True
+
+
+_current = ContextVar('deadline', default=None)
+
+
+@contextmanager
+def scope(seconds=None):
+    """Run the enclosed work under a time budget (COMPANY_TIME_BUDGET by default).
+
+    Nested scopes never extend an outer deadline. The deadline follows the context into
+    asyncio tasks and into threads started with contextvars.copy_context().run. Also usable
+    as a decorator.
+    """
+    seconds = COMPANY_TIME_BUDGET if seconds is None else seconds
+    outer = _current.get()
+    if not seconds or seconds <= 0 or (outer is not None and outer.remaining() <= seconds):
+        yield outer
+        return
+    token = _current.set(Deadline(seconds))
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def branch():
+    """Deadline expiring with the active one (if any) that can be cancelled on its own, for
+    work that may be abandoned part-way, such as the losing probes of a wave; run the work
+    under it with use()"""
+    outer = _current.get()
+    active = Deadline(None, outer=outer)
+    if outer is not None:
+        active.budget, active.expires_at = outer.budget, outer.expires_at
+    return active
+
+
+@contextmanager
+def use(active):
+    """Run the enclosed work under an existing deadline (e.g. one from branch())"""
+    token = _current.set(active)
+    try:
+        yield active
+    finally:
+        _current.reset(token)
+
+
+def current():
+    """Active deadline, or None outside any scope"""
+    return _current.get()
+
+
+def remaining():
+    """Seconds left in the active budget, or None without one"""
+    active = _current.get()
+    return active.remaining() if active is not None else None
+
+
+def expired():
+    active = _current.get()
+    return active is not None and active.expired
+
+
+def exceeded(message=None):
+    """BudgetExceeded to raise when work is refused for lack of time; the active deadline
+    counts as expired from then on"""
+    active = _current.get()
+    if active is not None and active.cancelled:
+        return BudgetExceeded(message or "Abandoned")
+    if active is not None and active.budget is not None:
+        message = message or f"Time budget of {active.budget:.0f}s spent"
+    # Out of time for the branches this runs under too
+    while active is not None:
+        active.cut_short = True
+        active = active.outer
+    return BudgetExceeded(message or "Time budget spent")
+
+
+def clamp(timeout):
+    """min(timeout, remaining budget); raises BudgetExceeded once the budget is spent"""
+    active = _current.get()
+    if active is None:
+        return timeout
+    if active.expired:
+        raise exceeded()
+    left = active.remaining()
+    if left is None:
+        return timeout
+    return min(timeout, left) if timeout is not None else left
+
+
+def check():
+    """Raise BudgetExceeded once the active budget is spent (for loops of blocking reads, whose
+    timeouts only bound each read, not their total)"""
+    if expired():
+        raise exceeded()
+
+
+def cut_off_source(elapsed):
+    return f"{CUT_OFF_SOURCE} ({elapsed:.0f}s)"
+
+
+def is_cut_off(source):
+    """True for results that stopped because the budget ran out (not a real "Not found")"""
+    return bool(source) and str(source).startswith(CUT_OFF_SOURCE)
+
+
+class JobBudget:
+    """Splits a job's time budget across the companies still to start.
+
+    Each company gets min(COMPANY_TIME_BUDGET, its fair share of the time left), where the fair
+    share accounts for companies running side by side. Once the share drops below
+    MIN_COMPANY_BUDGET the remaining companies are not started.
+    """
+
+    def __init__(self, total_companies, concurrency, seconds=None, company_seconds=None):
+        self.seconds = JOB_TIME_BUDGET if seconds is None else seconds
+        self.company_seconds = COMPANY_TIME_BUDGET if company_seconds is None else company_seconds
+        self.concurrency = max(1, concurrency)
+        self.expires_at = time.monotonic() + self.seconds if self.seconds and self.seconds > 0 else None
+        self._not_started = total_companies
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        return self.expires_at - time.monotonic() if self.expires_at is not None else None
+
+    def next_company_budget(self):
+        """Budget for the next company to start (0 = unlimited), or None if it shouldn't start"""
+        with self._lock:
+            self._not_started = max(0, self._not_started - 1)
+            queued = self._not_started + 1
+        left = self.remaining()
+        if left is None:
+            return self.company_seconds
+        # Companies still to start run concurrency at a time in the time that's left
+        share = left * min(self.concurrency, queued) / queued
+        if self.company_seconds and self.company_seconds > 0:
+            share = min(share, self.company_seconds)
+        return share if share >= MIN_COMPANY_BUDGET else None
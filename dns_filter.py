@@ -0,0 +1,198 @@
+import os
+import time
+import socket
+import queue
+import asyncio
+import logging
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import Future, wait
+import deadline
+
+logger = logging.getLogger(__name__)
+
+# How long resolved / unresolvable names are remembered (seconds)
+DNS_CACHE_TTL = int(os.environ.get('DNS_CACHE_TTL', 600))
+DNS_NEGATIVE_TTL = int(os.environ.get('DNS_NEGATIVE_TTL', 120))
+# Lookups run at the same time for one batch
+DNS_CONCURRENCY = int(os.environ.get('DNS_CONCURRENCY', 32))
+# Longest a batch waits for its lookups (further capped by the active time budget); names not
+# answered by then count as unknown and are kept
+DNS_TIMEOUT = float(os.environ.get('DNS_TIMEOUT', 5))
+
+
+def system_resolver(hostname):
+    """Resolve through the OS resolver; returns a list of addresses (empty if the name doesn't exist)"""
+    try:
+        infos = socket.getaddrinfo(hostname, None, proto=socket.IPPROTO_TCP)
+        return list({info[4][0] for info in infos})
+    except (socket.gaierror, UnicodeError):
+        return []
+
+
+class StaticResolver:
+    """Resolver stub for tests and offline runs: answers only for the hostnames it was given"""
+
+    def __init__(self, records=None, default=None):
+        self.records = {host.lower(): list(addresses) for host, addresses in (records or {}).items()}
+        self.default = list(default) if default else []
+        self.lookups = []
+
+    def add(self, hostname, addresses=('127.0.0.1',)):
+        self.records[hostname.lower()] = list(addresses)
+
+    def __call__(self, hostname):
+        self.lookups.append(hostname)
+        return self.records.get(hostname.lower(), self.default)
+
+
+class DnsCache:
+    """In-process TTL cache of lookup results with a shorter TTL for failures"""
+
+    def __init__(self, ttl=DNS_CACHE_TTL, negative_ttl=DNS_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, hostname):
+        """Cached address list, or None when unknown/expired"""
+        with self._lock:
+            entry = self._entries.get(hostname)
+            if entry is None:
+                return None
+            addresses, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[hostname]
+                return None
+            return addresses
+
+    def put(self, hostname, addresses):
+        ttl = self.ttl if addresses else self.negative_ttl
+        with self._lock:
+            self._entries[hostname] = (addresses, time.monotonic() + ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class LookupPool:
+    """Daemon threads running lookups for every batch of the process.
+
+    getaddrinfo can't be interrupted, so a batch that stops waiting just abandons its lookups:
+    they finish in the background (or are dropped if they never started) and hold up neither
+    the caller nor interpreter exit, which a ThreadPoolExecutor's worker threads would.
+    """
+
+    def __init__(self, size=DNS_CONCURRENCY):
+        self.size = size
+        self._queue = queue.SimpleQueue()
+        self._threads = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        future = Future()
+        self._queue.put((future, fn, args))
+        with self._lock:
+            if self._threads < self.size:
+                self._threads += 1
+                threading.Thread(target=self._run, name='dns-lookup', daemon=True).start()
+        return future
+
+    def _run(self):
+        while True:
+            future, fn, args = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+
+_resolver = system_resolver
+_cache = DnsCache()
+_pool = LookupPool()
+
+
+def set_resolver(resolver):
+    """Swap the resolver (e.g. a StaticResolver in tests); clears the cache"""
+    global _resolver
+    _resolver = resolver or system_resolver
+    _cache.clear()
+
+
+def get_resolver():
+    return _resolver
+
+
+def hostname_of(candidate):
+    """Hostname of a URL or bare domain"""
+    if '://' not in candidate:
+        candidate = f"http://{candidate}"
+    return (urlparse(candidate).hostname or '').lower()
+
+
+def resolve_hosts(hostnames, timeout=None):
+    """Resolve a batch of hostnames concurrently; returns {hostname: [addresses]}.
+
+    Waits at most timeout seconds (DNS_TIMEOUT by default), and never past the active time
+    budget; hostnames still unanswered then are left out of the result (unknown, not cached).
+    """
+    results = {}
+    to_lookup = []
+    for hostname in dict.fromkeys(hostnames):
+        if not hostname:
+            continue
+        cached = _cache.get(hostname)
+        if cached is not None:
+            results[hostname] = cached
+        else:
+            to_lookup.append(hostname)
+
+    if to_lookup:
+        resolver = _resolver
+
+        def lookup(hostname):
+            try:
+                return resolver(hostname) or []
+            except Exception as e:
+                logger.debug(f"DNS lookup failed for {hostname}: {str(e)}")
+                return []
+
+        limit = DNS_TIMEOUT if timeout is None else timeout
+        left = deadline.remaining()
+        if left is not None:
+            limit = max(0, min(limit, left))
+        futures = {hostname: _pool.submit(lookup, hostname) for hostname in to_lookup}
+        done, _ = wait(futures.values(), timeout=limit)
+        for hostname, future in futures.items():
+            if future in done:
+                addresses = future.result()
+                _cache.put(hostname, addresses)
+                results[hostname] = addresses
+            else:
+                future.cancel()
+        if len(done) < len(futures):
+            logger.debug(f"DNS: {len(futures) - len(done)}/{len(futures)} lookups unanswered after {limit:.1f}s")
+
+    return results
+
+
+def filter_resolvable(candidates):
+    """Drop URLs/domains whose hostname doesn't resolve, keeping the original order (hostnames
+    that weren't answered in time are kept: the fetch will find out)"""
+    candidates = list(candidates)
+    resolved = resolve_hosts(hostname_of(candidate) for candidate in candidates)
+    kept = [
+        candidate for candidate in candidates
+        if hostname_of(candidate) and resolved.get(hostname_of(candidate), True)
+    ]
+    logger.debug(f"DNS filter kept {len(kept)}/{len(candidates)} candidates")
+    return kept
+
+
+async def filter_resolvable_async(candidates):
+    """Async version of filter_resolvable (lookups run in worker threads)"""
+    return await asyncio.to_thread(filter_resolvable, candidates)
@@ -0,0 +1,102 @@
+import os
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import deadline
+
+logger = logging.getLogger(__name__)
+
+# Candidates probed at the same time (1 = old one-by-one behaviour)
+PROBE_WAVE_SIZE = int(os.environ.get('DOMAIN_PROBE_WAVE_SIZE', 20))
+# Contact paths fetched together with the homepage in the first wave of the email ladder
+FIRST_WAVE_CONTACT_PAGES = int(os.environ.get('FIRST_WAVE_CONTACT_PAGES', 6))
+
+
+def _waves(candidates, wave_size):
+    wave_size = max(1, wave_size)
+    for start in range(0, len(candidates), wave_size):
+        yield candidates[start:start + wave_size]
+
+
+def first_result(candidates, fetch, wave_size=None):
+    """Run fetch on candidates in parallel waves; return (candidate, result) for the first
+    candidate in list order whose result is truthy, or None.
+
+    Candidates are expected most-likely first. Inside a wave every candidate is fetched at
+    once, but results are read back in list order, so the earliest passing candidate wins
+    even when a later one answers faster. Remaining work is cancelled once a winner is known:
+    every probe of a wave runs under one deadline.branch(), so a slower probe stops at its next
+    request slot or body read (BudgetExceeded) instead of running to the end in the background.
+    """
+    candidates = list(candidates)
+    wave_size = wave_size or PROBE_WAVE_SIZE
+
+    for wave in _waves(candidates, wave_size):
+        executor = ThreadPoolExecutor(max_workers=len(wave))
+        wave_deadline = deadline.branch()
+        # Probes run with the caller's context (e.g. its page cache)
+        futures = [
+            executor.submit(contextvars.copy_context().run, _probe, wave_deadline, fetch, candidate)
+            for candidate in wave
+        ]
+        try:
+            for candidate, future in zip(wave, futures):
+                try:
+                    result = future.result()
+                    if result:
+                        return candidate, result
+                except Exception as e:
+                    logger.debug(f"Probe failed for {candidate}: {str(e)}")
+        finally:
+            # Don't wait on slower probes once the wave is decided
+            wave_deadline.cancel()
+            executor.shutdown(wait=False)
+
+    return None
+
+
+def _probe(wave_deadline, fetch, candidate):
+    with deadline.use(wave_deadline):
+        return fetch(candidate)
+
+
+def first_success(candidates, check, wave_size=None):
+    """Probe candidates in parallel waves and return the first one (in list order) that passes check"""
+    found = first_result(candidates, check, wave_size=wave_size)
+    return found[0] if found else None
+
+
+async def first_result_async(candidates, fetch, wave_size=None):
+    """Async version of first_result; fetch is a coroutine function"""
+    candidates = list(candidates)
+    wave_size = wave_size or PROBE_WAVE_SIZE
+
+    for wave in _waves(candidates, wave_size):
+        tasks = [asyncio.ensure_future(fetch(candidate)) for candidate in wave]
+        try:
+            for candidate, task in zip(wave, tasks):
+                try:
+                    result = await task
+                    if result:
+                        return candidate, result
+                except Exception as e:
+                    logger.debug(f"Probe failed for {candidate}: {str(e)}")
+        finally:
+            await cancel_pending(tasks)
+
+    return None
+
+
+async def first_success_async(candidates, check, wave_size=None):
+    """Async version of first_success; check is a coroutine function"""
+    found = await first_result_async(candidates, check, wave_size=wave_size)
+    return found[0] if found else None
+
+
+async def cancel_pending(tasks):
+    """Cancel tasks that are still running and wait for them to wind down"""
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,28 +1,30 @@
-print("=== EMAIL SCRAPER DEBUG: Starting imports ===")
 from flask import Flask, jsonify, request, send_file, render_template_string
-print("✅ Flask imported")
 import os
-print("✅ os imported")
 import time
-print("✅ time imported")
-import re
-print("✅ re imported")
 import tempfile
-import pandas as pd
 import logging
-import openai
+import company_file
+import result_writer
+import hit_stats
+from itertools import islice
+from scraper_engine import ACCURATE_PAGES, get_pipeline
+
+logger = logging.getLogger(__name__)
+logger.debug("Imports done, creating Flask app")
 
-print("=== EMAIL SCRAPER DEBUG: Creating Flask app ===")
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
-print("✅ Flask app created")
-
-# Set up OpenAI API key (you'll need to add this to your environment variables)
-openai.api_key = os.getenv('OPENAI_API_KEY')
+logger.debug("Flask app created")
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+
+# Wholesale/trade/contact/homepage only, real addresses only (see scraper_engine.profiles)
+PIPELINE = get_pipeline('accurate')
+find_real_emails_simple = PIPELINE.find_email
+
+# Companies searched per upload (more leads to 502s from the platform's request timeout)
+MAX_COMPANIES = PIPELINE.profile['max_companies']
 
 @app.route('/')
 def index():
@@ -178,7 +180,6 @@ def upload_file():
     try:
         # Import heavy dependencies only when needed
         from werkzeug.utils import secure_filename
-        import requests
         
         if 'file' not in request.files:
             return jsonify({'success': False, 'error': 'No file provided'})
@@ -196,15 +197,9 @@ def upload_file():
         filepath = os.path.join(tempfile.gettempdir(), secure_filename(unique_filename))
         file.save(filepath)
         
-        # Read the CSV or Excel file
+        # Only the header is read to find the company column
         try:
-            if filepath.lower().endswith('.csv'):
-                df = pd.read_csv(filepath)
-            elif filepath.lower().endswith('.xlsx'):
-                df = pd.read_excel(filepath)
-            else:
-                os.remove(filepath)
-                return jsonify({'success': False, 'error': 'Unsupported file format'})
+            columns = company_file.read_header(filepath, filepath)
         except Exception as e:
             os.remove(filepath)
             return jsonify({'success': False, 'error': f'Error reading file: {str(e)}'})
@@ -221,64 +216,59 @@ def upload_file():
         ]
         
         for col in potential_company_columns:
-            if col in df.columns:
+            if col in columns:
                 company_column = col
                 break
         
         if not company_column:
-            available_columns = ', '.join(df.columns.tolist())
+            available_columns = ', '.join(str(col) for col in columns)
             os.remove(filepath)
             return jsonify({'success': False, 'error': f'No company column found. Available columns: {available_columns}. Please ensure one column contains company names.'})
         
         logger.info(f"Using company column: {company_column}")
         
-        # Rename the company column to 'company' for consistent processing
-        df = df.rename(columns={company_column: 'company'})
+        # Stream the file until MAX_COMPANIES distinct (cleaned) names are collected; the rest is never parsed
+        try:
+            rows = [row for row, _ in islice(
+                company_file.iter_unique_rows(filepath, filepath, company_column, key=PIPELINE.clean_company_name),
+                MAX_COMPANIES
+            )]
+        except Exception as e:
+            os.remove(filepath)
+            return jsonify({'success': False, 'error': f'Error reading file: {str(e)}'})
+        
+        # Results go into a write-only workbook as each company finishes (constant memory)
+        timestamp = int(time.time())
+        output_filename = f"email_results_{timestamp}.xlsx"
+        output_path = os.path.join(tempfile.gettempdir(), output_filename)
+        fieldnames = ['company', 'email', 'source'] + [col for col in columns if col != company_column and str(col).lower() not in ['company']]
+        output = result_writer.XlsxResultWriter(output_path, fieldnames)
         
         # Process companies - accurate emails only
         try:
-            logger.info("Starting process_companies_simple...")
-            results = process_companies_simple(df, logger)
-            logger.info(f"process_companies_simple completed with {len(results) if results else 0} results")
+            logger.info("Starting accurate processing...")
+            results = []
+            def write_result(result):
+                results.append(PIPELINE.format_row(result, 'text', company_column))
+                output.write(results[-1])
+            PIPELINE.process(rows, column=company_column, on_result=write_result)
+            logger.info(f"Accurate processing completed with {len(results)} results")
         except Exception as process_error:
-            logger.error(f"Error in process_companies_simple: {type(process_error).__name__}: {str(process_error)}")
+            logger.error(f"Error in accurate processing: {type(process_error).__name__}: {str(process_error)}")
             raise Exception(f"Processing failed: {str(process_error)}")
+        finally:
+            try:
+                output.close()
+                logger.info(f"Results saved to: {output_path} ({output.rows_written} rows)")
+            except Exception as save_error:
+                logger.error(f"Error saving Excel file: {type(save_error).__name__}: {str(save_error)}")
+                raise Exception(f"File save failed: {str(save_error)}")
         
-        # Validate results before DataFrame creation
+        # Validate results
         if not results:
             logger.error("No results returned from processing")
             return jsonify({'success': False, 'error': 'No results generated during processing'})
         
-        # Create results DataFrame with better error handling
-        try:
-            logger.info(f"Creating DataFrame from {len(results)} results...")
-            # Log the structure of first result for debugging
-            if results:
-                first_result = results[0]
-                logger.info(f"First result structure: {list(first_result.keys()) if hasattr(first_result, 'keys') else type(first_result)}")
-            
-            results_df = pd.DataFrame(results)
-            logger.info(f"DataFrame created successfully with shape: {results_df.shape}")
-        except Exception as df_error:
-            logger.error(f"Error creating DataFrame: {type(df_error).__name__}: {str(df_error)}")
-            # Try to provide more debug info
-            logger.error(f"Results type: {type(results)}, Length: {len(results) if hasattr(results, '__len__') else 'unknown'}")
-            if results and len(results) > 0:
-                logger.error(f"First result: {results[0]}")
-            raise Exception(f"DataFrame creation failed: {str(df_error)}")
-        
-        # Save results with unique filename
-        try:
-            timestamp = int(time.time())
-            output_filename = f"email_results_{timestamp}.xlsx"
-            output_path = os.path.join(tempfile.gettempdir(), output_filename)
-            logger.info(f"Saving results to: {output_path}")
-            results_df.to_excel(output_path, index=False)
-            logger.info("Excel file saved successfully")
-        except Exception as save_error:
-            logger.error(f"Error saving Excel file: {type(save_error).__name__}: {str(save_error)}")
-            raise Exception(f"File save failed: {str(save_error)}")
-        
         # Clean up input file
         try:
             if os.path.exists(filepath):
@@ -357,225 +347,10 @@ def download_file(filename):
         logger.error(f"Download error: {str(e)}")
         return jsonify({'error': f'Download failed: {str(e)}'}), 500
 
-def find_real_emails_simple(company_name, location_data=None):
-    """Simple, proven email extraction - with fashion/wholesale priority but lightweight"""
-    import requests
-    
-    # Simple domain generation like last week
-    clean_name = re.sub(r'[^a-zA-Z0-9]', '', company_name.lower())
-    
-    domains_to_try = [
-        f"{clean_name}.com",
-        f"{company_name.lower().replace(' ', '')}.com",
-        f"{company_name.lower().replace(' ', '-')}.com"
-    ]
-    
-    # Add one simple variation if company has multiple words
-    if ' ' in company_name:
-        words = company_name.lower().split()
-        if len(words) >= 2 and len(words[0]) >= 3:
-            domains_to_try.append(f"{words[0]}.com")
-    
-    for domain in domains_to_try[:3]:  # Back to 3 domains to prevent overload
-        for protocol in ['https://', 'http://']:
-            website = f"{protocol}{domain}"
-            
-            try:
-                headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-                response = requests.get(website, headers=headers, timeout=4, allow_redirects=True)
-                
-                if response.status_code == 200:
-                    # ONLY 4 key pages to prevent server overload but prioritize wholesale
-                    pages_to_check = [
-                        '/wholesale',        # #1 priority - where fashion companies put B2B contacts
-                        '/trade',           # #2 priority - another common B2B page
-                        '/contact',         # General contact
-                        ''                  # Homepage
-                    ]
-                    
-                    for page in pages_to_check:
-                        try:
-                            check_url = f"{website.rstrip('/')}{page}" if page else website
-                            email = extract_emails_simple(check_url, requests)
-                            if email:
-                                page_desc = f"{page}" if page else "homepage"
-                                return email, f"Found on {website} ({page_desc})"
-                        except:
-                            continue
-                    
-                    # Found website but no emails
-                    return None, f"Website found ({website}) but no emails"
-            except:
-                continue
-    
-    return None, f"No website found for {company_name}"
-
-def extract_emails_simple(url, requests):
-    """Simple email extraction with better filtering"""
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        response = requests.get(url, headers=headers, timeout=4)
-        response.raise_for_status()
-        
-        # Better email regex that doesn't capture image filenames
-        email_pattern = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
-        emails = email_pattern.findall(response.text)
-        
-        if not emails:
-            return None
-        
-        # Enhanced filtering to improve quality
-        skip_patterns = [
-            # Personal email providers
-            'gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'aol.com', 'bellsouth.net', 
-            'comcast.net', 'verizon.net', 'att.net', 'live.com', 'msn.com',
-            # Service/placeholder emails  
-            'noreply', 'no-reply', 'donotreply', 'example.com', 'youremail.com', 'yoursite.com',
-            'test.com', 'placeholder', 'sample.com', 'demo.com',
-            # Website builder and service providers
-            'webador.com', 'wixpress.com', 'sentry', 'shopify.com', 'squarespace.com',
-            'wordpress.com', 'weebly.com', 'godaddy.com', 'bluehost.com',
-            # Technical/system emails
-            'mailer-daemon', 'postmaster', 'admin@localhost', 'root@',
-            # Image/file extensions (to avoid capturing filenames)
-            '.png', '.jpg', '.jpeg', '.gif', '.pdf', '.doc', '.zip'
-        ]
-        
-        # Look for business emails first, prioritizing business prefixes
-        business_prefixes = ['info@', 'contact@', 'sales@', 'support@', 'hello@', 'orders@', 'admin@']
-        
-        # First pass: look for priority business emails
-        for email in emails:
-            email_lower = email.lower()
-            if (len(email_lower) > 4 and 
-                '@' in email_lower and 
-                not any(skip in email_lower for skip in skip_patterns)):
-                
-                # Prioritize business-like email prefixes
-                if any(email_lower.startswith(prefix) for prefix in business_prefixes):
-                    return email_lower
-        
-        # Second pass: any valid business email that passed filtering
-        for email in emails:
-            email_lower = email.lower()
-            if (len(email_lower) > 4 and 
-                '@' in email_lower and 
-                not any(skip in email_lower for skip in skip_patterns)):
-                
-                # Additional check: make sure domain looks legitimate (not service provider)
-                domain = email_lower.split('@')[1]
-                if (len(domain) > 4 and 
-                    not any(service in domain for service in ['webador', 'wix', 'shopify', 'squarespace', 'wordpress'])):
-                    return email_lower
-        
-        return None
-        
-    except Exception as e:
-        return None
-
-def process_companies_simple(companies_df, logger):
-    """Simple processing like last week that worked"""
-    results = []
-    processed_companies = set()
-    start_time = time.time()
-    
-    try:
-        logger.info(f"Starting simple processing with {len(companies_df)} total rows")
-        
-        # Simple duplicate removal
-        unique_companies = []
-        for idx, row in companies_df.iterrows():
-            try:
-                company_name = clean_company_name(row.get('company', ''))
-                
-                if not company_name or company_name in processed_companies:
-                    continue
-                    
-                unique_companies.append({'company': company_name, 'original_row': row})
-                processed_companies.add(company_name)
-                
-                if len(unique_companies) >= 150:  # Reduced to prevent 502 errors
-                    break
-            except Exception:
-                continue
-        
-        logger.info(f"Processing {len(unique_companies)} unique companies")
-        
-        for i, company_data in enumerate(unique_companies):
-            try:
-                company_name = company_data['company']
-                original_row = company_data['original_row']
-                
-                logger.info(f"Processing {i+1}/{len(unique_companies)}: {company_name}")
-                
-                # Simple email search
-                email, source = find_real_emails_simple(company_name)
-                
-                # Create simple result
-                result = {
-                    'company': str(company_name),
-                    'email': str(email) if email else '',
-                    'source': str(source) if source else 'No emails found'
-                }
-                
-                # Add original columns
-                try:
-                    for col in original_row.index:
-                        if col.lower() not in ['company']:
-                            value = original_row[col]
-                            result[col] = str(value) if not pd.isna(value) else ''
-                except:
-                    pass
-                
-                results.append(result)
-                
-            except Exception as e:
-                logger.error(f"Error processing {company_data.get('company', 'unknown')}: {str(e)}")
-                results.append({
-                    'company': str(company_data.get('company', 'Unknown')),
-                    'email': '',
-                    'source': f'Error: {str(e)}'
-                })
-        
-        total_time = time.time() - start_time
-        logger.info(f"Simple processing completed in {total_time:.2f} seconds")
-        
-        return results
-        
-    except Exception as e:
-        logger.error(f"Error in simple processing: {str(e)}")
-        return [{
-            'company': 'Processing Failed',
-            'email': '',
-            'source': f'Error: {str(e)}'
-        }]
-
-def clean_company_name(name):
-    if not name or str(name).strip() == '' or str(name).lower() in ['nan', 'null', 'none', '', 'n/a']:
-        return None
-    
-    name = str(name).strip()
-    
-    # Don't clean if the name is too short (likely important)
-    if len(name) <= 2:
-        return name if name else None
-    
-    # Only remove common business suffixes, but be more conservative
-    suffixes = [' LLC', ' Inc.', ' Inc', ' Corp.', ' Corp', ' Corporation', ' Ltd.', ' Ltd', ' Limited', ' Co.', ' Company']
-    for suffix in suffixes:
-        if name.upper().endswith(suffix.upper()):
-            cleaned = name[:-len(suffix)].strip()
-            # Only remove suffix if there's still a substantial company name left
-            if len(cleaned) >= 2:  # Reduced from 3 to 2
-                name = cleaned
-            break
-    
-    return name if name else None
-
 @app.route('/health')
 def health():
     """Ultra-fast health check"""
-    print("🩺 Health check called!")
+    logger.debug("Health check called")
     return jsonify({
         'status': 'healthy',
         'timestamp': time.strftime('%Y-%m-%d %H:%M:%S UTC'),
@@ -583,6 +358,11 @@ def health():
         'app': 'fashiongo-email-scraper-accurate'
     }), 200
 
+@app.route('/stats/ranking')
+def stats_ranking():
+    """Learned order of the pages checked per website, with hit counts"""
+    return jsonify(hit_stats.report({'accurate_page': ACCURATE_PAGES}))
+
 @app.route('/korea-test')
 def korea_test():
     """Korea connectivity test"""
@@ -606,9 +386,9 @@ def debug():
         'features': 'real emails only - no guessing'
     })
 
-print("=== EMAIL SCRAPER DEBUG: Routes registered ===")
+logger.debug("Routes registered")
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    print(f"=== EMAIL SCRAPER DEBUG: Starting Flask app on port {port} ===")
+    logger.info(f"Starting Flask app on port {port}")
     app.run(host='0.0.0.0', port=port, debug=False) 
\ No newline at end of file
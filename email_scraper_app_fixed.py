@@ -1,14 +1,11 @@
 from flask import Flask, render_template, request, jsonify, send_file
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
-import re
 import os
 import time
 import tempfile
 import logging
 from werkzeug.utils import secure_filename
-import io
+import scraper_engine
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
@@ -20,127 +17,9 @@ app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Email regex pattern
-EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
-
-def clean_company_name(name):
-    """Clean and normalize company name for better search results"""
-    if pd.isna(name) or name is None or str(name).strip() == '':
-        return None
-    
-    name = str(name).strip()
-    # Remove common suffixes that might interfere with search
-    suffixes = [' LLC', ' Inc', ' Corp', ' Corporation', ' Ltd', ' Limited', ' Co', ' Company']
-    for suffix in suffixes:
-        if name.upper().endswith(suffix.upper()):
-            name = name[:-len(suffix)].strip()
-    
-    return name if name else None
-
-def find_emails_on_page(url, timeout=10):
-    """Find email addresses on a given webpage"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=timeout)
-        response.raise_for_status()
-        
-        # Find emails in the HTML content
-        emails = set(EMAIL_PATTERN.findall(response.text))
-        
-        # Filter out common false positives
-        filtered_emails = []
-        for email in emails:
-            email_lower = email.lower()
-            if not any(x in email_lower for x in ['example.com', 'test.com', 'placeholder', 'yoursite', 'yourdomain']):
-                filtered_emails.append(email)
-        
-        return list(set(filtered_emails))
-    
-    except Exception as e:
-        logger.error(f"Error fetching {url}: {str(e)}")
-        return []
-
-def search_company_website(company_name):
-    """Search for company website using DuckDuckGo search"""
-    try:
-        if not company_name:
-            return None
-            
-        # Clean company name
-        clean_name = clean_company_name(company_name)
-        if not clean_name:
-            return None
-            
-        # Simple search query
-        search_query = f"{clean_name} official website"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        # Use DuckDuckGo instead of Google to avoid blocking
-        search_url = f"https://duckduckgo.com/html/?q={search_query}"
-        
-        response = requests.get(search_url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Look for result links
-        links = soup.find_all('a', {'class': 'result__a'})
-        
-        for link in links[:3]:  # Check first 3 results
-            href = link.get('href') if hasattr(link, 'get') else None
-            if href and 'http' in href:
-                return href
-                
-        return None
-        
-    except Exception as e:
-        logger.error(f"Error searching for {company_name}: {str(e)}")
-        return None
-
-def find_company_email(company_name):
-    """Find email for a company by searching their website"""
-    try:
-        if not company_name:
-            return None, None
-            
-        logger.info(f"Searching for emails for: {company_name}")
-        
-        # Search for company website
-        website = search_company_website(company_name)
-        if not website:
-            logger.info(f"No website found for {company_name}")
-            return None, None
-        
-        logger.info(f"Found website for {company_name}: {website}")
-        
-        # Check main page
-        emails = find_emails_on_page(website)
-        if emails:
-            return emails[0], f"Main page: {website}"
-        
-        # Try common contact pages
-        if isinstance(website, str):
-            base_url = website.rstrip('/')
-            contact_pages = ['/contact', '/contact-us', '/about', '/about-us']
-            
-            for page in contact_pages:
-                try:
-                    contact_url = base_url + page
-                    emails = find_emails_on_page(contact_url)
-                    if emails:
-                        return emails[0], f"Contact page: {contact_url}"
-                except:
-                    continue
-        
-        return None, f"No emails found on {website}"
-        
-    except Exception as e:
-        logger.error(f"Error finding email for {company_name}: {str(e)}")
-        return None, f"Error: {str(e)}"
+# Website search and the site's own pages only: no guessed addresses
+PIPELINE = scraper_engine.Pipeline('exhaustive', steps=('site_pages',))
+find_company_email = PIPELINE.find_email
 
 @app.route('/')
 def index():
@@ -203,45 +82,11 @@ def upload_file():
             }), 400
         
         # Process companies (limit to first 10 for demo to avoid timeouts)
-        results = []
-        total_companies = min(len(df), 10)  # Limit for demo
-        
-        logger.info(f"Processing {total_companies} companies using column: {company_column}")
-        
-        for index, row in df.head(total_companies).iterrows():
-            try:
-                # Skip empty rows
-                company_name_val = row[company_column]
-                if pd.isna(company_name_val) or str(company_name_val).strip() == '':
-                    logger.info(f"Skipping row {index + 1}: empty company name")
-                    continue
-                
-                company_name = str(company_name_val).strip()
-                logger.info(f"Processing company {index + 1}/{total_companies}: {company_name}")
-                
-                # Find email
-                email, source = find_company_email(company_name)
-                
-                # Create result row
-                result_row = row.to_dict()
-                result_row['found_email'] = email if email else 'Not found'
-                result_row['email_source'] = source if source else 'N/A'
-                result_row['processed_company_name'] = company_name
-                
-                results.append(result_row)
-                
-                # Add delay to be respectful to websites
-                time.sleep(2)
-                
-            except Exception as e:
-                logger.error(f"Error processing row {index + 1}: {str(e)}")
-                # Continue with next row instead of stopping
-                result_row = row.to_dict()
-                result_row['found_email'] = 'Error'
-                result_row['email_source'] = f'Error: {str(e)}'
-                result_row['processed_company_name'] = str(company_name_val) if not pd.isna(company_name_val) else 'N/A'
-                results.append(result_row)
-                continue
+        logger.info(f"Processing companies using column: {company_column}")
+        results = [
+            PIPELINE.format_row(result, 'annotated')
+            for result in PIPELINE.process(df.head(10).to_dict('records'), column=company_column, dedupe=False)
+        ]
         
         # Create results DataFrame
         results_df = pd.DataFrame(results)
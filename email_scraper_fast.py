@@ -1,11 +1,24 @@
 from flask import Flask, jsonify
 import os
 import time
-import re
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
+_pipeline = None
+
+def get_pipeline():
+    """The engine's fast profile, imported on first use so startup stays light"""
+    global _pipeline
+    if _pipeline is None:
+        import scraper_engine
+        _pipeline = scraper_engine.get_pipeline('fast')
+    return _pipeline
+
+def find_company_email_fast(company_name):
+    """(email, source) for one company"""
+    return get_pipeline().find_email(company_name)
+
 @app.route('/')
 def index():
     return '''<!DOCTYPE html>
@@ -113,8 +126,6 @@ def upload_file():
         import tempfile
         from werkzeug.utils import secure_filename
         import logging
-        from bs4 import BeautifulSoup
-        import requests
         
         logger = logging.getLogger(__name__)
         
@@ -146,8 +157,9 @@ def upload_file():
             os.remove(filepath)
             return jsonify({'success': False, 'error': f'No "company" column found. Available columns: {available_columns}'})
         
-        # Process companies with simplified logic
-        results = process_companies_fast(df, logger, requests, BeautifulSoup)
+        # Process companies with the fast profile (three .com guesses, homepage, /contact, info@)
+        pipeline = get_pipeline()
+        results = [pipeline.format_row(result) for result in pipeline.process(df.to_dict('records'))]
         
         # Create results DataFrame
         results_df = pd.DataFrame(results)
@@ -191,135 +203,6 @@ def download_file(filename):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def process_companies_fast(companies_df, logger, requests, BeautifulSoup):
-    """Fast processing with core email extraction"""
-    results = []
-    processed_companies = set()
-    
-    # Remove duplicates and limit to 300 companies
-    unique_companies = []
-    for _, row in companies_df.iterrows():
-        company_name = clean_company_name(row.get('company', ''))
-        if company_name and company_name not in processed_companies:
-            unique_companies.append({'company': company_name, 'original_row': row})
-            processed_companies.add(company_name)
-        
-        if len(unique_companies) >= 300:
-            break
-    
-    for i, company_data in enumerate(unique_companies):
-        company_name = company_data['company']
-        original_row = company_data['original_row']
-        
-        logger.info(f"Processing {i+1}/{len(unique_companies)}: {company_name}")
-        
-        try:
-            email, source = find_company_email_fast(company_name, requests, BeautifulSoup)
-            
-            result = {
-                'company': company_name,
-                'email': email if email else 'Not found',
-                'source': source if source else 'No source available'
-            }
-            
-            # Add any additional columns from original data
-            for col in original_row.index:
-                if col.lower() not in ['company']:
-                    result[col] = original_row[col]
-            
-            results.append(result)
-            
-        except Exception as e:
-            logger.error(f"Error processing {company_name}: {str(e)}")
-            result = {
-                'company': company_name,
-                'email': 'Error occurred',
-                'source': f'Error: {str(e)}'
-            }
-            results.append(result)
-        
-        # Delay to avoid overwhelming servers
-        time.sleep(0.5)
-    
-    return results
-
-def clean_company_name(name):
-    if not name or str(name).strip() == '':
-        return None
-    
-    name = str(name).strip()
-    suffixes = [' LLC', ' Inc', ' Corp', ' Corporation', ' Ltd', ' Limited', ' Co', ' Company']
-    for suffix in suffixes:
-        if name.upper().endswith(suffix.upper()):
-            name = name[:-len(suffix)].strip()
-    
-    return name if name else None
-
-def find_company_email_fast(company_name, requests, BeautifulSoup):
-    """Fast email finding with core strategies"""
-    if not company_name:
-        return None, "No company name provided"
-    
-    # Strategy 1: Direct domain guessing
-    clean_name = clean_company_name(company_name)
-    if not clean_name:
-        return None, "Invalid company name"
-    
-    # Try most common domain patterns
-    domains_to_try = [
-        f"{clean_name.lower().replace(' ', '')}.com",
-        f"{clean_name.lower().replace(' ', '-')}.com",
-        f"{clean_name.lower().split()[0]}.com" if ' ' in clean_name else f"{clean_name.lower()}.com"
-    ]
-    
-    for domain in domains_to_try:
-        try:
-            website = f"https://{domain}"
-            response = requests.head(website, timeout=3, allow_redirects=True)
-            if response.status_code == 200:
-                # Try to find emails on homepage
-                email = find_emails_on_page_fast(website, requests, BeautifulSoup)
-                if email:
-                    return email, f"Homepage: {website}"
-                
-                # Try contact page
-                contact_email = find_emails_on_page_fast(f"{website}/contact", requests, BeautifulSoup)
-                if contact_email:
-                    return contact_email, f"Contact page: {website}/contact"
-                
-                # Guess common email formats
-                common_emails = [f"info@{domain}", f"contact@{domain}", f"sales@{domain}"]
-                return common_emails[0], f"Guessed: {website}"
-        except:
-            continue
-    
-    return None, f"Website not found for {company_name}"
-
-def find_emails_on_page_fast(url, requests, BeautifulSoup):
-    """Fast email extraction from a webpage"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=5)
-        response.raise_for_status()
-        
-        # Simple email regex
-        email_pattern = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
-        emails = email_pattern.findall(response.text)
-        
-        # Filter out common non-business emails
-        business_emails = []
-        for email in emails:
-            email_lower = email.lower()
-            if not any(skip in email_lower for skip in ['gmail.com', 'yahoo.com', 'hotmail.com', 'noreply']):
-                business_emails.append(email)
-        
-        return business_emails[0] if business_emails else None
-        
-    except:
-        return None
-
 @app.route('/health')
 def health():
     """Ultra-fast health check"""
@@ -1,14 +1,24 @@
-from flask import Flask, request, jsonify, send_file
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
-import re
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 import os
+import json
 import time
 import tempfile
 import logging
 from werkzeug.utils import secure_filename
 import platform
+from urllib.parse import quote
+import scraper_engine
+import shard_executor
+import company_file
+import result_writer
+import result_cache
+import job_queue
+import hit_stats
+import host_health
+import deadline
+import metrics
+import tracing
+from scraper_parsing import CONTACT_PAGES, DIRECT_GUESS_TLDS
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
@@ -17,622 +27,9 @@ app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
-
-def clean_company_name(name):
-    if pd.isna(name) or name is None or str(name).strip() == '':
-        return None
-    
-    name = str(name).strip()
-    suffixes = [' LLC', ' Inc', ' Corp', ' Corporation', ' Ltd', ' Limited', ' Co', ' Company']
-    for suffix in suffixes:
-        if name.upper().endswith(suffix.upper()):
-            name = name[:-len(suffix)].strip()
-    
-    return name if name else None
-
-def find_emails_on_page(url, timeout=5):
-    """Enhanced email extraction from webpages with better filtering"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-        }
-        
-        response = requests.get(url, headers=headers, timeout=timeout, allow_redirects=True)
-        response.raise_for_status()
-        
-        # Find emails using multiple patterns
-        text_content = response.text.lower()
-        
-        # Enhanced email patterns
-        email_patterns = [
-            EMAIL_PATTERN,  # Standard pattern
-            re.compile(r'mailto:([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', re.IGNORECASE),
-            re.compile(r'contact[^@]*?([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', re.IGNORECASE),
-            re.compile(r'info[^@]*?([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', re.IGNORECASE),
-        ]
-        
-        all_emails = set()
-        for pattern in email_patterns:
-            emails = pattern.findall(text_content)
-            all_emails.update(emails)
-        
-        # Prioritize business emails
-        business_emails = []
-        other_emails = []
-        
-        for email in all_emails:
-            email_lower = email.lower().strip()
-            
-            # Skip obvious fake/template emails
-            if any(x in email_lower for x in [
-                'example.com', 'test.com', 'placeholder', 'yoursite', 'yourdomain',
-                'samplewebsite', 'domain.com', 'email.com', 'website.com',
-                'admin@admin', 'test@test', 'user@domain'
-            ]):
-                continue
-            
-            # Skip common non-business emails  
-            if any(x in email_lower for x in [
-                'noreply', 'no-reply', 'donotreply', 'unsubscribe', 'bounce',
-                'mailer-daemon', 'postmaster', 'root@', 'webmaster'
-            ]):
-                continue
-                
-                # Basic domain validation
-            if '@' not in email_lower or '.' not in email_lower.split('@')[-1]:
-                continue
-                
-            # Prioritize business-looking emails
-            if any(x in email_lower for x in [
-                'info@', 'contact@', 'sales@', 'support@', 'hello@', 'inquiry@',
-                'business@', 'office@', 'admin@', 'service@', 'help@'
-            ]):
-                business_emails.append(email)
-            else:
-                other_emails.append(email)
-        
-        # Return business emails first, then others
-        return business_emails + other_emails
-    
-    except requests.exceptions.Timeout:
-        logger.warning(f"Timeout fetching {url}")
-        return []
-    except Exception as e:
-        logger.warning(f"Error fetching {url}: {str(e)}")
-        return []
-
-def search_company_website(company_name):
-    """Enhanced multi-strategy website search with direct guessing and fallbacks"""
-    try:
-        if not company_name:
-            return None
-            
-        clean_name = clean_company_name(company_name)
-        if not clean_name:
-            return None
-            
-        # Strategy 1: Direct Website Guessing (Most Reliable)
-        direct_urls = generate_direct_website_guesses(clean_name)
-        for url in direct_urls:
-            if test_website_exists(url):
-                logger.info(f"Found via direct guess: {url}")
-                return url
-        
-        # Strategy 2: Simplified Search Engines (Faster & More Reliable)
-        search_engines = [
-            {
-                'name': 'Bing',
-                'url': f"https://www.bing.com/search?q=\"{clean_name}\"+site%3A{clean_name.replace(' ', '')}.com",
-                'timeout': 3
-            },
-            {
-                'name': 'Yahoo',
-                'url': f"https://search.yahoo.com/search?p=\"{clean_name}\"+website",
-                'timeout': 3
-            }
-        ]
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-        }
-        
-        for engine in search_engines:
-            try:
-                response = requests.get(engine['url'], headers=headers, timeout=engine['timeout'])
-                if response.status_code == 200:
-                    urls = extract_business_urls_from_search(response.text, clean_name)
-                    for url in urls[:3]:  # Check top 3 results
-                                if is_valid_business_url(url):
-                            logger.info(f"Found via {engine['name']}: {url}")
-                            return url
-            except Exception as e:
-                logger.warning(f"{engine['name']} search failed: {str(e)}")
-                continue
-        
-        logger.info(f"No website found for {clean_name}")
-        return None
-        
-    except Exception as e:
-        logger.error(f"Error searching for {company_name}: {str(e)}")
-        return None
-
-def generate_direct_website_guesses(company_name):
-    """Generate comprehensive website URL guesses for maximum success rate"""
-    urls = []
-    
-    # Clean the name for URL generation
-    clean = re.sub(r'[^a-zA-Z0-9\s]', '', company_name.lower())
-    clean_no_spaces = re.sub(r'\s+', '', clean)  # Remove all spaces
-    
-    # Get first word and abbreviation
-    words = clean.split()
-    first_word = words[0] if words else clean
-    abbreviation = ''.join([word[0] for word in words if len(word) > 0])[:6]  # Max 6 chars
-    
-    # Base domains to try
-    base_names = []
-    
-    if clean_no_spaces and len(clean_no_spaces) > 2:
-        base_names.append(clean_no_spaces)
-        
-    # Add dash variations for multi-word companies
-    if len(words) > 1:
-        dash_name = '-'.join(words)
-        base_names.append(dash_name)
-        
-        # Try first word only
-        if len(first_word) > 3:
-            base_names.append(first_word)
-    
-    # Add abbreviation if meaningful
-    if len(abbreviation) >= 2 and abbreviation != clean_no_spaces:
-        base_names.append(abbreviation)
-        
-    # Add "the" prefix removal
-    if clean.startswith('the '):
-        no_the = clean[4:].replace(' ', '')
-        if no_the and len(no_the) > 2:
-            base_names.append(no_the)
-    
-    # Comprehensive TLD list (major success rate boost)
-    tlds = [
-        '.com', '.net', '.org', '.biz', '.co', '.us', '.io', '.co.uk',
-        '.info', '.shop', '.store', '.online', '.website', '.site',
-        '.business', '.company', '.corp', '.inc', '.ltd'
-    ]
-    
-    # Generate all combinations
-    for base_name in base_names:
-        if base_name and len(base_name) > 1:
-            for tld in tlds:
-                urls.extend([
-                    f"https://www.{base_name}{tld}",
-                    f"https://{base_name}{tld}"
-                ])
-    
-    return urls
-
-def test_website_exists(url):
-    """Quickly test if a website exists and is accessible"""
-    try:
-        response = requests.head(url, timeout=3, allow_redirects=True)
-        return response.status_code in [200, 301, 302, 403]  # 403 might still have contact info
-    except:
-        return False
-
-def extract_business_urls_from_search(html_content, company_name):
-    """Extract business URLs from search engine results"""
-    urls = []
-    
-    # Simple regex to find URLs in search results
-    url_pattern = re.compile(r'https?://(?:www\.)?([a-zA-Z0-9\-\.]+\.[a-zA-Z]{2,})', re.IGNORECASE)
-    matches = url_pattern.findall(html_content)
-    
-    company_keywords = company_name.lower().split()
-    
-    for match in matches:
-        full_url = f"https://{match}"
-        domain_lower = match.lower()
-        
-        # Prioritize URLs that contain company name keywords
-        if any(keyword in domain_lower for keyword in company_keywords if len(keyword) > 3):
-            urls.insert(0, full_url)  # Put at beginning
-        else:
-            urls.append(full_url)
-    
-    return urls[:10]  # Return top 10
-
-def is_valid_business_url(url):
-    """Enhanced URL validation for business websites"""
-    if not url or not isinstance(url, str):
-        return False
-    
-    # Must be HTTP/HTTPS
-    if not url.startswith(('http://', 'https://')):
-        return False
-    
-    # Extract domain
-    try:
-        domain = url.split('/')[2].lower()
-    except:
-        return False
-    
-    # Must have proper domain structure
-    if '.' not in domain or len(domain) < 4:
-        return False
-    
-    # Exclude search engines, social media, and common non-business sites
-    excluded_domains = [
-        'google.com', 'bing.com', 'yahoo.com', 'duckduckgo.com', 'startpage.com',
-        'facebook.com', 'twitter.com', 'linkedin.com', 'instagram.com', 'youtube.com',
-        'wikipedia.org', 'amazon.com', 'ebay.com', 'alibaba.com', 'aliexpress.com',
-        'pinterest.com', 'tiktok.com', 'snapchat.com', 'reddit.com', 'tumblr.com'
-    ]
-    
-    for excluded in excluded_domains:
-        if excluded in domain:
-            return False
-    
-    # Prefer business-like domains
-    business_indicators = ['.com', '.net', '.org', '.biz', '.co', '.us', '.shop', '.store']
-    if any(indicator in domain for indicator in business_indicators):
-        return True
-    
-    return len(domain.split('.')) >= 2  # At least domain.tld format
-
-def guess_email_format(company_name, website_url):
-    """Guess common email formats when website found but no emails displayed"""
-    try:
-        # Extract domain from website URL
-        domain = website_url.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0]
-        
-        # Common business email prefixes (ordered by likelihood)
-        email_prefixes = [
-            'info', 'contact', 'hello', 'sales', 'support', 'inquiry',
-            'business', 'office', 'admin', 'service', 'help', 'mail',
-            'general', 'team', 'welcome', 'connect', 'reach'
-        ]
-        
-        # Try each prefix with the domain
-        for prefix in email_prefixes:
-            candidate_email = f"{prefix}@{domain}"
-            
-            # Quick validation check (could be enhanced with actual email verification)
-            if is_valid_email_format(candidate_email):
-                return candidate_email
-                
-        return None
-        
-    except Exception as e:
-        logger.warning(f"Error guessing email format: {str(e)}")
-        return None
-
-def is_valid_email_format(email):
-    """Basic email format validation"""
-    return '@' in email and '.' in email.split('@')[-1] and len(email.split('@')) == 2
-
-def find_company_email(company_name):
-    """Find email for a company with production-optimized settings"""
-    try:
-        if not company_name:
-            return None, None
-            
-        logger.info(f"Searching for emails for: {company_name}")
-        
-        # Search for company website
-        website = search_company_website(company_name)
-        if not website:
-            logger.info(f"No website found for {company_name}")
-            return None, f"No website found"
-        
-        logger.info(f"Found website for {company_name}: {website}")
-        
-        # Check main page first
-        emails = find_emails_on_page(website)
-        if emails:
-            logger.info(f"Found email on main page for {company_name}: {emails[0]}")
-            return emails[0], f"Main page: {website}"
-        
-        # Try more comprehensive contact pages for higher success rate
-        if isinstance(website, str):
-            base_url = website.rstrip('/')
-            
-            # Comprehensive contact page list (major success rate boost)
-            contact_pages = [
-                '/contact', '/contact-us', '/contact_us', '/contactus',
-                '/about', '/about-us', '/about_us', '/aboutus',
-                '/support', '/help', '/customer-service', '/customer_service',
-                '/info', '/information', '/reach-us', '/reach_us',
-                '/get-in-touch', '/touch', '/connect', '/feedback',
-                '/sales', '/business', '/office', '/headquarters',
-                '/team', '/staff', '/management', '/leadership'
-            ]
-            
-            for page in contact_pages:
-                try:
-                    contact_url = base_url + page
-                    emails = find_emails_on_page(contact_url)
-                    if emails:
-                        logger.info(f"Found email on contact page for {company_name}: {emails[0]}")
-                        return emails[0], f"Contact page: {contact_url}"
-                    
-                    # Shorter delay for production
-                    time.sleep(0.2)
-                    
-                except Exception as e:
-                    logger.warning(f"Error checking contact page {contact_url}: {str(e)}")
-                    continue
-                    
-            # Strategy 4: Dynamic contact link detection (success rate boost)
-            dynamic_contact_links = find_contact_links(website)
-            for contact_link in dynamic_contact_links:
-                try:
-                    emails = find_emails_on_page(contact_link)
-                    if emails:
-                        logger.info(f"Found email on dynamic contact page for {company_name}: {emails[0]}")
-                        return emails[0], f"Dynamic contact page: {contact_link}"
-                        
-                    time.sleep(0.2)
-                    
-                except Exception as e:
-                    logger.warning(f"Error checking dynamic contact page {contact_link}: {str(e)}")
-                    continue
-        
-        logger.info(f"No emails found for {company_name} on {website}")
-        
-        # Strategy 3: Email format guessing if website found but no emails (success rate boost)
-        guessed_email = guess_email_format(company_name, website)
-        if guessed_email:
-            logger.info(f"Guessed email format for {company_name}: {guessed_email}")
-            return guessed_email, f"Email format guess: {website}"
-        
-        # Strategy 5: Subdomain checking (final fallback)
-        subdomain_email = check_subdomains_for_emails(website, company_name)
-        if subdomain_email:
-            return subdomain_email[0], f"Subdomain: {subdomain_email[1]}"
-        
-        # Strategy 6: Social Media Email Extraction (major success rate boost)
-        try:
-            social_email = extract_email_from_social_media(company_name)
-            if social_email:
-                return social_email[0], f"Social media: {social_email[1]}"
-        except Exception as e:
-            logger.warning(f"Social media extraction failed for {company_name}: {str(e)}")
-            # Continue without failing
-        
-        return None, f"No emails found on {website}"
-        
-    except Exception as e:
-        logger.error(f"Error finding email for {company_name}: {str(e)}")
-        return None, f"Error: {str(e)}"
-
-def find_contact_links(website_url):
-    """Dynamically find contact page links from homepage"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        }
-        
-        response = requests.get(website_url, headers=headers, timeout=5, allow_redirects=True)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        contact_links = []
-        
-        # Look for links containing contact-related keywords
-        contact_keywords = [
-            'contact', 'about', 'support', 'help', 'reach', 'touch', 'connect',
-            'info', 'team', 'staff', 'office', 'location', 'feedback', 'inquiry'
-        ]
-        
-        # Find all links
-        for link in soup.find_all('a', href=True):
-            href = link.get('href')
-            if not href or not isinstance(href, str):
-                continue
-                
-            link_text = link.get_text(strip=True).lower()
-            
-            # Check if link or text contains contact keywords
-            for keyword in contact_keywords:
-                if keyword in href.lower() or keyword in link_text:
-                    # Convert relative URLs to absolute
-                    if href.startswith('/'):
-                        full_url = website_url.rstrip('/') + href
-                    elif href.startswith('http'):
-                        full_url = href
-                    else:
-                        continue
-                        
-                    if full_url not in contact_links:
-                        contact_links.append(full_url)
-                    break
-        
-        return contact_links[:10]  # Return top 10 contact links
-        
-    except Exception as e:
-        logger.warning(f"Error finding contact links on {website_url}: {str(e)}")
-        return []
-
-def check_subdomains_for_emails(main_website, company_name):
-    """Check common business subdomains for contact emails"""
-    try:
-        # Extract base domain
-        base_domain = main_website.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0]
-        
-        # Common business subdomains
-        subdomains = ['blog', 'support', 'help', 'info', 'contact', 'about', 'team']
-        
-        for subdomain in subdomains:
-            try:
-                subdomain_url = f"https://{subdomain}.{base_domain}"
-                if test_website_exists(subdomain_url):
-                    emails = find_emails_on_page(subdomain_url)
-                    if emails:
-                        logger.info(f"Found email on subdomain for {company_name}: {emails[0]}")
-                        return emails[0], subdomain_url
-                        
-                time.sleep(0.3)
-                
-            except Exception:
-                continue
-                
-        return None
-        
-    except Exception as e:
-        logger.warning(f"Error checking subdomains: {str(e)}")
-        return None
-
-def extract_email_from_social_media(company_name):
-    """Extract emails from social media profiles (Instagram, Facebook, LinkedIn, Twitter)"""
-    try:
-        logger.info(f"Checking social media for {company_name}")
-        
-        # Clean company name for social media search
-        clean_name = clean_company_name(company_name)
-        if not clean_name:
-            return None
-            
-        # Social media platforms to check
-        platforms = [
-            {
-                'name': 'Instagram',
-                'search_url': f"https://www.google.com/search?q=site:instagram.com+\"{clean_name}\"",
-                'profile_indicators': ['instagram.com/', '@'],
-                'timeout': 4
-            },
-            {
-                'name': 'Facebook', 
-                'search_url': f"https://www.google.com/search?q=site:facebook.com+\"{clean_name}\"",
-                'profile_indicators': ['facebook.com/', 'fb.com/'],
-                'timeout': 4
-            },
-            {
-                'name': 'LinkedIn',
-                'search_url': f"https://www.google.com/search?q=site:linkedin.com/company+\"{clean_name}\"",
-                'profile_indicators': ['linkedin.com/company/', 'linkedin.com/in/'],
-                'timeout': 4
-            },
-            {
-                'name': 'Twitter',
-                'search_url': f"https://www.google.com/search?q=site:twitter.com+\"{clean_name}\"",
-                'profile_indicators': ['twitter.com/', 'x.com/', '@'],
-                'timeout': 4
-            }
-        ]
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-        }
-        
-        for platform in platforms:
-            try:
-                # Search for social media profiles
-                response = requests.get(platform['search_url'], headers=headers, timeout=platform['timeout'])
-                if response.status_code == 200:
-                    # Find social media profile URLs
-                    profile_urls = extract_social_media_urls(response.text, platform['profile_indicators'], clean_name)
-                    
-                    # Check each profile for contact info
-                    for profile_url in profile_urls[:2]:  # Check top 2 profiles per platform
-                        try:
-                            email = extract_email_from_social_profile(profile_url, platform['name'])
-                            if email:
-                                logger.info(f"Found email on {platform['name']} for {company_name}: {email}")
-                                return email, f"{platform['name']} profile"
-                                
-                            time.sleep(0.5)  # Rate limiting
-                            
-                        except Exception as e:
-                            logger.warning(f"Error checking {platform['name']} profile {profile_url}: {str(e)}")
-                            continue
-                            
-                time.sleep(0.3)  # Rate limiting between platforms
-                
-            except Exception as e:
-                logger.warning(f"Error searching {platform['name']}: {str(e)}")
-                continue
-        
-        return None
-        
-    except Exception as e:
-        logger.warning(f"Error in social media extraction: {str(e)}")
-        return None
-
-def extract_social_media_urls(html_content, indicators, company_name):
-    """Extract social media profile URLs from search results"""
-    urls = []
-    
-    # Find URLs in the HTML that match social media patterns
-    url_pattern = re.compile(r'https?://(?:www\.)?([^/\s]+(?:/[^\s"\'<>]*)?)', re.IGNORECASE)
-    matches = url_pattern.findall(html_content)
-    
-    company_keywords = company_name.lower().split()
-    
-    for match in matches:
-        full_url = f"https://{match}"
-        
-        # Check if URL is from target platform
-        if any(indicator in full_url.lower() for indicator in indicators):
-            # Prioritize URLs that seem to match the company name
-            if any(keyword in full_url.lower() for keyword in company_keywords if len(keyword) > 3):
-                urls.insert(0, full_url)  # Priority placement
-            else:
-                urls.append(full_url)
-    
-    return urls[:5]  # Return top 5 URLs
-
-def extract_email_from_social_profile(profile_url, platform_name):
-    """Extract email from individual social media profile"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        }
-        
-        response = requests.get(profile_url, headers=headers, timeout=5, allow_redirects=True)
-        response.raise_for_status()
-        
-        # Use multiple email patterns optimized for social media
-        social_email_patterns = [
-            EMAIL_PATTERN,  # Standard pattern
-            re.compile(r'contact[:\s]*([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', re.IGNORECASE),
-            re.compile(r'email[:\s]*([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', re.IGNORECASE),
-            re.compile(r'reach[:\s]+us[:\s]*([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', re.IGNORECASE),
-            re.compile(r'business[:\s]+inquiries[:\s]*([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', re.IGNORECASE),
-        ]
-        
-        for pattern in social_email_patterns:
-            emails = pattern.findall(response.text.lower())
-            if emails:
-                # Filter and validate emails
-                for email in emails:
-                    if is_valid_email_format(email) and not is_fake_email(email):
-                        return email
-        
-        return None
-        
-    except Exception as e:
-        logger.warning(f"Error extracting from {platform_name} profile {profile_url}: {str(e)}")
-        return None
-
-def is_fake_email(email):
-    """Check if email appears to be fake or template"""
-    fake_indicators = [
-        'example.com', 'test.com', 'placeholder', 'yoursite', 'yourdomain',
-        'samplewebsite', 'domain.com', 'email.com', 'website.com',
-        'noreply', 'no-reply', 'donotreply', 'unsubscribe'
-    ]
-    
-    email_lower = email.lower()
-    return any(indicator in email_lower for indicator in fake_indicators)
+# The exhaustive profile of the shared engine; upload jobs run its async twin (async_engine)
+PIPELINE = scraper_engine.get_pipeline('exhaustive')
+find_company_email = PIPELINE.find_email
 
 @app.route('/')
 def index():
@@ -654,7 +51,11 @@ def index():
 <button type="submit" class="btn btn-primary btn-lg">🚀 Find Emails</button></form>
 <div id="loading" style="display:none" class="text-center mt-4">
 <div class="spinner-border text-primary"></div><h5 class="mt-3">Finding email addresses...</h5>
-<p class="text-muted">Processing all companies in your file - this may take a while for large files</p></div>
+<p class="text-muted">Processing all companies in your file - this may take a while for large files</p>
+<p class="text-muted" id="progressText"></p></div>
+<div id="liveResults" style="display:none;max-height:320px;overflow-y:auto" class="mt-3">
+<table class="table table-sm"><thead><tr><th>Company</th><th>Email</th><th>Source</th><th>Time</th></tr></thead>
+<tbody id="liveRows"></tbody></table></div>
 <div id="results" style="display:none" class="mt-4"><div class="alert alert-success">
 <h6>✅ Processing Complete!</h6><div class="row text-center mt-3">
 <div class="col-md-4"><div style="font-size:2rem;font-weight:bold;color:#2c5aa0" id="totalCompanies">0</div><small>Companies</small></div>
@@ -670,19 +71,36 @@ if(!file){alert('Please select a file');return;}const formData=new FormData();fo
 document.getElementById('loading').style.display='block';
 document.getElementById('results').style.display='none';
 document.getElementById('error').style.display='none';
+document.getElementById('liveRows').innerHTML='';
 fetch('/upload',{method:'POST',body:formData}).then(r=>r.json()).then(data=>{
-document.getElementById('loading').style.display='none';if(data.success){
+if(!data.success){showError(data.error);}else if(window.EventSource){streamJob(data.job_id);}else{pollJob(data.status_url);}
+}).catch(e=>showError('Network error: '+e.message));});
+function streamJob(jobId){const source=new EventSource('/jobs/'+jobId+'/events');
+document.getElementById('liveResults').style.display='block';
+source.addEventListener('result',e=>addLiveRow(JSON.parse(e.data)));
+source.addEventListener('progress',e=>{const job=JSON.parse(e.data);
+document.getElementById('progressText').textContent=job.processed+' / '+(job.total_companies||'?')+' companies processed';});
+source.addEventListener('done',e=>{source.close();const job=JSON.parse(e.data);
+if(job.status==='completed'){showResults(job);}else{showError(job.error||'Processing failed');}});}
+function addLiveRow(r){const tr=document.createElement('tr');
+[r.company,r.email,r.source,r.cached?'cached':r.elapsed.toFixed(1)+'s'].forEach(v=>{const td=document.createElement('td');td.textContent=v;tr.appendChild(td);});
+document.getElementById('liveRows').prepend(tr);}
+function pollJob(statusUrl){fetch(statusUrl).then(r=>r.json()).then(job=>{
+if(job.status==='completed'){showResults(job);}
+else if(job.status==='failed'){showError(job.error||'Processing failed');}
+else{document.getElementById('progressText').textContent=job.processed+' / '+(job.total_companies||'?')+' companies processed';
+setTimeout(()=>pollJob(statusUrl),2000);}}).catch(e=>showError('Network error: '+e.message));}
+function showResults(data){document.getElementById('loading').style.display='none';
 document.getElementById('totalCompanies').textContent=data.total_companies;
 document.getElementById('emailsFound').textContent=data.emails_found;
 document.getElementById('successRate').textContent=data.success_rate+'%';
 document.getElementById('downloadBtn').onclick=()=>window.location.href=data.download_url;
-document.getElementById('results').style.display='block';}else{
-document.getElementById('errorText').textContent=data.error;
-document.getElementById('error').style.display='block';}}).catch(e=>{
-document.getElementById('loading').style.display='none';
-document.getElementById('errorText').textContent='Network error: '+e.message;
-document.getElementById('error').style.display='block';});});
+document.getElementById('results').style.display='block';}
+function showError(message){document.getElementById('loading').style.display='none';
+document.getElementById('errorText').textContent=message;
+document.getElementById('error').style.display='block';}
 function resetForm(){document.getElementById('results').style.display='none';
+document.getElementById('liveResults').style.display='none';
 document.getElementById('error').style.display='none';document.getElementById('fileInput').value='';}
 </script></body></html>'''
 
@@ -694,7 +112,10 @@ def health():
             'status': 'healthy',
             'timestamp': time.strftime('%Y-%m-%d %H:%M:%S UTC'),
             'version': '2.0-social-media',
-            'app': 'fashiongo-email-scraper'
+            'app': 'fashiongo-email-scraper',
+            'circuit_breakers': {
+                key: value for key, value in host_health.snapshot().items() if key != 'hosts'
+            }
         }), 200
     except Exception as e:
         return jsonify({
@@ -703,6 +124,24 @@ def health():
             'timestamp': time.strftime('%Y-%m-%d %H:%M:%S UTC')
         }), 500
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics: per-stage and per-request timings, bytes, results by strategy, breakers, hit stats"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/stats/ranking')
+def stats_ranking():
+    """Learned order of contact paths, TLD guesses and strategies, with hit counts"""
+    return jsonify(hit_stats.report({
+        'contact_path': CONTACT_PAGES,
+        'tld': DIRECT_GUESS_TLDS
+    }))
+
+@app.route('/stats/hosts')
+def stats_hosts():
+    """Circuit breaker state: totals plus every host that is (or was recently) short-circuited"""
+    return jsonify(host_health.snapshot())
+
 @app.route('/korea-test')
 def korea_test():
     """Special endpoint for testing Korea connectivity"""
@@ -779,36 +218,70 @@ def test_columns():
         file.save(filepath)
         
         try:
-            if filename.endswith('.csv'):
-                df = pd.read_csv(filepath)
-            elif filename.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(filepath)
-            else:
+            if not filename.endswith(company_file.SUPPORTED_EXTENSIONS):
                 return jsonify({'error': 'Unsupported format'}), 400
+            # Header and a few rows are all the analysis needs; the row count streams one column
+            columns = company_file.read_header(filepath, filename)
+            sample = company_file.read_sample(filepath, filename, rows=3)
+            total_rows = company_file.count_rows(filepath, filename, columns[0])[0] if columns else 0
         finally:
             if os.path.exists(filepath):
                 os.remove(filepath)
         
         # Return column analysis
-        columns = list(df.columns)
         sample_data = {}
         for col in columns[:10]:  # First 10 columns
-            sample_data[col] = df[col].head(3).tolist()
+            sample_data[col] = sample[col].head(3).tolist()
         
         return jsonify({
             'success': True,
             'total_columns': len(columns),
             'all_columns': columns,
             'sample_data': sample_data,
-            'file_shape': df.shape,
+            'file_shape': (total_rows, len(columns)),
             'suggested_company_columns': [col for col in columns if any(keyword in col.lower() for keyword in ['company', 'business', 'name', 'client', 'customer', 'account', 'store', 'retailer', 'brand'])]
         })
         
     except Exception as e:
         return jsonify({'error': f'Analysis error: {str(e)}'}), 500
 
+POSSIBLE_COMPANY_COLUMNS = [
+    'companyName', 'shipToCompanyName', 'company_name', 'Company Name', 'Company', 'Name',
+    'company', 'business_name', 'Business Name', 'BusinessName', 'customer_name', 'Customer Name',
+    'account_name', 'Account Name', 'AccountName', 'client_name', 'Client Name', 'ClientName',
+    'store_name', 'Store Name', 'StoreName', 'retailer_name', 'Retailer Name', 'RetailerName',
+    'brand_name', 'Brand Name', 'BrandName', 'organization', 'Organization'
+]
+
+def detect_company_column(columns):
+    """Enhanced company name column detection"""
+    columns = list(columns)
+    
+    # First try exact matches
+    for col in POSSIBLE_COMPANY_COLUMNS:
+        if col in columns:
+            logger.info(f"Found exact match for company column: {col}")
+            return col
+    
+    # If no exact match, try case-insensitive and partial matches
+    columns_lower = {str(col).lower(): col for col in columns}
+    for col in POSSIBLE_COMPANY_COLUMNS:
+        if col.lower() in columns_lower:
+            logger.info(f"Found case-insensitive match for company column: {columns_lower[col.lower()]}")
+            return columns_lower[col.lower()]
+    
+    # If still no match, look for columns containing key words
+    for actual_col in columns:
+        actual_col_lower = str(actual_col).lower()
+        if any(keyword in actual_col_lower for keyword in ['company', 'business', 'name', 'client', 'customer', 'account', 'store', 'retailer', 'brand']):
+            logger.info(f"Found partial match for company column: {actual_col}")
+            return actual_col
+    
+    return None
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
+    """Validate the upload and queue it; scraping happens in the job workers"""
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No file uploaded'}), 400
@@ -818,136 +291,319 @@ def upload_file():
             return jsonify({'error': 'No file selected'}), 400
         
         filename = secure_filename(file.filename or 'upload.csv')
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"upload_{int(time.time())}_{filename}")
+        if not filename.endswith(company_file.SUPPORTED_EXTENSIONS):
+            return jsonify({'error': 'Unsupported format'}), 400
+        
+        job_id = job_queue.new_job_id()
+        filepath = os.path.join(job_queue.job_dir(job_id), f"input_{filename}")
         file.save(filepath)
         
+        # Column detection only needs the header row
         try:
-            if filename.endswith('.csv'):
-                df = pd.read_csv(filepath)
-            elif filename.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(filepath)
-            else:
-                return jsonify({'error': 'Unsupported format'}), 400
+            columns = company_file.read_header(filepath, filename)
         except Exception as e:
+            os.remove(filepath)
             return jsonify({'error': f'Error reading file: {str(e)}'}), 400
-        finally:
-            if os.path.exists(filepath):
-                os.remove(filepath)
-        
-        # Enhanced company name column detection
-        company_column = None
-        possible_columns = [
-            'companyName', 'shipToCompanyName', 'company_name', 'Company Name', 'Company', 'Name',
-            'company', 'business_name', 'Business Name', 'BusinessName', 'customer_name', 'Customer Name',
-            'account_name', 'Account Name', 'AccountName', 'client_name', 'Client Name', 'ClientName',
-            'store_name', 'Store Name', 'StoreName', 'retailer_name', 'Retailer Name', 'RetailerName',
-            'brand_name', 'Brand Name', 'BrandName', 'organization', 'Organization'
-        ]
-        
-        # First try exact matches
-        for col in possible_columns:
-            if col in df.columns:
-                company_column = col
-                logger.info(f"Found exact match for company column: {col}")
-                break
-        
-        # If no exact match, try case-insensitive and partial matches
-        if not company_column:
-            df_columns_lower = {col.lower(): col for col in df.columns}
-            for col in possible_columns:
-                if col.lower() in df_columns_lower:
-                    company_column = df_columns_lower[col.lower()]
-                    logger.info(f"Found case-insensitive match for company column: {company_column}")
-                    break
-        
-        # If still no match, look for columns containing key words
-        if not company_column:
-            for actual_col in df.columns:
-                actual_col_lower = actual_col.lower()
-                if any(keyword in actual_col_lower for keyword in ['company', 'business', 'name', 'client', 'customer', 'account', 'store', 'retailer', 'brand']):
-                    company_column = actual_col
-                    logger.info(f"Found partial match for company column: {company_column}")
-                    break
         
+        company_column = detect_company_column(columns)
         if not company_column:
+            os.remove(filepath)
             # Show user all available columns for debugging
-            available_columns = list(df.columns)
+            available_columns = list(columns)
             logger.error(f"No company column found. Available columns: {available_columns}")
             return jsonify({
                 'error': f'Could not find company name column. Available columns: {available_columns}. Please ensure your file has a column with company/business names.',
                 'available_columns': available_columns,
-                'suggested_columns': possible_columns[:10]
+                'suggested_columns': POSSIBLE_COMPANY_COLUMNS[:10]
             }), 400
         
-        # Optimize for large files: remove duplicates and limit for demo
-        unique_companies = df.drop_duplicates(subset=[company_column])
-        
-        # For large files, limit to prevent timeouts (production optimization)
-        max_companies = 100 if len(unique_companies) > 100 else len(unique_companies)
-        processing_df = unique_companies.head(max_companies)
-        
-        logger.info(f"Processing {max_companies} unique companies (out of {len(df)} total)")
-        
-        results = []
-        
-        for idx, (_, row) in enumerate(processing_df.iterrows()):
-            try:
-                company_name_val = row[company_column]
-                if pd.isna(company_name_val) or str(company_name_val).strip() == '':
-                    continue
-                
-                company_name = str(company_name_val).strip()
-                logger.info(f"Processing {idx + 1}/{max_companies}: {company_name}")
-                
-                email, source = find_company_email(company_name)
-                
-                result_row = row.to_dict()
-                result_row['found_email'] = email if email else 'Not found'
-                result_row['email_source'] = source if source else 'N/A'
-                result_row['processed_company_name'] = company_name
-                
-                results.append(result_row)
-                time.sleep(0.5)  # Faster processing
-                
-            except Exception as e:
-                logger.error(f"Error processing row {idx + 1}: {str(e)}")
-                continue
-        
-        results_df = pd.DataFrame(results)
-        
-        output_filename = f"email_results_{int(time.time())}.csv"
-        output_path = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
-        results_df.to_csv(output_path, index=False)
+        # Only the company column is parsed to size the job
+        try:
+            total_rows, unique_companies = company_file.count_rows(filepath, filename, company_column)
+        except Exception as e:
+            os.remove(filepath)
+            return jsonify({'error': f'Error reading file: {str(e)}'}), 400
         
-        total_processed = len(results_df)
-        if total_processed > 0:
-            emails_found = len(results_df[results_df['found_email'] != 'Not found'])
-            success_rate = (emails_found / total_processed * 100)
-        else:
-            emails_found = 0
-            success_rate = 0
+        job_queue.enqueue(job_id, filepath, filename, company_column)
+        logger.info(f"Queued job {job_id} for {filename} ({total_rows} rows, {unique_companies} unique companies)")
         
-        # Prepare response with user-friendly messages
-        response_data = {
+        return jsonify({
             'success': True,
-            'total_companies': total_processed,
-            'emails_found': emails_found,
-            'success_rate': round(success_rate, 1),
-            'download_url': f'/download/{output_filename}',
-            'company_column_used': company_column
-        }
-        
-        # Add notification if file was large and limited
-        if len(df) > max_companies:
-            response_data['processing_note'] = f"File contained {len(df)} companies. Processed {max_companies} unique companies to prevent timeouts. For processing larger files, please contact support."
-            response_data['total_companies_in_file'] = len(df)
-        
-        return jsonify(response_data)
+            'job_id': job_id,
+            'status_url': f'/jobs/{job_id}',
+            'result_url': f'/jobs/{job_id}/result',
+            'company_column_used': company_column,
+            'total_companies_in_file': total_rows,
+            'unique_companies': unique_companies
+        }), 202
         
     except Exception as e:
         logger.error(f"Upload error: {str(e)}")
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+def process_upload_job(job):
+    """Job worker handler: find emails for every unique company in an uploaded file"""
+    job_id = job['id']
+    company_column = job['company_column']
+    
+    # Stream the file for the company names only (rows are re-read in order when the output is
+    # written) - no cap on the number of companies, the job runs in the background
+    pending_names = [
+        company_name for _, company_name in
+        company_file.iter_unique_rows(job['input_path'], job['input_filename'], company_column, usecols=[company_column])
+    ]
+    logger.info(f"Job {job_id}: processing {len(pending_names)} unique companies")
+    
+    # Rows are appended to the output as soon as they and every row above them are done,
+    # so /jobs/<id>/result can hand out a partial file while the job runs
+    output_path = os.path.join(job_queue.job_dir(job_id), f"email_results_{job_id}.csv")
+    output = result_writer.OrderedResultWriter(
+        result_writer.CsvResultWriter(output_path),
+        company_file.iter_unique_rows(job['input_path'], job['input_filename'], company_column),
+        format_result_row,
+        unique_companies=True
+    )
+    # A resumed job rewrites its output from the top
+    job_queue.update_job(job_id, output_path=output_path, output_bytes=0)
+    
+    # Companies finished before a restart come from the job checkpoint and are not searched again
+    # (those cut off by the time budget get another go)
+    checkpointed = {
+        company_name: result for company_name, result in job_queue.completed_results(job_id).items()
+        if not deadline.is_cut_off(result['source'])
+    }
+    if checkpointed:
+        logger.info(f"Job {job_id}: resuming with {len(checkpointed)} companies already done")
+    
+    # Reuse results from earlier uploads before doing any network work
+    cached_results = result_cache.get_many(
+        company_name for company_name in pending_names if company_name not in checkpointed
+    )
+    names_to_search = list(dict.fromkeys(
+        company_name for company_name in pending_names
+        if company_name not in checkpointed and company_name not in cached_results
+    ))
+    logger.info(f"Result cache: {len(cached_results)} hits, {len(names_to_search)} companies to search")
+    
+    # Checkpoint cache hits straight away (they also stream to /jobs/<id>/events)
+    job_queue.add_results(job_id, [
+        dict(cached_results[company_name], company=company_name, elapsed=0, cached=True)
+        for company_name in dict.fromkeys(name for name in pending_names if name in cached_results)
+    ])
+    
+    company_results = dict(checkpointed)
+    company_results.update(
+        (company_name, dict(result, cached=True)) for company_name, result in cached_results.items()
+    )
+    for company_name, result in company_results.items():
+        output.add(company_name, result)
+    done_rows = [company_name for company_name in pending_names if company_name in company_results]
+    cache_hits = sum(1 for company_name in done_rows if company_results[company_name].get('cached'))
+    progress = {
+        'processed': len(done_rows),
+        'emails_found': sum(1 for company_name in done_rows if company_results[company_name]['email'])
+    }
+    job_queue.update_job(job_id, total=len(pending_names), cache_hits=cache_hits,
+                         output_bytes=output.bytes_written, **progress)
+    
+    def record_result(index, company_name, result):
+        # A search cut short by the budget isn't an answer worth reusing
+        if result['email'] or not deadline.is_cut_off(result['source']):
+            result_cache.put(company_name, result['email'], result['source'], result['website'])
+        job_queue.add_results(job_id, [dict(result, company=company_name)])
+        output.add(company_name, result)
+        progress['processed'] += 1
+        if result['email']:
+            progress['emails_found'] += 1
+        job_queue.update_job(job_id, output_bytes=output.bytes_written, **progress)
+        logger.info(f"Job {job_id}: {progress['processed']}/{len(pending_names)} {company_name}: {result['email'] if result['email'] else 'Not found'}")
+    
+    # Large batches are split across worker processes; small ones run on this process's event loop
+    try:
+        searched = shard_executor.run_companies(
+            names_to_search, on_result=record_result, trace_path=job_trace_path(job_id)
+        )
+        company_results.update(zip(names_to_search, searched))
+        # Results on_result never saw (e.g. a callback that failed) still make it into the file
+        for company_name, result in zip(names_to_search, searched):
+            output.add(company_name, result)
+    finally:
+        output.close()
+    hit_stats.flush()
+    
+    return {
+        'processed': output.rows_written,
+        'emails_found': sum(1 for company_name in pending_names if company_results[company_name]['email']),
+        'output_path': output_path
+    }
+
+def job_trace_path(job_id):
+    """SQLite file with the per-company traces of a job (next to its input and output)"""
+    return os.path.join(job_queue.job_dir(job_id), 'traces.db')
+
+def format_result_row(row, company_name, result):
+    """Output row: the company's first input row plus what was found"""
+    return PIPELINE.format_row(dict(result, row=row, company=company_name), 'annotated')
+
+def job_status_payload(job):
+    """Public view of a job row"""
+    total = job['total'] or 0
+    processed = job['processed'] or 0
+    emails_found = job['emails_found'] or 0
+    payload = {
+        'success': job['status'] != 'failed',
+        'job_id': job['id'],
+        'status': job['status'],
+        'total_companies': total,
+        'processed': processed,
+        'emails_found': emails_found,
+        'cache_hits': job['cache_hits'] or 0,
+        'success_rate': round(emails_found / processed * 100, 1) if processed else 0,
+        'progress': round(processed / total * 100, 1) if total else 0,
+        'company_column_used': job['company_column'],
+        'created_at': job['created_at'],
+        'finished_at': job['finished_at']
+    }
+    if job['status'] == 'completed':
+        payload['download_url'] = f"/jobs/{job['id']}/result"
+    elif job['output_path']:
+        # Rows finished so far can already be downloaded
+        payload['partial_download_url'] = f"/jobs/{job['id']}/result"
+    if job['error']:
+        payload['error'] = job['error']
+    payload['slowest_url'] = f"/jobs/{job['id']}/slowest"
+    return payload
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_queue.get_job(secure_filename(job_id))
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_status_payload(job))
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = job_queue.get_job(secure_filename(job_id))
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if not job['output_path'] or not os.path.exists(job['output_path']):
+        return jsonify({'error': 'Result not ready', 'status': job['status']}), 409
+    if job['status'] == 'completed':
+        return send_file(job['output_path'], as_attachment=True, download_name=f"email_results_{job['id']}.csv")
+    
+    # Still running (or stopped early): send the rows written so far, up to the end of the
+    # last complete row the job recorded
+    size = min(job['output_bytes'] or 0, os.path.getsize(job['output_path']))
+    return Response(
+        result_writer.iter_file_prefix(job['output_path'], size),
+        mimetype='text/csv',
+        headers={
+            'Content-Disposition': f"attachment; filename=email_results_{job['id']}_partial.csv",
+            'Content-Length': str(size),
+            'X-Result-Partial': 'true',
+            'X-Job-Status': job['status']
+        }
+    )
+
+@app.route('/jobs/<job_id>/trace/<path:company>')
+def job_trace(job_id, company):
+    """Every request made for one company of a job: stage, timings, status, bytes and outcome"""
+    job = job_queue.get_job(secure_filename(job_id))
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    trace = tracing.TraceStore(job_trace_path(job['id'])).get(company)
+    if not trace:
+        # Companies answered from the result cache or a checkpoint were never searched
+        return jsonify({'error': 'No trace for this company (not searched yet, or served from cache)'}), 404
+    return jsonify(trace)
+
+@app.route('/jobs/<job_id>/slowest')
+def job_slowest(job_id):
+    """The job's slowest companies with their per-stage times and slowest requests"""
+    job = job_queue.get_job(secure_filename(job_id))
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    limit = min(max(request.args.get('n', 20, type=int), 1), 500)
+    companies = tracing.TraceStore(job_trace_path(job['id'])).slowest(limit)
+    for company in companies:
+        company['trace_url'] = f"/jobs/{job['id']}/trace/{quote(company['company'])}"
+    return jsonify({'job_id': job['id'], 'status': job['status'], 'companies': companies})
+
+@app.route('/jobs/<job_id>/resume', methods=['POST'])
+def resume_job(job_id):
+    """Re-queue a failed or interrupted job; companies already checkpointed are skipped"""
+    job_id = secure_filename(job_id)
+    job = job_queue.get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if not job_queue.resume(job_id):
+        return jsonify({'error': f"Job is {job['status']} and cannot be resumed", 'status': job['status']}), 409
+    return jsonify(job_status_payload(job_queue.get_job(job_id))), 202
+
+# Each SSE connection is closed after this long; the browser's EventSource reconnects with
+# Last-Event-ID, so no single response holds a worker and proxy connection for the whole job
+SSE_MAX_STREAM_SECONDS = int(os.environ.get('SSE_MAX_STREAM_SECONDS', 50))
+SSE_POLL_INTERVAL = float(os.environ.get('SSE_POLL_INTERVAL', 1.0))
+
+def sse_event(event, data, event_id=None):
+    """Format one Server-Sent Events message"""
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data, default=str)}\n\n"
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream per-company results as they complete (Server-Sent Events)"""
+    job_id = secure_filename(job_id)
+    if not job_queue.get_job(job_id):
+        return jsonify({'error': 'Job not found'}), 404
+    
+    try:
+        last_seq = int(request.headers.get('Last-Event-ID') or request.args.get('after', 0))
+    except ValueError:
+        last_seq = 0
+    
+    def generate():
+        nonlocal last_seq
+        started = time.monotonic()
+        yield "retry: 1000\n\n"
+        last_progress = None
+        while True:
+            for result in job_queue.results_since(job_id, last_seq):
+                last_seq = result['seq']
+                yield sse_event('result', {
+                    'company': result['company'],
+                    'email': result['email'] or 'Not found',
+                    'source': result['source'] or 'N/A',
+                    'elapsed': result['elapsed'],
+                    'cached': bool(result['cached'])
+                }, event_id=last_seq)
+            
+            job = job_queue.get_job(job_id)
+            status = job_status_payload(job)
+            if job['status'] in ('completed', 'failed'):
+                if not job_queue.results_since(job_id, last_seq, limit=1):
+                    yield sse_event('done', status, event_id=last_seq)
+                    return
+                continue
+            
+            progress = (status['processed'], status['total_companies'], status['status'])
+            if progress != last_progress:
+                last_progress = progress
+                yield sse_event('progress', status, event_id=last_seq)
+            else:
+                yield ": keep-alive\n\n"
+            
+            if time.monotonic() - started > SSE_MAX_STREAM_SECONDS:
+                return
+            time.sleep(SSE_POLL_INTERVAL)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/download/<filename>')
 def download_file(filename):
     try:
@@ -961,6 +617,21 @@ def download_file(filename):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Background workers for queued uploads (JOB_WORKERS=0 disables them in this process)
+job_queue.start_workers(process_upload_job)
+
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='FashionGo email finder')
+    parser.add_argument('--resume', metavar='JOB_ID', action='append', default=[],
+                        help='re-queue an interrupted job before starting (repeatable)')
+    parser.add_argument('--resume-interrupted', action='store_true',
+                        help='re-queue every failed or interrupted job before starting')
+    args = parser.parse_args()
+    
+    for job_id in args.resume + (job_queue.interrupted_job_ids() if args.resume_interrupted else []):
+        if not job_queue.resume(job_id):
+            logger.warning(f"Job {job_id} cannot be resumed")
+    
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=False, host='0.0.0.0', port=port) 
\ No newline at end of file
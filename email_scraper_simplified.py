@@ -1,14 +1,13 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
-import re
 import os
 import time
 import tempfile
 import logging
 from werkzeug.utils import secure_filename
 import platform
+import scraper_engine
+import metrics
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
@@ -17,441 +16,11 @@ app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
-
-def clean_company_name(name):
-    if pd.isna(name) or name is None or str(name).strip() == '':
-        return None
-    
-    name = str(name).strip()
-    suffixes = [' LLC', ' Inc', ' Corp', ' Corporation', ' Ltd', ' Limited', ' Co', ' Company']
-    for suffix in suffixes:
-        if name.upper().endswith(suffix.upper()):
-            name = name[:-len(suffix)].strip()
-    
-    return name if name else None
-
-def find_emails_on_page(url, timeout=5):
-    """Enhanced email extraction from webpages with better filtering"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-        }
-        
-        response = requests.get(url, headers=headers, timeout=timeout, allow_redirects=True)
-        response.raise_for_status()
-        
-        # Find emails using multiple patterns
-        text_content = response.text.lower()
-        
-        # Enhanced email patterns
-        email_patterns = [
-            re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'),
-            re.compile(r'mailto:([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})'),
-            re.compile(r'"([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})"'),
-            re.compile(r"'([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})'")
-        ]
-        
-        all_emails = []
-        for pattern in email_patterns:
-            emails = pattern.findall(response.text)
-            all_emails.extend(emails)
-        
-        # Remove duplicates and filter out unwanted emails
-        emails = list(set(all_emails))
-        filtered_emails = []
-        
-        for email in emails:
-            email_lower = email.lower()
-            # Skip common non-business emails
-            skip_domains = ['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'aol.com', 
-                          'icloud.com', 'live.com', 'msn.com', 'qq.com', '163.com', 'sina.com',
-                          'noreply', 'no-reply', 'donotreply', 'support@wordpress.com', 
-                          'wpchill.com', 'example.com', 'test.com', 'localhost']
-            
-            skip_prefixes = ['noreply', 'no-reply', 'donotreply', 'automated', 'robot', 'system']
-            
-            if any(domain in email_lower for domain in skip_domains):
-                continue
-            if any(email_lower.startswith(prefix) for prefix in skip_prefixes):
-                continue
-            if len(email) < 5 or len(email) > 100:
-                continue
-                
-            filtered_emails.append(email)
-        
-        # Prioritize business emails
-        business_emails = []
-        other_emails = []
-        
-        business_prefixes = ['info', 'contact', 'sales', 'support', 'admin', 'hello', 'inquiry']
-        for email in filtered_emails:
-            if any(email.lower().startswith(prefix) for prefix in business_prefixes):
-                business_emails.append(email)
-            else:
-                other_emails.append(email)
-        
-        # Return business emails first, then others
-        final_emails = business_emails + other_emails
-        return final_emails[:5] if final_emails else []
-        
-    except Exception as e:
-        logger.warning(f"Error finding emails on {url}: {str(e)}")
-        return []
-
-def search_for_website(company_name, max_attempts=3):
-    """Enhanced website discovery using multiple search engines and direct guessing"""
-    if not company_name:
-        return None
-    
-    clean_name = clean_company_name(company_name)
-    if not clean_name:
-        return None
-    
-    websites_found = []
-    
-    # Strategy 1: Direct domain guessing (most reliable)
-    direct_domains = generate_direct_domains(clean_name)
-    for domain in direct_domains[:20]:  # Check top 20 most likely domains
-        try:
-            test_url = f"http://{domain}"
-            response = requests.head(test_url, timeout=3, allow_redirects=True)
-            if response.status_code == 200:
-                final_url = response.url
-                if final_url.startswith('https://'):
-                    websites_found.append(final_url)
-                else:
-                    websites_found.append(f"https://{domain}")
-                break
-        except:
-            try:
-                test_url = f"https://{domain}"
-                response = requests.head(test_url, timeout=3, allow_redirects=True)
-                if response.status_code == 200:
-                    websites_found.append(response.url)
-                    break
-            except:
-                continue
-    
-    # Strategy 2: Search engines (if direct guessing fails)
-    if not websites_found:
-        search_engines = [
-            f"https://www.bing.com/search?q={clean_name.replace(' ', '+')}+website",
-            f"https://search.yahoo.com/search?p={clean_name.replace(' ', '+')}+official+site"
-        ]
-        
-        for search_url in search_engines:
-            try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-                response = requests.get(search_url, headers=headers, timeout=8)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                links = soup.find_all('a', href=True)
-                
-                for link in links[:10]:
-                    if hasattr(link, 'get'):
-                        href_attr = link.get('href', '')
-                        href = str(href_attr) if href_attr else ''
-                        if 'http' in href and not any(exclude in href.lower() for exclude in 
-                            ['google.', 'bing.', 'yahoo.', 'facebook.', 'linkedin.', 'twitter.', 
-                             'instagram.', 'youtube.', 'wikipedia.', 'amazon.', 'ebay.']):
-                            
-                            # Clean the URL
-                            if href.startswith('/url?q='):
-                                href = href.split('/url?q=')[1].split('&')[0]
-                            
-                            # Validate domain
-                            try:
-                                domain = href.split('//')[1].split('/')[0].lower()
-                                if any(term in domain for term in clean_name.lower().split()):
-                                    websites_found.append(href)
-                                    break
-                            except:
-                                continue
-                
-                if websites_found:
-                    break
-                    
-            except Exception as e:
-                logger.warning(f"Search engine {search_url} failed: {str(e)}")
-                continue
-    
-    return websites_found[0] if websites_found else None
-
-def generate_direct_domains(company_name):
-    """Generate potential domain names for a company"""
-    if not company_name:
-        return []
-    
-    name = company_name.lower().strip()
-    words = re.findall(r'\b\w+\b', name)
-    domains = []
-    
-    # TLDs to try
-    tlds = ['.com', '.net', '.org', '.biz', '.info', '.co', '.io', '.us']
-    
-    if words:
-        # Full company name variations
-        full_name = ''.join(words)
-        full_name_dash = '-'.join(words)
-        full_name_underscore = '_'.join(words)
-        
-        # Add full name variations
-        for tld in tlds:
-            domains.extend([
-                f"{full_name}{tld}",
-                f"{full_name_dash}{tld}",
-                f"{full_name_underscore}{tld}"
-            ])
-        
-        # Single word (if company name is one word or use first word)
-        first_word = words[0]
-        for tld in tlds:
-            domains.append(f"{first_word}{tld}")
-        
-        # Two words combinations
-        if len(words) >= 2:
-            for i in range(len(words)-1):
-                combo = words[i] + words[i+1]
-                combo_dash = words[i] + '-' + words[i+1]
-                for tld in tlds:
-                    domains.extend([f"{combo}{tld}", f"{combo_dash}{tld}"])
-        
-        # Abbreviations (first letter of each word)
-        if len(words) >= 2:
-            abbrev = ''.join(word[0] for word in words)
-            for tld in tlds:
-                domains.append(f"{abbrev}{tld}")
-        
-        # Common variations
-        variations = []
-        for word in words:
-            if word.endswith('y'):
-                variations.append(word[:-1] + 'ie')
-            if word.endswith('s'):
-                variations.append(word[:-1])
-        
-        for var in variations:
-            for tld in tlds[:3]:  # Only try main TLDs for variations
-                domains.append(f"{var}{tld}")
-    
-    return domains
-
-def find_contact_pages(base_url):
-    """Enhanced contact page discovery with 20+ common page variations"""
-    contact_pages = [
-        '/contact', '/contact-us', '/contact_us', '/contactus',
-        '/support', '/help', '/customer-service', '/customer_service',
-        '/sales', '/sales-team', '/business', '/enterprise',
-        '/about', '/about-us', '/about_us', '/team',
-        '/reach-us', '/get-in-touch', '/touch', '/connect',
-        '/inquiry', '/inquiries', '/quote', '/request-quote',
-        '/info', '/information', '/details', '/reach'
-    ]
-    
-    found_pages = []
-    for page in contact_pages:
-        try:
-            page_url = base_url.rstrip('/') + page
-            response = requests.head(page_url, timeout=3, allow_redirects=True)
-            if response.status_code == 200:
-                found_pages.append(page_url)
-        except:
-            continue
-    
-    return found_pages
-
-def find_dynamic_contact_links(website):
-    """Dynamically find contact-related links by parsing the homepage"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(website, headers=headers, timeout=5)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        contact_links = []
-        
-        # Find links with contact-related text or hrefs
-        contact_keywords = ['contact', 'support', 'help', 'sales', 'inquiry', 'reach', 'connect', 'touch', 'about']
-        
-        for link in soup.find_all('a', href=True):
-            href_attr = link.get('href', '')
-            href = str(href_attr).lower() if href_attr else ''
-            text = str(link.get_text()).lower().strip()
-            
-            if any(keyword in href or keyword in text for keyword in contact_keywords):
-                if href.startswith('/'):
-                    contact_links.append(website.rstrip('/') + href)
-                elif href.startswith('http'):
-                    contact_links.append(href)
-        
-        return list(set(contact_links))[:10]  # Return unique links, max 10
-        
-    except Exception as e:
-        logger.warning(f"Error finding dynamic contact links: {str(e)}")
-        return []
-
-def guess_email_formats(website, company_name):
-    """Guess common email formats when website is found but no emails are extracted"""
-    if not website or not company_name:
-        return []
-    
-    try:
-        # Extract domain from website
-        domain = website.replace('https://', '').replace('http://', '').split('/')[0]
-        
-        # Common email prefixes for businesses
-        prefixes = ['info', 'contact', 'sales', 'support', 'admin', 'hello', 'inquiry', 'office']
-        
-        guessed_emails = []
-        for prefix in prefixes:
-            email = f"{prefix}@{domain}"
-            
-            # Quick validation attempt
-            try:
-                test_response = requests.head(f"https://{domain}", timeout=2)
-                if test_response.status_code == 200:
-                    guessed_emails.append(email)
-            except:
-                continue
-        
-        return guessed_emails[:3]  # Return top 3 guesses
-        
-    except Exception as e:
-        logger.warning(f"Error guessing email formats: {str(e)}")
-        return []
-
-def check_subdomains_for_emails(website, company_name):
-    """Check common subdomains for additional email addresses"""
-    if not website:
-        return None
-    
-    try:
-        # Extract main domain
-        domain = website.replace('https://', '').replace('http://', '').split('/')[0]
-        
-        # Common subdomains that might have contact info
-        subdomains = ['blog', 'support', 'help', 'www', 'mail', 'contact']
-        
-        for subdomain in subdomains:
-            try:
-                subdomain_url = f"https://{subdomain}.{domain}"
-                emails = find_emails_on_page(subdomain_url, timeout=3)
-                if emails:
-                    return emails, subdomain_url
-            except:
-                continue
-        
-        return None
-        
-    except Exception as e:
-        logger.warning(f"Error checking subdomains: {str(e)}")
-        return None
-
-def process_companies(companies_df):
-    """Enhanced processing with 5-layer email extraction strategy"""
-    results = []
-    processed_companies = set()
-    
-    # Remove duplicates and limit to 100 companies
-    unique_companies = []
-    for _, row in companies_df.iterrows():
-        company_name = clean_company_name(row.get('company', ''))
-        if company_name and company_name not in processed_companies:
-            unique_companies.append({'company': company_name, 'original_row': row})
-            processed_companies.add(company_name)
-        
-        if len(unique_companies) >= 300:
-            break
-    
-    for i, company_data in enumerate(unique_companies):
-        company_name = company_data['company']
-        original_row = company_data['original_row']
-        
-        logger.info(f"Processing {i+1}/{len(unique_companies)}: {company_name}")
-        
-        try:
-            email, source = find_company_email_enhanced(company_name)
-            
-            result = {
-                'company': company_name,
-                'email': email if email else 'Not found',
-                'source': source if source else 'No source available'
-            }
-            
-            # Add any additional columns from original data
-            for col in original_row.index:
-                if col.lower() not in ['company']:
-                    result[col] = original_row[col]
-            
-            results.append(result)
-            
-        except Exception as e:
-            logger.error(f"Error processing {company_name}: {str(e)}")
-            result = {
-                'company': company_name,
-                'email': 'Error occurred',
-                'source': f'Error: {str(e)}'
-            }
-            results.append(result)
-        
-        # Delay to avoid overwhelming servers
-        time.sleep(0.5)
-    
-    return results
-
-def find_company_email_enhanced(company_name):
-    """5-layer enhanced email finding strategy for maximum success rate"""
-    if not company_name:
-        return None, "No company name provided"
-    
-    logger.info(f"Starting enhanced email search for: {company_name}")
-    
-    # Strategy 1: Find company website
-    website = search_for_website(company_name)
-    if not website:
-        return None, f"Website not found for {company_name}"
-    
-    logger.info(f"Found website: {website}")
-    
-    # Strategy 2: Check homepage for emails
-    homepage_emails = find_emails_on_page(website)
-    if homepage_emails:
-        return homepage_emails[0], f"Homepage: {website}"
-    
-    # Strategy 3: Check dedicated contact pages (20+ variations)
-    contact_pages = find_contact_pages(website)
-    for contact_page in contact_pages:
-        contact_emails = find_emails_on_page(contact_page)
-        if contact_emails:
-            return contact_emails[0], f"Contact page: {contact_page}"
-    
-    # Strategy 4: Dynamic contact link discovery
-    dynamic_links = find_dynamic_contact_links(website)
-    for link in dynamic_links:
-        dynamic_emails = find_emails_on_page(link)
-        if dynamic_emails:
-            return dynamic_emails[0], f"Dynamic link: {link}"
-    
-    # Strategy 5: Email format guessing
-    guessed_emails = guess_email_formats(website, company_name)
-    if guessed_emails:
-        return guessed_emails[0], f"Guessed format: {website}"
-    
-    # Strategy 6: Subdomain checking (final fallback)
-    subdomain_email = check_subdomains_for_emails(website, company_name)
-    if subdomain_email:
-        return subdomain_email[0], f"Subdomain: {subdomain_email[1]}"
-    
-    return None, f"No emails found on {website}"
+# The engine's exhaustive profile without the social media step, capped at 300 companies per upload
+PIPELINE = scraper_engine.Pipeline(
+    'exhaustive', steps=('site_pages', 'email_guess', 'subdomains'), max_companies=300
+)
+find_company_email_enhanced = PIPELINE.find_email
 
 @app.route('/')
 def index():
@@ -583,7 +152,7 @@ def upload_file():
             return jsonify({'success': False, 'error': f'No "company" column found. Available columns: {available_columns}'})
         
         # Process companies
-        results = process_companies(df)
+        results = [PIPELINE.format_row(result) for result in PIPELINE.process(df.to_dict('records'))]
         
         # Create results DataFrame
         results_df = pd.DataFrame(results)
@@ -642,6 +211,11 @@ def health():
             'timestamp': time.strftime('%Y-%m-%d %H:%M:%S UTC')
         }), 500
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics: per-stage and per-request timings, bytes and results by strategy"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/korea-test')
 def korea_test():
     """Special endpoint for testing Korea connectivity"""
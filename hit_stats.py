@@ -0,0 +1,216 @@
+import os
+import time
+import atexit
+import sqlite3
+import logging
+import tempfile
+import threading
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.environ.get('SCRAPER_DATA_DIR', os.path.join(tempfile.gettempdir(), 'fashiongo_scraper'))
+HIT_STATS_PATH = os.environ.get('HIT_STATS_PATH', os.path.join(DATA_DIR, 'hit_stats.db'))
+HIT_STATS_ENABLED = os.environ.get('HIT_STATS_ENABLED', '1') != '0'
+# Attempts of a kind needed before its learned order replaces the built-in one
+HIT_STATS_MIN_SAMPLES = int(os.environ.get('HIT_STATS_MIN_SAMPLES', 50))
+# Weight of the kind-wide hit rate when smoothing a candidate's yield (pseudo-attempts)
+HIT_STATS_PRIOR = float(os.environ.get('HIT_STATS_PRIOR', 10))
+# Candidates with at least this many attempts and a yield at or below the floor are skipped
+HIT_STATS_PRUNE_AFTER = int(os.environ.get('HIT_STATS_PRUNE_AFTER', 300))
+HIT_STATS_PRUNE_BELOW = float(os.environ.get('HIT_STATS_PRUNE_BELOW', 0.0))
+# How often recorded counts are written out / re-read (seconds)
+HIT_STATS_FLUSH_INTERVAL = float(os.environ.get('HIT_STATS_FLUSH_INTERVAL', 30))
+HIT_STATS_REFRESH = float(os.environ.get('HIT_STATS_REFRESH', 60))
+
+_lock = threading.Lock()
+_init_lock = threading.Lock()
+_initialized = False
+_pending = {}
+_last_flush = time.monotonic()
+_snapshot = None
+_snapshot_at = 0
+# Due flushes run on a writer thread, started on first use
+_writer = None
+_wake = threading.Event()
+
+
+def _connect():
+    global _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                os.makedirs(os.path.dirname(HIT_STATS_PATH) or '.', exist_ok=True)
+                conn = sqlite3.connect(HIT_STATS_PATH, timeout=30)
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS candidate_stats (
+                        kind TEXT NOT NULL,
+                        value TEXT NOT NULL,
+                        attempts INTEGER DEFAULT 0,
+                        hits INTEGER DEFAULT 0,
+                        updated_at REAL,
+                        PRIMARY KEY (kind, value)
+                    )
+                ''')
+                conn.commit()
+                conn.close()
+                _initialized = True
+    return sqlite3.connect(HIT_STATS_PATH, timeout=30)
+
+
+def record(kind, value, hit):
+    """Count one attempt of a candidate (contact path, TLD, strategy, ...) and whether it produced a hit"""
+    if not HIT_STATS_ENABLED:
+        return
+    with _lock:
+        counts = _pending.setdefault((kind, value), [0, 0])
+        counts[0] += 1
+        counts[1] += 1 if hit else 0
+        due = time.monotonic() - _last_flush > HIT_STATS_FLUSH_INTERVAL
+    if due:
+        _flush_soon()
+
+
+def _flush_soon():
+    """Have the writer thread flush, so record() never blocks an event loop on SQLite"""
+    global _writer
+    with _lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_loop, name='hit-stats-writer', daemon=True)
+            _writer.start()
+    _wake.set()
+
+
+def _write_loop():
+    while True:
+        _wake.wait()
+        _wake.clear()
+        flush()
+
+
+def flush():
+    """Write buffered counts to disk (blocking; record() hands due flushes to the writer thread)"""
+    global _last_flush, _pending
+    with _lock:
+        pending, _pending = _pending, {}
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+    try:
+        conn = _connect()
+        try:
+            now = time.time()
+            conn.executemany(
+                'INSERT INTO candidate_stats (kind, value, attempts, hits, updated_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (kind, value) DO UPDATE SET attempts = attempts + excluded.attempts, '
+                'hits = hits + excluded.hits, updated_at = excluded.updated_at',
+                [(kind, value, attempts, hits, now) for (kind, value), (attempts, hits) in pending.items()]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"Hit stats write failed: {str(e)}")
+
+
+atexit.register(flush)
+
+
+def load(refresh=False):
+    """{kind: {value: (attempts, hits)}}, cached for HIT_STATS_REFRESH seconds"""
+    global _snapshot, _snapshot_at
+    if not refresh and _snapshot is not None and time.monotonic() - _snapshot_at < HIT_STATS_REFRESH:
+        return _snapshot
+    stats = {}
+    try:
+        conn = _connect()
+        try:
+            for kind, value, attempts, hits in conn.execute(
+                'SELECT kind, value, attempts, hits FROM candidate_stats'
+            ):
+                stats.setdefault(kind, {})[value] = (attempts, hits)
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"Hit stats read failed: {str(e)}")
+    _snapshot, _snapshot_at = stats, time.monotonic()
+    return stats
+
+
+def _scores(kind, candidates):
+    """Smoothed yield per candidate (hits per attempt, pulled toward the kind-wide rate)"""
+    counts = load().get(kind, {})
+    total_attempts = sum(attempts for attempts, _ in counts.values())
+    total_hits = sum(hits for _, hits in counts.values())
+    base_rate = total_hits / total_attempts if total_attempts else 0.0
+    scores = {}
+    for candidate in candidates:
+        attempts, hits = counts.get(candidate, (0, 0))
+        scores[candidate] = (hits + HIT_STATS_PRIOR * base_rate) / (attempts + HIT_STATS_PRIOR)
+    return scores, counts, total_attempts
+
+
+def _pruned(counts, candidate):
+    attempts, hits = counts.get(candidate, (0, 0))
+    return attempts >= HIT_STATS_PRUNE_AFTER and hits / attempts <= HIT_STATS_PRUNE_BELOW
+
+
+def ranked(kind, candidates):
+    """Candidates reordered by observed yield (best first), with proven dead ends dropped.
+
+    Falls back to the given order until the kind has HIT_STATS_MIN_SAMPLES attempts;
+    ties keep their original relative order.
+    """
+    candidates = list(candidates)
+    if not HIT_STATS_ENABLED or not candidates:
+        return candidates
+    scores, counts, total_attempts = _scores(kind, candidates)
+    if total_attempts < HIT_STATS_MIN_SAMPLES:
+        return candidates
+    ordered = sorted(candidates, key=lambda candidate: -scores[candidate])
+    kept = [candidate for candidate in ordered if not _pruned(counts, candidate)]
+    return kept or ordered[:1]
+
+
+def report(defaults=None):
+    """Current ranking per kind, for the stats endpoint.
+
+    defaults maps kind -> built-in candidate list, so candidates never tried still show up.
+    """
+    flush()
+    stats = load(refresh=True)
+    kinds = set(stats) | set(defaults or {})
+    result = {}
+    for kind in sorted(kinds):
+        candidates = list(dict.fromkeys(list((defaults or {}).get(kind, [])) + list(stats.get(kind, {}))))
+        scores, counts, total_attempts = _scores(kind, candidates)
+        order = ranked(kind, candidates)
+        position = {candidate: i + 1 for i, candidate in enumerate(order)}
+        result[kind] = {
+            'total_attempts': total_attempts,
+            'learned': total_attempts >= HIT_STATS_MIN_SAMPLES,
+            'candidates': sorted((
+                {
+                    'value': candidate,
+                    'rank': position.get(candidate),
+                    'attempts': counts.get(candidate, (0, 0))[0],
+                    'hits': counts.get(candidate, (0, 0))[1],
+                    'yield': round(scores[candidate], 4),
+                    'pruned': candidate not in position
+                } for candidate in candidates
+            ), key=lambda row: (row['rank'] is None, row['rank'] or 0))
+        }
+    return result
+
+
+# The stats file is shared, so worker processes' counts are in this view already
+@metrics.register_collector(exported=False)
+def _hit_metrics():
+    stats = load()
+    return [
+        ('scraper_hit_stats_attempts', 'gauge', 'Recorded attempts per candidate (persisted across restarts)',
+         [({'kind': kind, 'value': value}, attempts) for kind, counts in stats.items() for value, (attempts, _) in counts.items()]),
+        ('scraper_hit_stats_hits', 'gauge', 'Recorded hits per candidate (persisted across restarts)',
+         [({'kind': kind, 'value': value}, hits) for kind, counts in stats.items() for value, (_, hits) in counts.items()]),
+    ]
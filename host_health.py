@@ -0,0 +1,260 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import aiohttp
+import requests
+from urllib.parse import urlparse
+import metrics
+
+logger = logging.getLogger(__name__)
+
+HOST_BREAKER_ENABLED = os.environ.get('HOST_BREAKER_ENABLED', '1') != '0'
+# Consecutive failures (connection errors, timeouts, slow answers) that open a host's breaker
+HOST_FAILURE_THRESHOLD = int(os.environ.get('HOST_FAILURE_THRESHOLD', 3))
+# How long an open breaker short-circuits requests; doubles each time a trial request fails
+HOST_BREAKER_COOLDOWN = float(os.environ.get('HOST_BREAKER_COOLDOWN', 300))
+HOST_BREAKER_MAX_COOLDOWN = float(os.environ.get('HOST_BREAKER_MAX_COOLDOWN', 3600))
+# Responses slower than this count as failures (seconds)
+HOST_SLOW_SECONDS = float(os.environ.get('HOST_SLOW_SECONDS', 4.0))
+
+# Errors that say something about the host itself (not about our request)
+HOST_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    aiohttp.ClientConnectionError,
+    asyncio.TimeoutError,
+    OSError
+)
+TIMEOUT_ERRORS = (requests.exceptions.Timeout, asyncio.TimeoutError, TimeoutError)
+
+_MAX_TRACKED_HOSTS = 10000
+
+
+class HostUnavailable(requests.exceptions.ConnectionError):
+    """Request short-circuited because the host's breaker is open"""
+
+
+def is_host_error(error):
+    """True for errors that count against the host (every requests exception is an OSError, but
+    only connection errors and timeouts say the host is unwell - not TooManyRedirects etc.)"""
+    if isinstance(error, HostUnavailable):
+        return False
+    if isinstance(error, requests.exceptions.RequestException):
+        return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+    return isinstance(error, HOST_ERRORS)
+
+
+def health_key(url):
+    """Host a request's health is tracked under (www. is the same site)"""
+    host = (urlparse(url if '://' in url else f"http://{url}").hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def parent_keys(key):
+    """The host and its parent domains down to two labels (shop.acme.com -> shop.acme.com, acme.com)"""
+    parts = key.split('.')
+    return ['.'.join(parts[i:]) for i in range(max(1, len(parts) - 1))]
+
+
+class HostHealth:
+    """Counters and breaker state of one host"""
+
+    __slots__ = ('requests', 'failures', 'timeouts', 'consecutive_failures', 'latency',
+                 'opened_until', 'cooldown', 'trips', 'probing', 'short_circuited')
+
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.consecutive_failures = 0
+        # Moving average of request latency (seconds)
+        self.latency = None
+        self.opened_until = 0
+        self.cooldown = 0
+        self.trips = 0
+        self.probing = False
+        self.short_circuited = 0
+
+    def state(self, now=None):
+        if not self.opened_until:
+            return 'closed'
+        return 'open' if (now or time.monotonic()) < self.opened_until else 'half_open'
+
+
+class HostHealthRegistry:
+    """Per-host failure tracking with a circuit breaker.
+
+    After HOST_FAILURE_THRESHOLD consecutive failures a host is skipped for a cooldown; its
+    subdomains are skipped with it. Once the cooldown is over one trial request is let through:
+    success closes the breaker, failure reopens it for twice as long.
+    """
+
+    def __init__(self, failure_threshold=None, cooldown=None, max_cooldown=None, slow_seconds=None):
+        self.failure_threshold = HOST_FAILURE_THRESHOLD if failure_threshold is None else failure_threshold
+        self.cooldown = HOST_BREAKER_COOLDOWN if cooldown is None else cooldown
+        self.max_cooldown = HOST_BREAKER_MAX_COOLDOWN if max_cooldown is None else max_cooldown
+        self.slow_seconds = HOST_SLOW_SECONDS if slow_seconds is None else slow_seconds
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _blocking_key(self, key, now):
+        """Key of an open breaker covering this host (itself or a parent domain), if any"""
+        for candidate in parent_keys(key):
+            health = self._hosts.get(candidate)
+            if health is None or not health.opened_until:
+                continue
+            if now < health.opened_until:
+                return candidate
+            # Half open: only the host's own trial request goes through
+            if candidate == key and health.probing:
+                return candidate
+        return None
+
+    def is_open(self, url):
+        """True while requests to url would be short-circuited"""
+        if not HOST_BREAKER_ENABLED:
+            return False
+        key = health_key(url)
+        with self._lock:
+            return self._blocking_key(key, time.monotonic()) is not None
+
+    def admit(self, url, trial=True):
+        """Let a request to url through, or raise HostUnavailable; returns the health key.
+
+        With trial=False this is only a check: a half-open host's trial slot is not taken.
+        """
+        key = health_key(url)
+        if not HOST_BREAKER_ENABLED:
+            return key
+        now = time.monotonic()
+        with self._lock:
+            blocking = self._blocking_key(key, now)
+            if blocking is not None:
+                blocker = self._hosts[blocking]
+                blocker.short_circuited += 1
+                raise HostUnavailable(f"Circuit open for {blocking} ({blocker.consecutive_failures} failures in a row)")
+            health = self._hosts.get(key)
+            if trial and health is not None and health.state(now) == 'half_open':
+                # Cooldown is over: this request is the trial
+                health.probing = True
+        return key
+
+    def _get(self, key):
+        health = self._hosts.get(key)
+        if health is None:
+            if len(self._hosts) >= _MAX_TRACKED_HOSTS:
+                # Healthy hosts carry no state worth keeping
+                self._hosts = {k: h for k, h in self._hosts.items() if h.consecutive_failures or h.opened_until}
+            health = self._hosts[key] = HostHealth()
+        return health
+
+    def record_success(self, key, elapsed):
+        if elapsed > self.slow_seconds:
+            self.record_failure(key, elapsed)
+            return
+        with self._lock:
+            health = self._get(key)
+            health.requests += 1
+            health.latency = elapsed if health.latency is None else 0.8 * health.latency + 0.2 * elapsed
+            health.consecutive_failures = 0
+            if health.opened_until:
+                logger.info(f"Circuit closed for {key}")
+            health.opened_until = 0
+            health.cooldown = 0
+            health.probing = False
+
+    def record_failure(self, key, elapsed, error=None):
+        with self._lock:
+            health = self._get(key)
+            health.requests += 1
+            health.failures += 1
+            if isinstance(error, TIMEOUT_ERRORS):
+                health.timeouts += 1
+            health.latency = elapsed if health.latency is None else 0.8 * health.latency + 0.2 * elapsed
+            health.consecutive_failures += 1
+            if health.probing or (not health.opened_until and health.consecutive_failures >= self.failure_threshold):
+                health.cooldown = min(self.max_cooldown, health.cooldown * 2 if health.cooldown else self.cooldown)
+                health.opened_until = time.monotonic() + health.cooldown
+                health.probing = False
+                health.trips += 1
+                logger.warning(f"Circuit open for {key} for {health.cooldown:.0f}s "
+                               f"after {health.consecutive_failures} failures in a row")
+
+    def abort_trial(self, key):
+        """A trial request ended without saying anything about the host (cancelled, out of
+        budget, a redirect loop...): the host stays half open and the next request is the trial"""
+        with self._lock:
+            health = self._hosts.get(key)
+            if health is not None and health.probing:
+                health.probing = False
+
+    def record(self, key, elapsed, error=None):
+        """Outcome of a request admitted under key (error is the exception it raised, if any,
+        including BaseExceptions such as asyncio.CancelledError)"""
+        if not HOST_BREAKER_ENABLED:
+            return
+        if error is None:
+            self.record_success(key, elapsed)
+        elif is_host_error(error):
+            self.record_failure(key, elapsed, error)
+        else:
+            self.abort_trial(key)
+
+    def snapshot(self):
+        """Breaker state for metrics: totals plus every host whose breaker isn't closed"""
+        now = time.monotonic()
+        with self._lock:
+            hosts = {
+                key: {
+                    'state': health.state(now),
+                    'consecutive_failures': health.consecutive_failures,
+                    'failures': health.failures,
+                    'timeouts': health.timeouts,
+                    'requests': health.requests,
+                    'latency': round(health.latency, 3) if health.latency is not None else None,
+                    'retry_in': round(max(0, health.opened_until - now), 1),
+                    'trips': health.trips,
+                    'short_circuited': health.short_circuited
+                }
+                for key, health in self._hosts.items() if health.opened_until
+            }
+            return {
+                'hosts_tracked': len(self._hosts),
+                'open': sum(1 for host in hosts.values() if host['state'] == 'open'),
+                'half_open': sum(1 for host in hosts.values() if host['state'] == 'half_open'),
+                'trips': sum(health.trips for health in self._hosts.values()),
+                'short_circuited': sum(health.short_circuited for health in self._hosts.values()),
+                'hosts': hosts
+            }
+
+
+_registry = HostHealthRegistry()
+
+
+def get_registry():
+    return _registry
+
+
+def set_registry(registry):
+    """Swap the process-wide registry (e.g. a fresh one per test run)"""
+    global _registry
+    _registry = registry or HostHealthRegistry()
+
+
+def snapshot():
+    return _registry.snapshot()
+
+
+@metrics.register_collector
+def _breaker_metrics():
+    state = _registry.snapshot()
+    return [
+        ('scraper_host_breakers_open', 'gauge', 'Hosts whose circuit breaker is open', [({}, state['open'])]),
+        ('scraper_host_breakers_half_open', 'gauge', 'Hosts waiting on a trial request', [({}, state['half_open'])]),
+        ('scraper_hosts_tracked', 'gauge', 'Hosts with health state in memory', [({}, state['hosts_tracked'])]),
+        ('scraper_host_breaker_trips_total', 'counter', 'Times a host breaker opened', [({}, state['trips'])]),
+        ('scraper_host_short_circuited_total', 'counter', 'Requests skipped because the host breaker was open',
+         [({}, state['short_circuited'])]),
+    ]
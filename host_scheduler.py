@@ -0,0 +1,239 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import weakref
+from contextlib import contextmanager, asynccontextmanager
+from urllib.parse import urlparse
+import host_health
+import deadline
+import metrics
+import tracing
+
+logger = logging.getLogger(__name__)
+
+HTTP_REQUESTS = metrics.counter(
+    'scraper_http_requests_total',
+    'Requests sent, by host (search engines and social sites by name, everything else as "site") and outcome',
+    ('host', 'outcome')
+)
+HTTP_SECONDS = metrics.histogram(
+    'scraper_http_response_seconds',
+    'Time from sending a request to its response headers (body reads not included)',
+    ('host',)
+)
+
+# Spacing between request starts on one host, and requests in flight to it at once
+HOST_MIN_INTERVAL = float(os.environ.get('HOST_MIN_INTERVAL', 0.2))
+HOST_CONCURRENCY = int(os.environ.get('HOST_CONCURRENCY', 2))
+# Search engines get their own, stricter budget (shared by every company being searched)
+SEARCH_ENGINE_MIN_INTERVAL = float(os.environ.get('SEARCH_ENGINE_MIN_INTERVAL', 1.0))
+SEARCH_ENGINE_CONCURRENCY = int(os.environ.get('SEARCH_ENGINE_CONCURRENCY', 1))
+# Social profile pages
+SOCIAL_MIN_INTERVAL = float(os.environ.get('SOCIAL_MIN_INTERVAL', 0.5))
+SOCIAL_CONCURRENCY = int(os.environ.get('SOCIAL_CONCURRENCY', 2))
+
+# Domain -> (min interval, concurrency); a host uses the budget of the closest listed parent domain
+HOST_BUDGETS = {
+    'bing.com': (SEARCH_ENGINE_MIN_INTERVAL, SEARCH_ENGINE_CONCURRENCY),
+    'search.yahoo.com': (SEARCH_ENGINE_MIN_INTERVAL, SEARCH_ENGINE_CONCURRENCY),
+    'google.com': (SEARCH_ENGINE_MIN_INTERVAL, SEARCH_ENGINE_CONCURRENCY),
+    'instagram.com': (SOCIAL_MIN_INTERVAL, SOCIAL_CONCURRENCY),
+    'facebook.com': (SOCIAL_MIN_INTERVAL, SOCIAL_CONCURRENCY),
+    'linkedin.com': (SOCIAL_MIN_INTERVAL, SOCIAL_CONCURRENCY),
+    'twitter.com': (SOCIAL_MIN_INTERVAL, SOCIAL_CONCURRENCY),
+}
+
+
+def host_key(url):
+    """Hostname a request is paced under (www. is the same site)"""
+    host = (urlparse(url if '://' in url else f"http://{url}").hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class HostScheduler:
+    """Per-host politeness: minimum spacing between request starts and a cap on requests in flight.
+
+    Requests to different hosts never wait on each other; only repeat visits to one host are paced.
+    """
+
+    def __init__(self, min_interval=HOST_MIN_INTERVAL, concurrency=HOST_CONCURRENCY, budgets=None, clocks=None):
+        self.min_interval = min_interval
+        self.concurrency = concurrency
+        self.budgets = dict(HOST_BUDGETS if budgets is None else budgets)
+        # Budget key -> multiprocessing Value holding its next start time, for budgets kept
+        # across processes (see for_processes)
+        self.clocks = dict(clocks or {})
+        self._lock = threading.Lock()
+        self._next_start = {}
+        self._thread_slots = {}
+        # asyncio semaphores belong to one event loop; each asyncio.run() gets its own set
+        self._async_slots = weakref.WeakKeyDictionary()
+
+    def budget_for(self, url):
+        """(budget key, min interval, concurrency) for a URL"""
+        host = host_key(url)
+        parts = host.split('.')
+        for i in range(len(parts) - 1):
+            domain = '.'.join(parts[i:])
+            if domain in self.budgets:
+                interval, concurrency = self.budgets[domain]
+                return domain, interval, concurrency
+        return host, self.min_interval, self.concurrency
+
+    def for_processes(self, context, processes):
+        """Settings for worker processes that together keep this scheduler's listed budgets.
+
+        Each listed budget (search engines, social sites) gets its concurrency split between
+        the processes and its request spacing kept on a clock they share, so N shards don't
+        send N times the requests. Create before starting the processes (from the same
+        multiprocessing context), pass to each, and install there with
+        set_scheduler(HostScheduler(**settings)).
+        """
+        processes = max(1, processes)
+        return {
+            'min_interval': self.min_interval,
+            'concurrency': self.concurrency,
+            'budgets': {
+                domain: (interval, max(1, concurrency // processes))
+                for domain, (interval, concurrency) in self.budgets.items()
+            },
+            'clocks': {domain: context.Value('d', 0.0) for domain in self.budgets}
+        }
+
+    def _reserve(self, key, interval):
+        """Book the next start time on a host; returns how long the caller has to wait"""
+        clock = self.clocks.get(key)
+        if clock is not None:
+            # time.monotonic is system-wide, so processes on one machine agree on it
+            with clock.get_lock():
+                now = time.monotonic()
+                start = max(now, clock.value)
+                clock.value = start + interval
+            return start - now
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(key, 0))
+            self._next_start[key] = start + interval
+            # Forget hosts that have been idle for a while so the table doesn't grow forever
+            if len(self._next_start) > 10000:
+                self._next_start = {k: t for k, t in self._next_start.items() if t > now}
+        return start - now
+
+    def metrics_host(self, key):
+        """Host label for request metrics: listed budget domains by name, other sites pooled"""
+        return key if key in self.budgets else 'site'
+
+    @staticmethod
+    def _observe(host, elapsed, error=None):
+        if error is None:
+            outcome = 'ok'
+        elif isinstance(error, host_health.TIMEOUT_ERRORS):
+            outcome = 'timeout'
+        else:
+            outcome = 'error'
+        HTTP_REQUESTS.inc(host=host, outcome=outcome)
+        HTTP_SECONDS.observe(elapsed, host=host)
+
+    @staticmethod
+    def _check_budget(delay):
+        """Don't wait for a turn the active time budget won't last until"""
+        deadline.check()
+        left = deadline.remaining()
+        if left is not None and delay >= left:
+            raise deadline.exceeded(f"Time budget runs out before the next request slot ({delay:.1f}s away)")
+
+    @contextmanager
+    def slot(self, url, timeout=None):
+        """Hold a request slot for url (blocking; for threads); yields timeout clamped to the
+        active time budget (time spent queueing counts).
+
+        Raises host_health.HostUnavailable instead when the host's circuit breaker is open, and
+        deadline.BudgetExceeded when the budget is spent by the time the request's turn comes;
+        the outcome of the request made inside the slot is reported to the host-health registry.
+        """
+        health = host_health.get_registry()
+        # Don't queue behind a host that is known to be down
+        health.admit(url, trial=False)
+        key, interval, concurrency = self.budget_for(url)
+        with self._lock:
+            semaphore = self._thread_slots.get(key)
+            if semaphore is None:
+                semaphore = self._thread_slots[key] = threading.BoundedSemaphore(concurrency)
+        with semaphore:
+            delay = self._reserve(key, interval)
+            self._check_budget(delay)
+            if delay > 0:
+                time.sleep(delay)
+            # Before the admit below: a request the budget no longer allows must not take a
+            # half-open host's trial
+            timeout = deadline.clamp(timeout)
+            # Checked again: the breaker may have opened while this request was queued
+            health_key = health.admit(url)
+            tracing.mark_admitted()
+            started = time.monotonic()
+            try:
+                yield timeout
+            except BaseException as e:
+                # Cancellation too, or a half-open host would wait on its trial forever
+                health.record(health_key, time.monotonic() - started, e)
+                if isinstance(e, Exception):
+                    self._observe(self.metrics_host(key), time.monotonic() - started, e)
+                raise
+            health.record(health_key, time.monotonic() - started)
+            self._observe(self.metrics_host(key), time.monotonic() - started)
+
+    @asynccontextmanager
+    async def slot_async(self, url, timeout=None):
+        """Hold a request slot for url without blocking the event loop (same rules as slot)"""
+        health = host_health.get_registry()
+        # Don't queue behind a host that is known to be down
+        health.admit(url, trial=False)
+        key, interval, concurrency = self.budget_for(url)
+        loop_slots = self._async_slots.setdefault(asyncio.get_running_loop(), {})
+        semaphore = loop_slots.get(key)
+        if semaphore is None:
+            semaphore = loop_slots[key] = asyncio.Semaphore(concurrency)
+        async with semaphore:
+            delay = self._reserve(key, interval)
+            self._check_budget(delay)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Before the admit below: a request the budget no longer allows must not take a
+            # half-open host's trial
+            timeout = deadline.clamp(timeout)
+            health_key = health.admit(url)
+            tracing.mark_admitted()
+            started = time.monotonic()
+            try:
+                yield timeout
+            except BaseException as e:
+                # Cancellation too, or a half-open host would wait on its trial forever
+                health.record(health_key, time.monotonic() - started, e)
+                if isinstance(e, Exception):
+                    self._observe(self.metrics_host(key), time.monotonic() - started, e)
+                raise
+            health.record(health_key, time.monotonic() - started)
+            self._observe(self.metrics_host(key), time.monotonic() - started)
+
+
+_scheduler = HostScheduler()
+
+
+def get_scheduler():
+    return _scheduler
+
+
+def set_scheduler(scheduler):
+    """Swap the process-wide scheduler (e.g. one with no delays for offline runs)"""
+    global _scheduler
+    _scheduler = scheduler or HostScheduler()
+
+
+def slot(url, timeout=None):
+    return _scheduler.slot(url, timeout)
+
+
+def slot_async(url, timeout=None):
+    return _scheduler.slot_async(url, timeout)
@@ -0,0 +1,95 @@
+import os
+import threading
+import logging
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+import host_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Shared browser-like headers for every outgoing request
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Connection': 'keep-alive',
+}
+
+# Number of distinct hosts whose connection pools are kept alive
+POOL_HOSTS = int(os.environ.get('HTTP_POOL_HOSTS', 100))
+# Maximum open connections per host (extra requests wait for a free connection)
+POOL_PER_HOST = int(os.environ.get('HTTP_POOL_PER_HOST', 2))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide pooled keep-alive session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_HOSTS,
+                    pool_maxsize=POOL_PER_HOST,
+                    pool_block=True,
+                    max_retries=0
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                _session = session
+    return _session
+
+
+def fetch(url, timeout=5, method='GET', allow_redirects=True, headers=None, **kwargs):
+    """Send a request through the shared session and return the response (paced per host).
+
+    The body is read before the host slot is released; read bodies in chunks with stream()
+    instead of passing stream=True here.
+    """
+    # Never wait longer than the active company/job budget allows (time spent queueing counts)
+    with host_scheduler.slot(url, timeout) as timeout:
+        return get_session().request(
+            method,
+            url,
+            headers=headers,
+            timeout=timeout,
+            allow_redirects=allow_redirects,
+            **kwargs
+        )
+
+
+@contextmanager
+def stream(url, timeout=5, method='GET', allow_redirects=True, headers=None, **kwargs):
+    """fetch with a streamed body: yields the response, holding the host slot until the with
+    block ends (the response is closed then)"""
+    with host_scheduler.slot(url, timeout) as timeout:
+        response = get_session().request(
+            method,
+            url,
+            headers=headers,
+            timeout=timeout,
+            allow_redirects=allow_redirects,
+            stream=True,
+            **kwargs
+        )
+        with response:
+            yield response
+
+
+def head(url, timeout=3, allow_redirects=True, headers=None):
+    """HEAD request through the shared session"""
+    return fetch(url, timeout=timeout, method='HEAD', allow_redirects=allow_redirects, headers=headers)
+
+
+def close_session():
+    """Close pooled connections (used on shutdown and in worker recycling)"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,331 @@
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import tempfile
+import threading
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.environ.get('SCRAPER_DATA_DIR', os.path.join(tempfile.gettempdir(), 'fashiongo_scraper'))
+JOB_DB_PATH = os.environ.get('JOB_DB_PATH', os.path.join(DATA_DIR, 'jobs.db'))
+JOB_FILES_DIR = os.environ.get('JOB_FILES_DIR', os.path.join(DATA_DIR, 'jobs'))
+# Worker threads per process
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 1))
+# A running job whose heartbeat is older than this is considered orphaned (worker died / was recycled)
+JOB_STALE_AFTER = int(os.environ.get('JOB_STALE_AFTER', 60))
+JOB_HEARTBEAT_INTERVAL = int(os.environ.get('JOB_HEARTBEAT_INTERVAL', 10))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1.0))
+
+JOB_COLUMNS = [
+    'id', 'status', 'input_path', 'input_filename', 'company_column',
+    'total', 'processed', 'emails_found', 'cache_hits', 'output_path', 'output_bytes',
+    'error', 'attempts', 'worker', 'created_at', 'started_at',
+    'heartbeat_at', 'finished_at'
+]
+RESULT_COLUMNS = ['seq', 'company', 'email', 'source', 'website', 'elapsed', 'cached', 'created_at']
+
+_init_lock = threading.Lock()
+_initialized = False
+_workers_started = False
+
+
+def _connect():
+    global _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                os.makedirs(os.path.dirname(JOB_DB_PATH) or '.', exist_ok=True)
+                os.makedirs(JOB_FILES_DIR, exist_ok=True)
+                conn = sqlite3.connect(JOB_DB_PATH, timeout=30)
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        id TEXT PRIMARY KEY,
+                        status TEXT NOT NULL,
+                        input_path TEXT,
+                        input_filename TEXT,
+                        company_column TEXT,
+                        total INTEGER DEFAULT 0,
+                        processed INTEGER DEFAULT 0,
+                        emails_found INTEGER DEFAULT 0,
+                        cache_hits INTEGER DEFAULT 0,
+                        output_path TEXT,
+                        output_bytes INTEGER DEFAULT 0,
+                        error TEXT,
+                        attempts INTEGER DEFAULT 0,
+                        worker TEXT,
+                        created_at REAL,
+                        started_at REAL,
+                        heartbeat_at REAL,
+                        finished_at REAL
+                    )
+                ''')
+                # Databases created before output_bytes existed
+                columns = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+                if 'output_bytes' not in columns:
+                    conn.execute('ALTER TABLE jobs ADD COLUMN output_bytes INTEGER DEFAULT 0')
+                conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS job_results (
+                        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                        job_id TEXT NOT NULL,
+                        company TEXT,
+                        email TEXT,
+                        source TEXT,
+                        website TEXT,
+                        elapsed REAL,
+                        cached INTEGER DEFAULT 0,
+                        created_at REAL
+                    )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS job_results_job ON job_results (job_id, seq)')
+                conn.commit()
+                conn.close()
+                _initialized = True
+    return sqlite3.connect(JOB_DB_PATH, timeout=30, isolation_level=None)
+
+
+def job_dir(job_id):
+    """Directory holding a job's input and output files"""
+    path = os.path.join(JOB_FILES_DIR, job_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def new_job_id():
+    return uuid.uuid4().hex
+
+
+def enqueue(job_id, input_path, input_filename, company_column):
+    """Add a job to the queue; the worker pool picks it up"""
+    conn = _connect()
+    try:
+        conn.execute(
+            'INSERT INTO jobs (id, status, input_path, input_filename, company_column, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, 'queued', input_path, input_filename, company_column, time.time())
+        )
+    finally:
+        conn.close()
+    return job_id
+
+
+def get_job(job_id):
+    """Job row as a dict, or None"""
+    conn = _connect()
+    try:
+        row = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return dict(zip(JOB_COLUMNS, row)) if row else None
+
+
+def update_job(job_id, **fields):
+    """Set job fields and refresh its heartbeat"""
+    fields['heartbeat_at'] = time.time()
+    assignments = ', '.join(f"{name} = ?" for name in fields)
+    conn = _connect()
+    try:
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+    finally:
+        conn.close()
+
+
+def add_results(job_id, results):
+    """Append per-company results ({'company', 'email', 'source', 'website', 'elapsed', 'cached'})"""
+    if not results:
+        return
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute('BEGIN')
+        conn.executemany(
+            'INSERT INTO job_results (job_id, company, email, source, website, elapsed, cached, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            [(job_id, r['company'], r.get('email'), r.get('source'), r.get('website'),
+              r.get('elapsed'), 1 if r.get('cached') else 0, now) for r in results]
+        )
+        conn.execute('COMMIT')
+    finally:
+        conn.close()
+
+
+def completed_results(job_id):
+    """Checkpoint of a job: {company: result} for every company already finished"""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(RESULT_COLUMNS)} FROM job_results WHERE job_id = ? ORDER BY seq",
+            (job_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return {row['company']: row for row in (dict(zip(RESULT_COLUMNS, r)) for r in rows)}
+
+
+def clear_results(job_id):
+    """Forget recorded results (a job restarting from scratch)"""
+    conn = _connect()
+    try:
+        conn.execute('DELETE FROM job_results WHERE job_id = ?', (job_id,))
+    finally:
+        conn.close()
+
+
+def results_since(job_id, after_seq=0, limit=500):
+    """Per-company results recorded after the given sequence number, oldest first"""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(RESULT_COLUMNS)} FROM job_results "
+            "WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (job_id, after_seq, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(zip(RESULT_COLUMNS, row)) for row in rows]
+
+
+def claim_next(worker_name):
+    """Atomically move the oldest queued job to running and return it"""
+    conn = _connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+        ).fetchone()
+        if not row:
+            conn.execute('COMMIT')
+            return None
+        now = time.time()
+        conn.execute(
+            "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ?, "
+            "attempts = attempts + 1 WHERE id = ?",
+            (worker_name, now, now, row[0])
+        )
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+    return get_job(row[0])
+
+
+def requeue_stale():
+    """Put orphaned running jobs back in the queue (or fail them after too many attempts)"""
+    cutoff = time.time() - JOB_STALE_AFTER
+    conn = _connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        failed = conn.execute(
+            "UPDATE jobs SET status = 'failed', error = 'Worker stopped too many times', finished_at = ? "
+            "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+            (time.time(), cutoff, JOB_MAX_ATTEMPTS)
+        ).rowcount
+        requeued = conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL "
+            "WHERE status = 'running' AND heartbeat_at < ?",
+            (cutoff,)
+        ).rowcount
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+    if requeued or failed:
+        logger.warning(f"Requeued {requeued} orphaned jobs, failed {failed}")
+    return requeued
+
+
+def resume(job_id):
+    """Put a failed or interrupted job back in the queue; finished companies are kept and skipped"""
+    conn = _connect()
+    try:
+        resumed = conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, error = NULL, finished_at = NULL, attempts = 0 "
+            "WHERE id = ? AND (status = 'failed' OR (status = 'running' AND heartbeat_at < ?))",
+            (job_id, time.time() - JOB_STALE_AFTER)
+        ).rowcount
+    finally:
+        conn.close()
+    if resumed:
+        logger.info(f"Job {job_id} queued for resume")
+    return bool(resumed)
+
+
+def interrupted_job_ids():
+    """Jobs that failed or whose worker stopped mid-run"""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT id FROM jobs WHERE status = 'failed' OR (status = 'running' AND heartbeat_at < ?) "
+            "ORDER BY created_at",
+            (time.time() - JOB_STALE_AFTER,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [row[0] for row in rows]
+
+
+def _heartbeat(job_id, stop_event):
+    while not stop_event.wait(JOB_HEARTBEAT_INTERVAL):
+        try:
+            update_job(job_id)
+        except Exception as e:
+            logger.warning(f"Heartbeat failed for job {job_id}: {str(e)}")
+
+
+def _worker_loop(handler, worker_name):
+    last_stale_check = 0
+    while True:
+        try:
+            if time.time() - last_stale_check > JOB_STALE_AFTER / 2:
+                requeue_stale()
+                last_stale_check = time.time()
+
+            job = claim_next(worker_name)
+            if not job:
+                time.sleep(JOB_POLL_INTERVAL)
+                continue
+
+            logger.info(f"{worker_name} started job {job['id']} ({job['input_filename']})")
+            stop_event = threading.Event()
+            threading.Thread(target=_heartbeat, args=(job['id'], stop_event), daemon=True).start()
+            try:
+                fields = handler(job) or {}
+                update_job(job['id'], status='completed', finished_at=time.time(), **fields)
+                logger.info(f"{worker_name} finished job {job['id']}")
+            except Exception as e:
+                logger.error(f"Job {job['id']} failed: {str(e)}")
+                update_job(job['id'], status='failed', error=str(e), finished_at=time.time())
+            finally:
+                stop_event.set()
+
+        except Exception as e:
+            logger.error(f"Job worker error: {str(e)}")
+            time.sleep(JOB_POLL_INTERVAL)
+
+
+def start_workers(handler, count=None):
+    """Start the worker pool for this process (no-op when already started, and in shard processes)"""
+    global _workers_started
+    if multiprocessing.current_process().name != 'MainProcess':
+        # A shard_executor child re-importing the app module must not start claiming jobs
+        return
+    with _init_lock:
+        if _workers_started:
+            return
+        _workers_started = True
+
+    count = JOB_WORKERS if count is None else count
+    for i in range(count):
+        worker_name = f"{socket.gethostname()}:{os.getpid()}:{i}"
+        threading.Thread(target=_worker_loop, args=(handler, worker_name), daemon=True).start()
+    logger.info(f"Started {count} job workers in process {os.getpid()}")
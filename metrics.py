@@ -0,0 +1,255 @@
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+import tracing
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+_metrics = {}
+# (collector, exported) pairs
+_collectors = []
+# Collector output merged from worker processes: process label -> {(name, type, help): {labels: value}}
+_merged_collected = {}
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _labels(self, key):
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    """Monotonic count per label set"""
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with _lock:
+            values = list(self._values.items())
+        return [(self.name, self._labels(key), value) for key, value in values]
+
+    def _merge(self, values):
+        for key, value in values.items():
+            self._values[key] = self._values.get(key, 0) + value
+
+
+class Histogram(_Metric):
+    """Bucketed observations (count, sum and cumulative buckets) per label set"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts (last one is +Inf), sum, count]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with _lock:
+            values = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        samples = []
+        for key, counts, total, count in values:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", dict(labels, le=_format_value(bound)), cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+    def _merge(self, values):
+        for key, (counts, total, count) in values.items():
+            state = self._values.get(key)
+            if state is None:
+                self._values[key] = [list(counts), total, count]
+                continue
+            state[0] = [a + b for a, b in zip(state[0], counts)]
+            state[1] += total
+            state[2] += count
+
+
+def _register(cls, name, *args, **kwargs):
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, *args, **kwargs)
+    return metric
+
+
+def counter(name, help, labelnames=()):
+    """Process-wide counter (the same object for the same name)"""
+    return _register(Counter, name, help, labelnames)
+
+
+def histogram(name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+    """Process-wide histogram (the same object for the same name)"""
+    return _register(Histogram, name, help, labelnames, buckets=buckets)
+
+
+def register_collector(collector=None, exported=True):
+    """Add a callable producing metrics at scrape time (gauges read off live state).
+
+    It returns [(name, type, help, [(labels, value), ...]), ...]. Its output is part of
+    export_state unless exported is False (for state every process already sees, such as a
+    shared file). Usable as @register_collector or @register_collector(exported=False).
+    """
+    if collector is None:
+        return lambda collector: register_collector(collector, exported)
+    _collectors.append((collector, exported))
+    return collector
+
+
+def _collect(exported_only=False):
+    families = []
+    for collector, exported in list(_collectors):
+        if exported_only and not exported:
+            continue
+        try:
+            families.extend(collector())
+        except Exception as e:
+            logger.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {str(e)}")
+    return families
+
+
+def export_state():
+    """Raw counter/histogram values and exported collector output, for a worker process to hand
+    to its parent"""
+    with _lock:
+        values = {
+            name: {key: (list(value[0]), value[1], value[2]) if isinstance(value, list) else value
+                   for key, value in metric._values.items()}
+            for name, metric in _metrics.items()
+        }
+    return {'values': values, 'collected': _collect(exported_only=True)}
+
+
+def merge_state(state, process=None):
+    """Add values exported by another process to this one's metrics.
+
+    Its collector output (breaker state, ...) is rendered with a process label: counters add up
+    over the exports of the same process label, gauges keep the latest.
+    """
+    with _lock:
+        for name, values in state.get('values', {}).items():
+            metric = _metrics.get(name)
+            if metric is not None:
+                metric._merge(values)
+        if process is None:
+            return
+        merged = _merged_collected.setdefault(str(process), {})
+        for name, type, help, samples in state.get('collected', []):
+            family = merged.setdefault((name, type, help), {})
+            for labels, value in samples:
+                key = tuple(sorted(labels.items()))
+                family[key] = family.get(key, 0) + value if type == 'counter' else value
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sample_line(name, labels, value):
+    if labels:
+        label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+        return f"{name}{{{label_text}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        metrics = list(_metrics.values())
+    families = [(metric.name, metric.type, metric.help, metric.samples()) for metric in metrics]
+    families.extend(
+        (name, type, help, [(name, labels, value) for labels, value in samples])
+        for name, type, help, samples in _collect()
+    )
+    # Worker processes' collector output joins the family of the same name, labelled by process
+    by_name = {family[0]: family for family in families}
+    with _lock:
+        merged = [(process, {meta: dict(values) for meta, values in collected.items()})
+                  for process, collected in _merged_collected.items()]
+    for process, collected in merged:
+        for (name, type, help), values in collected.items():
+            family = by_name.get(name)
+            if family is None:
+                family = by_name[name] = (name, type, help, [])
+                families.append(family)
+            family[3].extend((name, dict(key, process=process), value) for key, value in values.items())
+    for name, type, help, samples in families:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {type}")
+        lines.extend(_sample_line(*sample) for sample in samples)
+    return '\n'.join(lines) + '\n'
+
+
+# Shared by the sync and async email ladders
+
+STAGE_SECONDS = histogram(
+    'scraper_stage_seconds',
+    'Time spent in each step of the email ladder (direct_guess, search_engines, site_pages, ...)',
+    ('stage',)
+)
+COMPANY_SECONDS = histogram('scraper_company_seconds', 'Time to process one company')
+COMPANY_RESULTS = counter(
+    'scraper_company_results_total',
+    'Companies processed, by the strategy that found the email (not_found / cut_off when none did)',
+    ('strategy',)
+)
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed step of the ladder under scraper_stage_seconds{stage=name} (and in the company trace)"""
+    started = time.monotonic()
+    try:
+        with tracing.stage(name):
+            yield
+    finally:
+        STAGE_SECONDS.observe(time.monotonic() - started, stage=name)
+
+
+def record_company(strategy, seconds):
+    COMPANY_RESULTS.inc(strategy=strategy)
+    COMPANY_SECONDS.observe(seconds)
@@ -0,0 +1,410 @@
+import re
+import sys
+import time
+import random
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlunsplit, parse_qs
+import aiohttp
+import requests
+from aiohttp.abc import AbstractResolver
+from requests.adapters import HTTPAdapter
+import dns_filter
+
+logger = logging.getLogger(__name__)
+
+# Hosts answered with a fake results page
+SEARCH_HOSTS = ('www.bing.com', 'bing.com', 'search.yahoo.com', 'www.google.com', 'google.com')
+# Resolved address of a live mock site; DEAD_ADDRESS resolves but nothing listens there
+LIVE_ADDRESS = '127.0.0.1'
+DEAD_ADDRESS = '127.0.0.2'
+
+# Where a site keeps its email: homepage footer, a standard contact/wholesale page,
+# a page only reachable through a homepage link, or nowhere
+LAYOUTS = ('homepage', 'contact', 'wholesale', 'linked', 'none')
+# How the address is written: as text, only inside a mailto: link, or disguised from a plain regex
+OBFUSCATIONS = ('plain', 'mailto', 'entity', 'at')
+
+_FIRST_WORDS = ['Bella', 'Luna', 'Rosa', 'Urban', 'Velvet', 'Golden', 'Silk', 'Ivy', 'Coco', 'Blue',
+                'Stella', 'Willow', 'Ember', 'Nova', 'Olive', 'Sunny', 'Jade', 'Ruby', 'Maple', 'Pearl']
+_SECOND_WORDS = ['Moda', 'Threads', 'Apparel', 'Boutique', 'Fashion', 'Closet', 'Studio', 'Style',
+                 'Collection', 'Wear', 'Label', 'Trend', 'Avenue', 'Couture', 'Lane', 'Atelier']
+_SUFFIXES = ['', '', ' LLC', ' Inc', ' Co']
+_LOCAL_PARTS = ['info', 'sales', 'wholesale', 'hello', 'orders']
+
+
+class MockSite:
+    """One synthetic company and its website (domain is None when it has no site at all)"""
+
+    def __init__(self, company, domain, email=None, layout='homepage', obfuscation='plain', latency=0.05,
+                 page_kb=30, redirect=False, hang=False, dead=False, listed=True):
+        self.company = company
+        self.domain = domain
+        self.email = email
+        self.layout = layout
+        self.obfuscation = obfuscation
+        # Seconds before each response starts
+        self.latency = latency
+        self.page_kb = page_kb
+        # Bare domain answers with a 301 to www.
+        self.redirect = redirect
+        # Accepts requests but doesn't answer before the client gives up
+        self.hang = hang
+        # Resolves but refuses connections
+        self.dead = dead
+        # Shows up in the fake search results
+        self.listed = listed
+
+    @property
+    def reachable_email(self):
+        """The email a visitor could get off the site (None without a working site or a published email)"""
+        if not self.domain or self.dead or self.hang or self.layout == 'none':
+            return None
+        return self.email
+
+
+def _clean_name(company):
+    """Company name as the scrapers' search queries spell it (legal suffix dropped)"""
+    for suffix in (' LLC', ' Inc', ' Co'):
+        if company.endswith(suffix):
+            return company[:-len(suffix)]
+    return company
+
+
+def generate_sites(count, seed=0, latency=0.05, latency_jitter=0.5, page_kb=30, no_site_rate=0.1,
+                   search_only_rate=0.15, redirect_rate=0.2, obfuscated_rate=0.15, timeout_rate=0.05,
+                   dead_rate=0.05, layout_weights=None):
+    """count companies with a reproducible mix of site behaviours.
+
+    Most domains are the company name run together (what direct guessing tries first); a
+    search_only_rate share live on a domain only the search results reveal.
+    """
+    rng = random.Random(seed)
+    layout_weights = layout_weights or {'homepage': 3, 'contact': 3, 'wholesale': 2, 'linked': 1, 'none': 1}
+    layouts = list(layout_weights)
+    weights = [layout_weights[layout] for layout in layouts]
+    sites = []
+    used = set()
+    for i in range(count):
+        words = [rng.choice(_FIRST_WORDS), rng.choice(_SECOND_WORDS)]
+        if rng.random() < 0.3:
+            words.append(rng.choice(_SECOND_WORDS))
+        name = ' '.join(words)
+        if name in used:
+            # The word lists only make a few thousand names; repeats get numbered
+            name = f"{name} {i}"
+        used.add(name)
+        company = name + rng.choice(_SUFFIXES)
+
+        if rng.random() < no_site_rate:
+            sites.append(MockSite(company, None, listed=False))
+            continue
+
+        base = re.sub(r'[^a-z0-9]', '', name.lower())
+        search_only = rng.random() < search_only_rate
+        domain = f"shop{base}{rng.randint(10, 99)}.com" if search_only else f"{base}.com"
+        sites.append(MockSite(
+            company,
+            domain,
+            email=f"{rng.choice(_LOCAL_PARTS)}@{domain}",
+            layout=rng.choices(layouts, weights)[0],
+            obfuscation=rng.choice(OBFUSCATIONS[2:]) if rng.random() < obfuscated_rate else rng.choice(OBFUSCATIONS[:2]),
+            latency=max(0.0, latency * (1 + rng.uniform(-latency_jitter, latency_jitter))),
+            page_kb=max(1, int(page_kb * rng.uniform(0.5, 1.5))),
+            redirect=rng.random() < redirect_rate,
+            hang=rng.random() < timeout_rate,
+            dead=rng.random() < dead_rate,
+            listed=search_only or rng.random() < 0.7
+        ))
+    return sites
+
+
+def dns_records(sites):
+    """Hostname -> addresses for a StaticResolver: every site (apex and www.) and the search engines"""
+    records = {host: [LIVE_ADDRESS] for host in SEARCH_HOSTS}
+    for site in sites:
+        if site.domain:
+            address = DEAD_ADDRESS if site.dead else LIVE_ADDRESS
+            records[site.domain] = [address]
+            records[f"www.{site.domain}"] = [address]
+    return records
+
+
+def _write_email(email, obfuscation):
+    if obfuscation == 'mailto':
+        return f'<a href="mailto:{email}">Email us</a>'
+    if obfuscation == 'entity':
+        return email.replace('@', '&#64;').replace('.', '&#46;')
+    if obfuscation == 'at':
+        local, _, domain = email.partition('@')
+        return f"{local} [at] {domain.replace('.', ' [dot] ')}"
+    return f'<a href="mailto:{email}">{email}</a>'
+
+
+_FILLER = ('<div class="product"><img src="/img/item.jpg" alt="Look"><h3>New arrival</h3>'
+           '<p>Soft knit, relaxed fit, made in small batches.</p><span class="price">$48.00</span></div>\n')
+
+
+def _page(title, body, size_kb=0):
+    filler = _FILLER * max(0, (size_kb * 1024) // len(_FILLER))
+    return (f'<!DOCTYPE html><html><head><title>{title}</title></head><body>'
+            f'<nav><a href="/">Home</a> <a href="/about">About</a> <a href="/shop">Shop</a></nav>'
+            f'<main>{filler}{body}</main></body></html>').encode('utf-8')
+
+
+def site_pages(site):
+    """Path -> HTML body of one site"""
+    contact = f"<p>Questions? {_write_email(site.email, site.obfuscation)}</p>" if site.email else ''
+    footer = contact if site.layout == 'homepage' else ''
+    links = {
+        'contact': '<a href="/contact">Contact</a>',
+        'wholesale': '<a href="/wholesale">Wholesale</a>',
+        'linked': '<a href="/pages/get-in-touch">Contact Us</a>',
+    }.get(site.layout, '')
+    pages = {
+        '/': _page(site.company, f"{links}<footer>&copy; {site.company} {footer}</footer>", site.page_kb),
+        '/about': _page(f"About {site.company}", '<p>Family owned since 2009.</p>'),
+    }
+    if site.layout == 'contact':
+        pages['/contact'] = _page('Contact', contact)
+    elif site.layout == 'wholesale':
+        pages['/wholesale'] = _page('Wholesale', f"<p>Stockists and retailers welcome.</p>{contact}")
+    elif site.layout == 'linked':
+        pages['/pages/get-in-touch'] = _page('Get in touch', contact)
+    return pages
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, like the sites the scrapers normally talk to
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.web.respond(self, send_body=True)
+
+    def do_HEAD(self):
+        self.server.web.respond(self, send_body=False)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections (or giving up on a hung site) is expected
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class MockWeb:
+    """Local HTTP server playing every synthetic site and the search engines, told apart by Host header.
+
+    Counts the requests it answers (served) per host. Use as a context manager or start()/stop().
+    """
+
+    def __init__(self, sites, search_kb=60, search_latency=0.1, hang_seconds=30, port=0):
+        self.sites = list(sites)
+        self.search_kb = search_kb
+        self.search_latency = search_latency
+        self.hang_seconds = hang_seconds
+        self._hosts = {}
+        self._by_name = {}
+        for site in self.sites:
+            self._by_name[_clean_name(site.company).lower()] = site
+            if site.domain:
+                self._hosts[site.domain] = site
+                self._hosts[f"www.{site.domain}"] = site
+        self._pages = {}
+        self._lock = threading.Lock()
+        self.served = {}
+        self._server = _Server((LIVE_ADDRESS, port), _Handler)
+        self._server.web = self
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-web', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_counts(self):
+        with self._lock:
+            self.served = {}
+
+    def _pages_of(self, site):
+        pages = self._pages.get(site.domain)
+        if pages is None:
+            pages = self._pages[site.domain] = site_pages(site)
+        return pages
+
+    def respond(self, handler, send_body):
+        host = (handler.headers.get('Host') or '').split(':')[0].lower()
+        with self._lock:
+            self.served[host] = self.served.get(host, 0) + 1
+        parts = urlsplit(handler.path)
+
+        if host in SEARCH_HOSTS:
+            time.sleep(self.search_latency)
+            return self._send(handler, 200, self._search_page(parts.query), send_body)
+
+        site = self._hosts.get(host)
+        if site is None:
+            return self._send(handler, 404, b'Unknown host', send_body)
+        time.sleep(site.latency)
+        if site.hang:
+            time.sleep(self.hang_seconds)
+        if site.redirect and host == site.domain:
+            location = urlunsplit(('https', f"www.{site.domain}", parts.path or '/', parts.query, ''))
+            return self._send(handler, 301, b'', send_body, {'Location': location})
+
+        page = self._pages_of(site).get(parts.path.rstrip('/') or '/')
+        if page is None:
+            return self._send(handler, 404, _page('Not found', '<p>Page not found</p>'), send_body)
+        return self._send(handler, 200, page, send_body)
+
+    def _search_page(self, query):
+        """Results page: the company's site (if listed) among directory and social noise"""
+        params = parse_qs(query)
+        text = (params.get('q') or params.get('p') or [''])[0]
+        quoted = re.search(r'"([^"]+)"', text)
+        site = self._by_name.get((quoted.group(1) if quoted else text).strip().lower())
+        results = []
+        if site is not None:
+            slug = re.sub(r'[^a-z0-9]+', '-', site.company.lower()).strip('-')
+            if site.listed and site.domain:
+                results.append(f"https://www.{site.domain}/")
+            results += [f"https://www.facebook.com/{slug}", f"https://www.yelp.com/biz/{slug}",
+                        f"https://www.fashiondirectory.net/brands/{slug}"]
+        body = ''.join(f'<li class="result"><a href="{url}">{url}</a></li>' for url in results)
+        return _page(f"{text} - Search", f"<ol>{body}</ol>", self.search_kb)
+
+    def _send(self, handler, status, body, send_body, headers=None):
+        try:
+            handler.send_response(status)
+            handler.send_header('Content-Type', 'text/html; charset=utf-8')
+            handler.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                handler.send_header(name, value)
+            handler.end_headers()
+            if send_body:
+                handler.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client timed out and hung up
+            pass
+
+
+class MockWebAdapter(HTTPAdapter):
+    """Transport that sends every request to the mock web instead of the internet.
+
+    Hostnames are looked up through dns_filter's resolver (the injectable one): no address is a
+    failed lookup, otherwise the request goes over plain HTTP to that address on the mock port
+    with the original Host header. Responses keep the original URL, so redirects, the page
+    cache and the host scheduler see the same URLs as in production.
+    """
+
+    def __init__(self, port, **kwargs):
+        kwargs.setdefault('pool_connections', 4)
+        kwargs.setdefault('pool_maxsize', 64)
+        super().__init__(**kwargs)
+        self.port = port
+        self.sent = 0
+        self._lock = threading.Lock()
+
+    def count(self):
+        with self._lock:
+            self.sent += 1
+
+    def send(self, request, **kwargs):
+        self.count()
+        parts = urlsplit(request.url)
+        addresses = dns_filter.get_resolver()(parts.hostname or '')
+        if not addresses:
+            raise requests.exceptions.ConnectionError(f"Failed to resolve '{parts.hostname}'", request=request)
+        routed = request.copy()
+        routed.url = urlunsplit(('http', f"{addresses[0]}:{self.port}", parts.path or '/', parts.query, ''))
+        routed.headers['Host'] = parts.netloc
+        response = super().send(routed, **kwargs)
+        response.url = request.url
+        response.request = request
+        return response
+
+
+class MockResolver(AbstractResolver):
+    """aiohttp resolver answering from dns_filter's resolver, always with the mock web's port"""
+
+    def __init__(self, port):
+        self.port = port
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        addresses = dns_filter.get_resolver()(host)
+        if not addresses:
+            raise OSError(f"Failed to resolve '{host}'")
+        return [
+            {'hostname': host, 'host': address, 'port': self.port, 'family': socket.AF_INET, 'proto': 0,
+             'flags': socket.AI_NUMERICHOST}
+            for address in addresses
+        ]
+
+    async def close(self):
+        pass
+
+
+class MockConnector(aiohttp.TCPConnector):
+    """MockWebAdapter for aiohttp sessions: hosts resolve to the mock web's port, and https
+    URLs are spoken as plain HTTP, so URLs and Host headers stay as in production. Requests
+    count towards the adapter's sent counter."""
+
+    def __init__(self, adapter, **kwargs):
+        kwargs['resolver'] = MockResolver(adapter.port)
+        super().__init__(**kwargs)
+        self.adapter = adapter
+
+    def _get_ssl_context(self, req):
+        return None
+
+    async def connect(self, req, traces, timeout):
+        # Once per request, whether or not a pooled connection is reused
+        self.adapter.count()
+        return await super().connect(req, traces, timeout)
+
+
+@contextmanager
+def routed(records, port):
+    """Route every requests session and async_engine client session in this process to the
+    mock web on port.
+
+    records is the hostname -> addresses map the resolver answers from (see dns_records);
+    it's installed both as dns_filter's resolver and as the transports'. Yields the adapter,
+    whose sent counter is the number of requests attempted.
+    """
+    import async_engine
+    adapter = MockWebAdapter(port)
+    previous_resolver = dns_filter.get_resolver()
+    original_get_adapter = requests.Session.get_adapter
+    dns_filter.set_resolver(dns_filter.StaticResolver(records))
+    requests.Session.get_adapter = lambda session, url: adapter
+    async_engine.set_connector_factory(lambda **kwargs: MockConnector(adapter, **kwargs))
+    try:
+        yield adapter
+    finally:
+        async_engine.set_connector_factory(None)
+        requests.Session.get_adapter = original_get_adapter
+        dns_filter.set_resolver(previous_resolver)
+        adapter.close()
@@ -0,0 +1,154 @@
+import os
+import codecs
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlsplit, urlunsplit
+
+# Pages kept per cache (least recently used are dropped first)
+PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 64))
+# 'company' (one cache per company search) or 'job' (shared by every company in a job)
+PAGE_CACHE_SCOPE = os.environ.get('PAGE_CACHE_SCOPE', 'company')
+PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', '1') != '0'
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """Cache key for a URL: lowercase scheme/host, no default port, fragment or trailing slash"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((scheme, host, path, parts.query, ''))
+
+
+def charset_of(content_type, default='utf-8'):
+    """Charset named in a Content-Type header, if Python knows it"""
+    for param in (content_type or '').split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset' and value.strip():
+            charset = value.strip().strip('"\'')
+            try:
+                codecs.lookup(charset)
+                return charset
+            except LookupError:
+                break
+    return default
+
+
+class PageStatusError(Exception):
+    """HTTP error status on a (possibly cached) page"""
+
+
+class CachedPage:
+    """Status, final URL, headers and size-capped body of one fetch.
+
+    body is None for HEAD results; complete is False when reading stopped early
+    (e.g. the email scan found what it needed), so the body is only a prefix.
+    """
+
+    __slots__ = ('status', 'url', 'headers', 'body', 'complete')
+
+    def __init__(self, status, url, headers, body=None, complete=True):
+        self.status = status
+        self.url = url
+        self.headers = headers
+        self.body = body
+        self.complete = complete
+
+    @property
+    def ok(self):
+        return self.status < 400
+
+    @property
+    def content_type(self):
+        return self.headers.get('Content-Type') or self.headers.get('content-type') or ''
+
+    @property
+    def text(self):
+        if not self.body:
+            return ''
+        return self.body.decode(charset_of(self.content_type), errors='replace')
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise PageStatusError(f"{self.status} error for url: {self.url}")
+
+
+class PageCache:
+    """Small thread-safe LRU of fetched pages, keyed by normalized requested and final URL"""
+
+    def __init__(self, max_entries=None):
+        self.max_entries = PAGE_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url, need_body=True, need_complete=False):
+        """Cached page for url, or None (HEAD-only entries don't satisfy need_body)"""
+        key = normalize_url(url)
+        with self._lock:
+            page = self._pages.get(key)
+            usable = page is not None and (not need_body or page.body is not None) and (
+                not need_complete or page.complete
+            )
+            if usable:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return page
+            self.misses += 1
+            return None
+
+    def put(self, url, page):
+        with self._lock:
+            for key in {normalize_url(url), normalize_url(page.url or url)}:
+                existing = self._pages.get(key)
+                # Never replace a page body with a HEAD result
+                if existing is not None and existing.body is not None and page.body is None:
+                    continue
+                self._pages[key] = page
+                self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+
+
+_current = ContextVar('page_cache', default=None)
+
+
+@contextmanager
+def scope(cache=None):
+    """Make a page cache active for the enclosed fetches.
+
+    Nested scopes reuse the outer cache, so a job-wide cache is shared by the
+    per-company scopes inside it. Also usable as a decorator.
+    """
+    if _current.get() is not None or not PAGE_CACHE_ENABLED:
+        yield _current.get()
+        return
+    token = _current.set(cache if cache is not None else PageCache())
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def current():
+    """Active cache, or None outside any scope"""
+    return _current.get()
+
+
+def lookup(url, need_body=True, need_complete=False):
+    cache = _current.get()
+    return cache.get(url, need_body=need_body, need_complete=need_complete) if cache else None
+
+
+def store(url, page):
+    cache = _current.get()
+    if cache:
+        cache.put(url, page)
+    return page
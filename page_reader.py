@@ -0,0 +1,328 @@
+import os
+import re
+import time
+import codecs
+import logging
+from contextlib import contextmanager
+import aiohttp
+import requests
+from urllib.parse import urlparse
+import http_session
+import host_scheduler
+import page_cache
+import deadline
+import metrics
+import tracing
+from page_cache import CachedPage, charset_of
+from scraper_parsing import JUNK_EMAIL_MATCHER, find_email_candidates
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_BYTES = metrics.counter('scraper_http_response_bytes_total', 'Response body bytes read off the network')
+
+# Stop reading a page after this many bytes (catalog pages can be many MB)
+PAGE_MAX_BYTES = int(os.environ.get('PAGE_MAX_BYTES', 2 * 1024 * 1024))
+PAGE_CHUNK_SIZE = int(os.environ.get('PAGE_CHUNK_SIZE', 64 * 1024))
+# Stop as soon as one of these is found on the company's own domain
+PRIORITY_LOCAL_PARTS = frozenset(
+    os.environ.get('PRIORITY_EMAIL_PREFIXES', 'info,sales,wholesale').split(',')
+)
+# Only bodies of these types are read (a missing Content-Type is read too)
+TEXT_CONTENT_TYPES = ('text/', 'application/xhtml', 'application/xml', 'application/json')
+
+# A trailing run of address characters may continue in the next chunk
+_TRAILING_RUN = re.compile(r'[a-z0-9._%+@-]+$', re.IGNORECASE)
+_MAX_CARRY = 512
+
+
+def is_text_content(content_type):
+    """True for Content-Type values worth scanning for emails"""
+    if not content_type:
+        return True
+    return content_type.split(';')[0].strip().lower().startswith(TEXT_CONTENT_TYPES)
+
+
+def site_domain(url):
+    """Host of a page without www., used to recognise the company's own emails"""
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class EmailStreamScanner:
+    """Incremental email scan over a page body arriving in chunks.
+
+    Addresses split across chunk boundaries are found intact. feed() returns True once the page
+    can stop being read: the byte cap was reached or a priority address (info@/sales@/wholesale@)
+    on the site's own domain was seen.
+    """
+
+    def __init__(self, url, max_bytes=None, encoding='utf-8', keep_body=False):
+        self.domain = site_domain(url)
+        self.max_bytes = PAGE_MAX_BYTES if max_bytes is None else max_bytes
+        self.bytes_read = 0
+        self.truncated = False
+        self.stopped_early = False
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._carry = ''
+        self._found = {}
+        # Bytes read so far, kept when the page is going into the page cache
+        self.body = bytearray() if keep_body else None
+
+    @property
+    def candidates(self):
+        """Addresses seen so far, lowercased, in first-seen order"""
+        return list(self._found)
+
+    def is_priority(self, email):
+        local_part, _, domain = email.rpartition('@')
+        if local_part not in PRIORITY_LOCAL_PARTS or not self.domain:
+            return False
+        if JUNK_EMAIL_MATCHER.search(email):
+            return False
+        return (domain == self.domain or domain.endswith('.' + self.domain)
+                or self.domain.endswith('.' + domain))
+
+    def _scan(self, text):
+        hit = False
+        for email in find_email_candidates(text):
+            if email not in self._found:
+                self._found[email] = None
+                hit = hit or self.is_priority(email)
+        return hit
+
+    def feed(self, chunk):
+        # A page of exactly max_bytes is read in full and not truncated; only bytes past the cap are
+        if self.max_bytes and self.bytes_read + len(chunk) > self.max_bytes:
+            chunk = chunk[:self.max_bytes - self.bytes_read]
+            self.truncated = True
+        self.bytes_read += len(chunk)
+        if self.body is not None:
+            self.body += chunk
+
+        text = self._carry + self._decoder.decode(chunk)
+        run = _TRAILING_RUN.search(text)
+        split = run.start() if run else len(text)
+        split = max(split, len(text) - _MAX_CARRY)
+        self._carry = text[split:]
+
+        if '@' in text[:split] and self._scan(text[:split]):
+            self.stopped_early = True
+            return True
+        return self.truncated
+
+    def close(self):
+        """Scan what is left over after the last chunk; returns the candidates"""
+        text = self._carry + self._decoder.decode(b'', final=True)
+        self._carry = ''
+        if text:
+            self._scan(text)
+        return self.candidates
+
+
+def _capped(body, limit):
+    if limit and len(body) >= limit:
+        del body[limit:]
+        return True
+    return False
+
+
+@contextmanager
+def _open(url, timeout, get, method='GET', **kwargs):
+    """Streamed response from the shared session, or from a caller-supplied requests-style get();
+    the host slot is held (and the response left open) until the with block ends, so the body
+    is read inside it"""
+    if get is None:
+        with http_session.stream(url, timeout=timeout, method=method, **kwargs) as response:
+            yield response
+        return
+    with host_scheduler.slot(url, timeout) as timeout:
+        response = get(url, timeout=timeout, stream=True, **kwargs)
+        try:
+            yield response
+        finally:
+            response.close()
+
+
+def _iter_body(response, timeout=None, chunk_size=PAGE_CHUNK_SIZE):
+    """Body chunks of a streamed requests response as they arrive.
+
+    Stops with requests' Timeout once the request has taken `timeout` seconds in all (like the
+    async versions' ClientTimeout(total=...)), and with BudgetExceeded once the active time
+    budget is spent. The read timeout alone only bounds each socket read, and iter_content
+    waits for a whole chunk, so a body dripping in a few bytes at a time would never hand
+    control back; read1 returns whatever has arrived.
+    """
+    stop_at = None
+    if timeout is not None:
+        stop_at = time.monotonic() + max(0.0, timeout - (_elapsed(response) or 0.0))
+
+    def check():
+        deadline.check()
+        if stop_at is not None and time.monotonic() >= stop_at:
+            raise requests.exceptions.Timeout(f"Reading {response.url} took longer than {timeout}s")
+
+    read1 = getattr(getattr(response, 'raw', None), 'read1', None)
+    if read1 is None:
+        # A caller-supplied client, or urllib3 before 2.1
+        for chunk in response.iter_content(chunk_size):
+            check()
+            yield chunk
+        return
+    while True:
+        check()
+        chunk = read1(chunk_size, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _elapsed(response):
+    """Send-to-headers time requests measured, summed over redirect hops (None for other clients)"""
+    try:
+        return sum(hop.elapsed.total_seconds() for hop in list(response.history) + [response])
+    except (AttributeError, TypeError):
+        return None
+
+
+def fetch_page(url, timeout=5, get=None, max_bytes=None, **kwargs):
+    """GET url through the active page cache; returns a CachedPage with a size-capped body.
+
+    Non-text bodies are not read (cached with an empty body).
+    """
+    page = page_cache.lookup(url, need_complete=True)
+    if page is not None:
+        return page
+
+    limit = PAGE_MAX_BYTES if max_bytes is None else max_bytes
+    with tracing.request(url) as event, _open(url, timeout, get, **kwargs) as response:
+        event.mark_response(response.status_code, _elapsed(response))
+        body = bytearray()
+        if is_text_content(response.headers.get('Content-Type', '')):
+            for chunk in _iter_body(response, timeout):
+                body += chunk
+                if _capped(body, limit):
+                    break
+        page = CachedPage(response.status_code, response.url, dict(response.headers), bytes(body))
+        event.mark_body(len(body))
+    RESPONSE_BYTES.inc(len(body))
+    return page_cache.store(url, page)
+
+
+def fetch_head(url, timeout=3, get=None, **kwargs):
+    """HEAD url through the active page cache (a cached GET answers it too)"""
+    page = page_cache.lookup(url, need_body=False)
+    if page is not None:
+        return page
+
+    with tracing.request(url, 'HEAD') as event:
+        if get is None:
+            response = http_session.head(url, timeout=timeout)
+        else:
+            kwargs.setdefault('allow_redirects', True)
+            with host_scheduler.slot(url, timeout) as timeout:
+                response = get(url, timeout=timeout, **kwargs)
+        event.mark_response(response.status_code, _elapsed(response))
+    return page_cache.store(url, CachedPage(response.status_code, response.url, dict(response.headers)))
+
+
+def scan_page(page):
+    """Email candidates in a cached page body"""
+    if not page.body or not is_text_content(page.content_type):
+        return []
+    return find_email_candidates(page.text)
+
+
+def fetch_page_emails(url, timeout=5, get=None, **kwargs):
+    """Email candidates on a page (raises on HTTP errors).
+
+    Served from the page cache when possible; otherwise the body is streamed with the byte cap
+    and early exit of EmailStreamScanner, and what was read goes into the cache.
+    """
+    page = page_cache.lookup(url)
+    if page is None:
+        with tracing.request(url) as event, _open(url, timeout, get, **kwargs) as response:
+            event.mark_response(response.status_code, _elapsed(response))
+            content_type = response.headers.get('Content-Type', '')
+            headers = dict(response.headers)
+            if not response.ok or not is_text_content(content_type):
+                page = CachedPage(response.status_code, response.url, headers, b'')
+            else:
+                scanner = EmailStreamScanner(url, encoding=charset_of(content_type), keep_body=True)
+                for chunk in _iter_body(response, timeout):
+                    if scanner.feed(chunk):
+                        break
+                page = CachedPage(response.status_code, response.url, headers, bytes(scanner.body),
+                                  complete=not scanner.stopped_early)
+                event.mark_body(len(page.body))
+                RESPONSE_BYTES.inc(len(page.body))
+        page_cache.store(url, page)
+
+    page.raise_for_status()
+    return scan_page(page)
+
+
+async def fetch_page_async(session, url, timeout=5, max_bytes=None):
+    """Async fetch_page for an aiohttp session"""
+    page = page_cache.lookup(url, need_complete=True)
+    if page is not None:
+        return page
+
+    limit = PAGE_MAX_BYTES if max_bytes is None else max_bytes
+    with tracing.request(url) as event:
+        async with host_scheduler.slot_async(url, timeout) as timeout:
+            client_timeout = aiohttp.ClientTimeout(total=timeout)
+            async with session.get(url, timeout=client_timeout, allow_redirects=True, trace_request_ctx=event) as response:
+                event.mark_response(response.status)
+                body = bytearray()
+                if is_text_content(response.headers.get('Content-Type', '')):
+                    async for chunk in response.content.iter_chunked(PAGE_CHUNK_SIZE):
+                        body += chunk
+                        if _capped(body, limit):
+                            break
+                page = CachedPage(response.status, str(response.url), dict(response.headers), bytes(body))
+                event.mark_body(len(body))
+    RESPONSE_BYTES.inc(len(body))
+    return page_cache.store(url, page)
+
+
+async def fetch_head_async(session, url, timeout=3):
+    """Async fetch_head for an aiohttp session"""
+    page = page_cache.lookup(url, need_body=False)
+    if page is not None:
+        return page
+
+    with tracing.request(url, 'HEAD') as event:
+        async with host_scheduler.slot_async(url, timeout) as timeout:
+            client_timeout = aiohttp.ClientTimeout(total=timeout)
+            async with session.head(url, timeout=client_timeout, allow_redirects=True, trace_request_ctx=event) as response:
+                event.mark_response(response.status)
+                page = CachedPage(response.status, str(response.url), dict(response.headers))
+    return page_cache.store(url, page)
+
+
+async def fetch_page_emails_async(session, url, timeout=5):
+    """Async fetch_page_emails for an aiohttp session"""
+    page = page_cache.lookup(url)
+    if page is None:
+        with tracing.request(url) as event:
+            async with host_scheduler.slot_async(url, timeout) as timeout:
+                client_timeout = aiohttp.ClientTimeout(total=timeout)
+                async with session.get(url, timeout=client_timeout, allow_redirects=True, trace_request_ctx=event) as response:
+                    event.mark_response(response.status)
+                    content_type = response.headers.get('Content-Type', '')
+                    headers = dict(response.headers)
+                    if response.status >= 400 or not is_text_content(content_type):
+                        page = CachedPage(response.status, str(response.url), headers, b'')
+                    else:
+                        scanner = EmailStreamScanner(url, encoding=charset_of(content_type), keep_body=True)
+                        async for chunk in response.content.iter_chunked(PAGE_CHUNK_SIZE):
+                            if scanner.feed(chunk):
+                                break
+                        page = CachedPage(response.status, str(response.url), headers, bytes(scanner.body),
+                                          complete=not scanner.stopped_early)
+                        event.mark_body(len(page.body))
+                        RESPONSE_BYTES.inc(len(page.body))
+        page_cache.store(url, page)
+
+    page.raise_for_status()
+    return scan_page(page)
@@ -0,0 +1,133 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+from scraper_parsing import clean_company_name
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.environ.get('SCRAPER_DATA_DIR', os.path.join(tempfile.gettempdir(), 'fashiongo_scraper'))
+RESULT_CACHE_PATH = os.environ.get('RESULT_CACHE_PATH', os.path.join(DATA_DIR, 'result_cache.db'))
+# How long a found email is trusted, and how long "nothing found" is remembered (seconds)
+RESULT_CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL', 30 * 24 * 3600))
+RESULT_CACHE_NEGATIVE_TTL = int(os.environ.get('RESULT_CACHE_NEGATIVE_TTL', 7 * 24 * 3600))
+RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', '1') != '0'
+
+_init_lock = threading.Lock()
+_initialized_paths = set()
+
+
+def cache_key(company_name):
+    """Normalized company name used as the cache key"""
+    clean_name = clean_company_name(company_name)
+    if not clean_name:
+        return None
+    return re.sub(r'\s+', ' ', clean_name).lower()
+
+
+def _connect(path=None):
+    path = path or RESULT_CACHE_PATH
+    if path not in _initialized_paths:
+        with _init_lock:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            conn = sqlite3.connect(path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS company_results (
+                    company_key TEXT PRIMARY KEY,
+                    company_name TEXT,
+                    website TEXT,
+                    email TEXT,
+                    email_source TEXT,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.commit()
+            conn.close()
+            _initialized_paths.add(path)
+    return sqlite3.connect(path, timeout=30)
+
+
+def get_many(company_names, path=None):
+    """Fresh cached results for the given names: {company_name: {'email', 'source', 'website'}}"""
+    if not RESULT_CACHE_ENABLED:
+        return {}
+
+    keys = {}
+    for name in company_names:
+        key = cache_key(name)
+        if key:
+            keys.setdefault(key, []).append(name)
+    if not keys:
+        return {}
+
+    now = time.time()
+    hits = {}
+    try:
+        conn = _connect(path)
+        try:
+            key_list = list(keys)
+            for start in range(0, len(key_list), 500):
+                batch = key_list[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = conn.execute(
+                    f'SELECT company_key, website, email, email_source, updated_at '
+                    f'FROM company_results WHERE company_key IN ({placeholders})',
+                    batch
+                ).fetchall()
+                for key, website, email, source, updated_at in rows:
+                    ttl = RESULT_CACHE_TTL if email else RESULT_CACHE_NEGATIVE_TTL
+                    if now - updated_at > ttl:
+                        continue
+                    for name in keys[key]:
+                        hits[name] = {'email': email, 'source': source, 'website': website}
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"Result cache lookup failed: {str(e)}")
+        return {}
+
+    return hits
+
+
+def put(company_name, email, source, website=None, path=None):
+    """Store the outcome for a company (errors are not cached)"""
+    if not RESULT_CACHE_ENABLED:
+        return
+    key = cache_key(company_name)
+    if not key or (source and str(source).startswith('Error')):
+        return
+
+    try:
+        conn = _connect(path)
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO company_results '
+                '(company_key, company_name, website, email, email_source, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, str(company_name), website, email, source, time.time())
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"Result cache write failed for {company_name}: {str(e)}")
+
+
+def purge_expired(path=None):
+    """Delete entries past their TTL; returns the number removed"""
+    now = time.time()
+    conn = _connect(path)
+    try:
+        cursor = conn.execute(
+            'DELETE FROM company_results WHERE '
+            '(email IS NOT NULL AND updated_at < ?) OR (email IS NULL AND updated_at < ?)',
+            (now - RESULT_CACHE_TTL, now - RESULT_CACHE_NEGATIVE_TTL)
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
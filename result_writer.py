@@ -0,0 +1,156 @@
+import os
+import csv
+import logging
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _cell(value, missing=''):
+    """Missing values (None, NaN, NaT) are written as empty cells, like DataFrame.to_csv does"""
+    try:
+        return missing if pd.isna(value) else value
+    except (TypeError, ValueError):
+        return value
+
+
+class CsvResultWriter:
+    """Appends result rows to a CSV file, flushing each one so the file can be downloaded mid-job.
+
+    The header is taken from fieldnames, or from the first row written; keys a later row
+    doesn't have are left blank and keys the header doesn't have are dropped. bytes_written is
+    the file size after the last complete row (quoted cells may hold newlines, so a partial
+    download can't just cut at the last line break).
+    """
+
+    def __init__(self, path, fieldnames=None):
+        self.path = path
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self.rows_written = 0
+        self.bytes_written = 0
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = None
+        if self.fieldnames:
+            self._start()
+
+    def _start(self):
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore', restval='')
+        self._writer.writeheader()
+
+    def write(self, row):
+        if self._writer is None:
+            self.fieldnames = list(row)
+            self._start()
+        self._writer.writerow({key: _cell(value) for key, value in row.items()})
+        self.rows_written += 1
+        self._file.flush()
+        self.bytes_written = self._file.tell()
+
+    def close(self):
+        if not self._file.closed:
+            if self._writer is None and self.fieldnames:
+                self._start()
+            self._file.close()
+
+
+class XlsxResultWriter:
+    """Appends result rows to an XLSX file with openpyxl's write-only (constant memory) workbook.
+
+    Rows go straight to a temporary sheet file; the workbook is only readable once closed.
+    """
+
+    def __init__(self, path, fieldnames=None):
+        from openpyxl import Workbook
+        self.path = path
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self.rows_written = 0
+        # Nothing is readable before close()
+        self.bytes_written = 0
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet()
+        self._closed = False
+        if self.fieldnames:
+            self._sheet.append(self.fieldnames)
+
+    def write(self, row):
+        if self.fieldnames is None:
+            self.fieldnames = list(row)
+            self._sheet.append(self.fieldnames)
+        self._sheet.append([_cell(row.get(field), None) for field in self.fieldnames])
+        self.rows_written += 1
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._workbook.save(self.path)
+
+
+def open_writer(path, fieldnames=None):
+    """CSV or XLSX writer, by the output file's extension"""
+    if path.lower().endswith('.xlsx'):
+        return XlsxResultWriter(path, fieldnames)
+    return CsvResultWriter(path, fieldnames)
+
+
+class OrderedResultWriter:
+    """Writes output rows in input order, each as soon as it and every row before it are done.
+
+    rows yields (input row, company name) in file order and is consumed lazily, so input rows
+    don't have to be held in memory; format_row(row, company_name, result) builds an output row.
+    Results can arrive in any order. Several rows may share a company, so results are kept
+    until close(); with unique_companies (rows from company_file.iter_unique_rows) a result is
+    dropped as soon as its row is written, so only those waiting on an earlier row are held.
+    """
+
+    def __init__(self, writer, rows, format_row, unique_companies=False):
+        self.writer = writer
+        self._rows = iter(rows)
+        self._format_row = format_row
+        self._unique_companies = unique_companies
+        self._results = {}
+        self._waiting = None
+
+    @property
+    def rows_written(self):
+        return self.writer.rows_written
+
+    @property
+    def bytes_written(self):
+        """Size of the output up to the end of the last row written"""
+        return self.writer.bytes_written
+
+    def add(self, company_name, result):
+        self._results[company_name] = result
+        self._drain()
+
+    def _drain(self):
+        while True:
+            if self._waiting is None:
+                self._waiting = next(self._rows, None)
+                if self._waiting is None:
+                    return
+            row, company_name = self._waiting
+            if company_name not in self._results:
+                return
+            if self._unique_companies:
+                result = self._results.pop(company_name)
+            else:
+                result = self._results[company_name]
+            self.writer.write(self._format_row(row, company_name, result))
+            self._waiting = None
+
+    def close(self):
+        self._drain()
+        self.writer.close()
+
+
+def iter_file_prefix(path, size, chunk_size=64 * 1024):
+    """The first size bytes of a file, in chunks (the file may keep growing meanwhile)"""
+    with open(path, 'rb') as f:
+        remaining = size
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
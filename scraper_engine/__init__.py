@@ -0,0 +1,23 @@
+"""Email-finding engine behind the Flask front-ends.
+
+A Pipeline runs one company through the steps of a profile - 'fast', 'accurate' or
+'exhaustive' (see profiles.PROFILES):
+
+    from scraper_engine import get_pipeline
+    email, source = get_pipeline('accurate').find_email('Acme Apparel')
+
+Pipeline.process searches a whole upload; Pipeline.format_row turns its results into output
+rows (see rows.ROW_LAYOUTS).
+
+Upload jobs run the exhaustive ladder concurrently through async_engine / shard_executor.
+"""
+from scraper_engine.profiles import PROFILES, DEFAULT_PROFILE, get_profile
+from scraper_engine.pipeline import Pipeline, CompanySearch, get_pipeline, find_email
+from scraper_engine.steps import ACCURATE_PAGES, find_emails_on_page
+from scraper_engine.rows import ROW_LAYOUTS
+
+__all__ = [
+    'PROFILES', 'DEFAULT_PROFILE', 'get_profile',
+    'Pipeline', 'CompanySearch', 'get_pipeline', 'find_email',
+    'ACCURATE_PAGES', 'find_emails_on_page', 'ROW_LAYOUTS',
+]
@@ -0,0 +1,175 @@
+import time
+import logging
+import threading
+import page_cache
+import hit_stats
+import deadline
+import metrics
+from scraper_parsing import strategy_of
+from scraper_engine import steps
+from scraper_engine.rows import ROW_LAYOUTS
+from scraper_engine.profiles import DEFAULT_PROFILE, get_profile
+
+logger = logging.getLogger(__name__)
+
+
+class CompanySearch:
+    """One company on its way through a pipeline: the name as given, its cleaned form, and the
+    website once a finder has found it"""
+
+    __slots__ = ('company', 'name', 'profile', 'website')
+
+    def __init__(self, company, name, profile):
+        self.company = company
+        self.name = name
+        self.profile = profile
+        self.website = None
+
+
+class Pipeline:
+    """Email search of a profile: a website finder, then email steps until one finds an address.
+
+    Pipeline('accurate') runs a profile as defined; keyword overrides change single settings,
+    e.g. Pipeline('exhaustive', steps=('site_pages',)).
+    """
+
+    def __init__(self, profile=DEFAULT_PROFILE, **overrides):
+        self.name = profile
+        self.profile = get_profile(profile, **overrides)
+        try:
+            self.clean_company_name = steps.NAME_CLEANERS[self.profile['name_cleaner']]
+            self._find_website = steps.WEBSITE_FINDERS[self.profile['website']]
+            self._steps = [(name, steps.EMAIL_STEPS[name]) for name in self.profile['steps']]
+            steps.EMAIL_FILTERS[self.profile['email_filter']]
+        except KeyError as e:
+            raise ValueError(f"Profile {profile!r} names an unknown step, finder, cleaner or filter: {e}") from None
+
+    def find_email(self, company_name):
+        """(email, source) for one company; without an email, source says why.
+
+        Runs under its own page cache and the profile's time budget (COMPANY_TIME_BUDGET when
+        it is None, no limit when 0).
+        """
+        with page_cache.scope(), deadline.scope(self.profile['time_budget']):
+            started = time.monotonic()
+            email, source = self._search(company_name)
+            if not email and deadline.expired():
+                # Not a real "not found": the steps stopped when the company's budget ran out
+                metrics.record_company('cut_off', time.monotonic() - started)
+                return None, deadline.cut_off_source(deadline.current().budget)
+            hit_stats.record('strategy', strategy_of(source if email else None), bool(email))
+            metrics.record_company(strategy_of(source) if email else 'not_found', time.monotonic() - started)
+            return email, source
+
+    def _search(self, company_name):
+        try:
+            if not company_name:
+                return None, None
+
+            logger.info(f"Searching for emails for: {company_name}")
+            search = CompanySearch(company_name, self.clean_company_name(company_name), self.profile)
+            if search.name:
+                search.website = self._find_website(search)
+            if not search.website:
+                logger.info(f"No website found for {company_name}")
+                return None, self.profile['no_website'].format(company=company_name)
+
+            logger.info(f"Found website for {company_name}: {search.website}")
+            for name, step in self._steps:
+                with metrics.stage(name):
+                    found = step(search)
+                if found:
+                    logger.info(f"Found email for {company_name}: {found[0]} ({found[1]})")
+                    return found
+
+            return None, self.profile['no_email'].format(company=company_name, website=search.website)
+
+        except Exception as e:
+            logger.error(f"Error finding email for {company_name}: {str(e)}")
+            return None, f"Error: {str(e)}"
+
+    def unique_companies(self, rows, column='company', limit=None):
+        """(cleaned name, row) for the first row of each distinct company, at most limit of them
+        (the profile's max_companies when None, no cap when that is None too)"""
+        limit = self.profile['max_companies'] if limit is None else limit
+        seen = set()
+        for row in rows:
+            company_name = self.clean_company_name(row.get(column, ''))
+            if not company_name or company_name in seen:
+                continue
+            seen.add(company_name)
+            yield company_name, row
+            if limit and len(seen) >= limit:
+                break
+
+    def named_rows(self, rows, column='company', limit=None):
+        """(company name as given, row) for every row with a company, at most limit of them"""
+        limit = self.profile['max_companies'] if limit is None else limit
+        count = 0
+        for row in rows:
+            value = row.get(column, '')
+            if not self.clean_company_name(value):
+                continue
+            yield str(value).strip(), row
+            count += 1
+            if limit and count >= limit:
+                break
+
+    def process(self, rows, column='company', limit=None, on_result=None, dedupe=True):
+        """Search every distinct company in rows (dicts, or pandas rows), one after another.
+
+        Returns a result per company - {'company', 'email', 'source', 'row', 'error'} - and
+        hands each to on_result as soon as it is made. email is None when none was found;
+        error is set when the search itself failed. With dedupe=False every row with a company
+        gets its own result, and 'company' is the name as given rather than the cleaned one.
+        """
+        if dedupe:
+            companies = list(self.unique_companies(rows, column, limit))
+        else:
+            companies = list(self.named_rows(rows, column, limit))
+        logger.info(f"Processing {len(companies)} unique companies with the {self.name} profile")
+        started = time.time()
+        results = []
+        for i, (company_name, row) in enumerate(companies):
+            logger.info(f"Processing {i+1}/{len(companies)}: {company_name}")
+            try:
+                email, source = self.find_email(company_name)
+                result = {'company': company_name, 'email': email, 'source': source, 'row': row, 'error': None}
+            except Exception as e:
+                logger.error(f"Error processing {company_name}: {str(e)}")
+                result = {'company': company_name, 'email': None, 'source': f"Error: {str(e)}", 'row': row, 'error': str(e)}
+            results.append(result)
+            if on_result:
+                on_result(result)
+        hit_stats.flush()
+        logger.info(f"Processed {len(results)} companies in {time.time() - started:.2f} seconds")
+        return results
+
+    @staticmethod
+    def format_row(result, layout='summary', company_column='company'):
+        """Output row of a process() result in one of rows.ROW_LAYOUTS"""
+        try:
+            formatter = ROW_LAYOUTS[layout]
+        except KeyError:
+            raise ValueError(f"Unknown row layout {layout!r} (expected one of: {', '.join(ROW_LAYOUTS)})") from None
+        return formatter(result, company_column)
+
+
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+
+def get_pipeline(profile=DEFAULT_PROFILE):
+    """Process-wide Pipeline of a profile as defined (the same object for the same name)"""
+    pipeline = _pipelines.get(profile)
+    if pipeline is None:
+        with _pipelines_lock:
+            pipeline = _pipelines.get(profile)
+            if pipeline is None:
+                pipeline = _pipelines[profile] = Pipeline(profile)
+    return pipeline
+
+
+def find_email(company_name, profile=DEFAULT_PROFILE):
+    """(email, source) for one company with the shared pipeline of a profile"""
+    return get_pipeline(profile).find_email(company_name)
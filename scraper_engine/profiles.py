@@ -0,0 +1,67 @@
+import os
+
+# Profile used when a front-end doesn't name one
+DEFAULT_PROFILE = os.environ.get('SCRAPER_PROFILE', 'exhaustive')
+
+# How each profile searches a company: 'website' finds the site, then 'steps' run in order
+# until one returns an email. Step, finder, cleaner and filter names refer to the tables in
+# scraper_engine.steps.
+PROFILES = {
+    # Three .com guesses checked with HEAD, then the homepage and /contact; falls back to info@
+    'fast': {
+        'name_cleaner': 'standard',
+        'website': 'probe',
+        'probe_domains': 'quick',
+        'probe_schemes': ('https',),
+        'probe_method': 'HEAD',
+        'probe_timeout': 3,
+        'steps': ('homepage', 'contact_page', 'email_guess'),
+        'contact_paths': ('/contact',),
+        'page_timeout': 5,
+        'email_filter': 'any',
+        'time_budget': 0,
+        'max_companies': 300,
+        'no_website': 'Website not found for {company}',
+        'no_email': 'No emails found on {website}',
+    },
+    # Three .com guesses over https and http, then wholesale/trade/contact/homepage in learned
+    # order; real addresses only, never a guess
+    'accurate': {
+        'name_cleaner': 'conservative',
+        'website': 'probe',
+        'probe_domains': 'simple',
+        'probe_schemes': ('https', 'http'),
+        'probe_method': 'GET',
+        'probe_timeout': 4,
+        'steps': ('ranked_pages',),
+        'page_timeout': 4,
+        'email_filter': 'business',
+        'time_budget': 0,
+        'max_companies': 150,
+        'no_website': 'No website found for {company}',
+        'no_email': 'Website found ({website}) but no emails',
+    },
+    # Direct guesses over every TLD and search engines, then the speculative site-page fetch,
+    # a format guess, business subdomains and social profiles, within COMPANY_TIME_BUDGET
+    'exhaustive': {
+        'name_cleaner': 'standard',
+        'website': 'search',
+        'steps': ('site_pages', 'email_guess', 'subdomains', 'social_media'),
+        'page_timeout': 5,
+        'email_filter': 'prioritized',
+        'time_budget': None,
+        'max_companies': None,
+        'no_website': 'No website found',
+        'no_email': 'No emails found on {website}',
+    },
+}
+
+
+def get_profile(name, **overrides):
+    """Settings of a named profile, with overrides applied (a copy; PROFILES is never changed)"""
+    if name not in PROFILES:
+        raise ValueError(f"Unknown profile {name!r} (expected one of: {', '.join(PROFILES)})")
+    unknown = [key for key in overrides if key not in PROFILES[name]]
+    if unknown:
+        raise ValueError(f"Unknown profile settings: {', '.join(unknown)}")
+    return dict(PROFILES[name], **overrides)
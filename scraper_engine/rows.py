@@ -0,0 +1,54 @@
+import pandas as pd
+import deadline
+
+
+def summary_row(result, company_column='company'):
+    """company, email, source, then the other input columns ('Not found' without an email;
+    only the first three on a failed search)"""
+    if result.get('error'):
+        return {'company': result['company'], 'email': 'Error occurred', 'source': result['source']}
+    row = {
+        'company': result['company'],
+        'email': result['email'] if result['email'] else 'Not found',
+        'source': result['source'] if result['source'] else 'No source available'
+    }
+    # Add any additional columns from original data
+    for col, value in result['row'].items():
+        if col != company_column and str(col).lower() not in ['company']:
+            row[col] = value
+    return row
+
+
+def text_row(result, company_column='company'):
+    """summary_row with every value as text: '' without an email, blank cells as ''"""
+    row = {
+        'company': str(result['company']),
+        'email': str(result['email']) if result['email'] else '',
+        'source': str(result['source']) if result['source'] else 'No emails found'
+    }
+    for col, value in result['row'].items():
+        if col != company_column and str(col).lower() not in ['company']:
+            row[col] = str(value) if not pd.isna(value) else ''
+    return row
+
+
+def annotated_row(result, company_column='company'):
+    """The input row with found_email, email_source and processed_company_name added"""
+    row = dict(result['row'])
+    if result.get('error'):
+        row['found_email'] = 'Error'
+    elif result['email']:
+        row['found_email'] = result['email']
+    else:
+        row['found_email'] = deadline.CUT_OFF_SOURCE if deadline.is_cut_off(result['source']) else 'Not found'
+    row['email_source'] = result['source'] if result['source'] else 'N/A'
+    row['processed_company_name'] = result['company']
+    return row
+
+
+# Output row layouts of Pipeline.format_row
+ROW_LAYOUTS = {
+    'summary': summary_row,
+    'text': text_row,
+    'annotated': annotated_row,
+}
@@ -0,0 +1,386 @@
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import domain_probe
+import dns_filter
+import page_reader
+import page_cache
+import hit_stats
+import deadline
+import metrics
+from scraper_parsing import (
+    CONTACT_PAGES, DIRECT_GUESS_TLDS, BUSINESS_SUBDOMAINS,
+    clean_company_name, clean_company_name_conservative, extract_emails_from_html, prioritize_emails,
+    build_search_engines, generate_direct_website_guesses, quick_domain_guesses, simple_domain_guesses,
+    extract_business_urls_from_search, is_valid_business_url, guess_email_format,
+    extract_contact_links, subdomain_base, build_social_platforms,
+    extract_social_media_urls, extract_email_from_social_text,
+    guessed_tld, contact_path_of, pick_any_email, pick_business_email, pick_prioritized_email
+)
+
+logger = logging.getLogger(__name__)
+
+# Pages the accurate profile checks on a site (at most 4, to go easy on small servers); the
+# built-in order puts wholesale first, later runs use the order that has found emails most often
+ACCURATE_PAGES = [
+    '/wholesale',        # #1 priority - where fashion companies put B2B contacts
+    '/trade',           # #2 priority - another common B2B page
+    '/contact',         # General contact
+    ''                  # Homepage
+]
+
+NAME_CLEANERS = {
+    'standard': clean_company_name,
+    'conservative': clean_company_name_conservative,
+}
+EMAIL_FILTERS = {
+    'any': pick_any_email,
+    'business': pick_business_email,
+    'prioritized': pick_prioritized_email,
+}
+DOMAIN_GUESSERS = {
+    'quick': quick_domain_guesses,
+    'simple': simple_domain_guesses,
+}
+
+def find_emails_on_page(url, timeout=5):
+    """Enhanced email extraction from webpages with better filtering"""
+    try:
+        # Capped, text-only, stops at the site's own info@/sales@/wholesale@; served from the page cache if seen
+        return prioritize_emails(page_reader.fetch_page_emails(url, timeout=timeout))
+    
+    except requests.exceptions.Timeout:
+        logger.warning(f"Timeout fetching {url}")
+        return []
+    except Exception as e:
+        logger.warning(f"Error fetching {url}: {str(e)}")
+        return []
+
+def fetch_page_text(url, timeout=5):
+    """Page body as text (size-capped), or None if it can't be fetched"""
+    try:
+        page = page_reader.fetch_page(url, timeout=timeout)
+        page.raise_for_status()
+        
+        return page.text
+    
+    except Exception as e:
+        logger.warning(f"Error fetching {url}: {str(e)}")
+        return None
+
+def search_company_website(company_name):
+    """Enhanced multi-strategy website search with direct guessing and fallbacks"""
+    try:
+        if not company_name:
+            return None
+            
+        clean_name = clean_company_name(company_name)
+        if not clean_name:
+            return None
+            
+        # Strategy 1: Direct Website Guessing (Most Reliable)
+        # Drop guesses whose domain doesn't resolve before any HTTP probe
+        # TLDs are tried in the order that has found sites most often
+        with metrics.stage('direct_guess'):
+            direct_urls = dns_filter.filter_resolvable(
+                generate_direct_website_guesses(clean_name, tlds=hit_stats.ranked('tld', DIRECT_GUESS_TLDS))
+            )
+            url = domain_probe.first_success(direct_urls, test_guessed_website)
+        if url:
+            logger.info(f"Found via direct guess: {url}")
+            return url
+        
+        # Strategy 2: Simplified Search Engines (Faster & More Reliable)
+        with metrics.stage('search_engines'):
+            for engine in build_search_engines(clean_name):
+                try:
+                    page = page_reader.fetch_page(engine['url'], timeout=engine['timeout'])
+                    if page.status == 200:
+                        urls = extract_business_urls_from_search(page.text, clean_name)
+                        for url in urls[:3]:  # Check top 3 results
+                            if is_valid_business_url(url):
+                                logger.info(f"Found via {engine['name']}: {url}")
+                                return url
+                except Exception as e:
+                    logger.warning(f"{engine['name']} search failed: {str(e)}")
+                    continue
+        
+        logger.info(f"No website found for {clean_name}")
+        return None
+        
+    except Exception as e:
+        logger.error(f"Error searching for {company_name}: {str(e)}")
+        return None
+
+def test_website_exists(url):
+    """Quickly test if a website exists and is accessible"""
+    try:
+        page = page_reader.fetch_head(url, timeout=3)
+        return page.status in [200, 301, 302, 403]  # 403 might still have contact info
+    except:
+        return False
+
+def test_guessed_website(url):
+    """test_website_exists for a direct guess, counted toward the TLD hit rates"""
+    exists = test_website_exists(url)
+    tld = guessed_tld(url)
+    # Probes cut short by the time budget say nothing about the TLD
+    if tld and not deadline.expired():
+        hit_stats.record('tld', tld, exists)
+    return exists
+
+def find_email_on_site_pages(website):
+    """Homepage, contact paths and homepage contact links, fetched speculatively.
+    
+    The first wave fetches the homepage and the top contact paths at once; the contact links
+    found on the homepage start as soon as it arrives. Results are taken in priority order
+    (homepage, first-wave paths, homepage links, remaining paths), so the source is the same
+    one a one-by-one ladder would report. Returns (email, source) or None.
+    """
+    # Contact paths in the order that has produced emails most often
+    contact_urls = [website.rstrip('/') + page for page in hit_stats.ranked('contact_path', CONTACT_PAGES)]
+    first_paths = contact_urls[:domain_probe.FIRST_WAVE_CONTACT_PAGES]
+    
+    def find_emails_on_contact_path(url):
+        emails = find_emails_on_page(url)
+        if not deadline.expired():
+            hit_stats.record('contact_path', contact_path_of(url, website), bool(emails))
+        return emails
+    
+    executor = ThreadPoolExecutor(max_workers=3)
+    try:
+        homepage_future = executor.submit(contextvars.copy_context().run, fetch_page_text, website)
+        paths_future = executor.submit(
+            contextvars.copy_context().run, domain_probe.first_result,
+            first_paths, find_emails_on_contact_path, len(first_paths) or 1
+        )
+        
+        homepage_html = homepage_future.result()
+        emails = extract_emails_from_html(homepage_html or '')
+        if emails:
+            return emails[0], f"Main page: {website}"
+        
+        # Links already covered by the first-wave paths aren't fetched twice
+        in_first_wave = {page_cache.normalize_url(url) for url in first_paths}
+        contact_links = [
+            link for link in find_contact_links(website, homepage_html or '')
+            if page_cache.normalize_url(link) not in in_first_wave
+        ]
+        links_future = executor.submit(
+            contextvars.copy_context().run, domain_probe.first_result,
+            contact_links, find_emails_on_page, len(contact_links) or 1
+        )
+        
+        found = paths_future.result()
+        if found:
+            return found[1][0], f"Contact page: {found[0]}"
+        
+        found = links_future.result()
+        if found:
+            return found[1][0], f"Dynamic contact page: {found[0]}"
+    finally:
+        # Don't wait on slower fetches once a winner is known
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    # Second wave: the remaining contact paths, still read in list order
+    found = domain_probe.first_result(
+        contact_urls[len(first_paths):], find_emails_on_contact_path,
+        wave_size=domain_probe.FIRST_WAVE_CONTACT_PAGES
+    )
+    if found:
+        return found[1][0], f"Contact page: {found[0]}"
+    return None
+
+def find_contact_links(website_url, homepage_html=None):
+    """Dynamically find contact page links from homepage (pass the HTML if it was already fetched)"""
+    try:
+        if homepage_html is None:
+            homepage_html = fetch_page_text(website_url)
+        
+        return extract_contact_links(homepage_html or '', website_url)
+        
+    except Exception as e:
+        logger.warning(f"Error finding contact links on {website_url}: {str(e)}")
+        return []
+
+def check_subdomains_for_emails(main_website, company_name):
+    """Check common business subdomains for contact emails"""
+    try:
+        # Extract base domain
+        base_domain = subdomain_base(main_website)
+        
+        subdomain_urls = dns_filter.filter_resolvable(
+            f"https://{subdomain}.{base_domain}" for subdomain in BUSINESS_SUBDOMAINS
+        )
+        
+        for subdomain_url in subdomain_urls:
+            try:
+                if test_website_exists(subdomain_url):
+                    emails = find_emails_on_page(subdomain_url)
+                    if emails:
+                        logger.info(f"Found email on subdomain for {company_name}: {emails[0]}")
+                        return emails[0], subdomain_url
+                
+            except Exception:
+                continue
+                
+        return None
+        
+    except Exception as e:
+        logger.warning(f"Error checking subdomains: {str(e)}")
+        return None
+
+def extract_email_from_social_media(company_name):
+    """Extract emails from social media profiles (Instagram, Facebook, LinkedIn, Twitter)"""
+    try:
+        logger.info(f"Checking social media for {company_name}")
+        
+        # Clean company name for social media search
+        clean_name = clean_company_name(company_name)
+        if not clean_name:
+            return None
+        
+        for platform in build_social_platforms(clean_name):
+            try:
+                # Search for social media profiles
+                page = page_reader.fetch_page(platform['search_url'], timeout=platform['timeout'])
+                if page.status == 200:
+                    # Find social media profile URLs
+                    profile_urls = extract_social_media_urls(page.text, platform['profile_indicators'], clean_name)
+                    
+                    # Check each profile for contact info
+                    for profile_url in profile_urls[:2]:  # Check top 2 profiles per platform
+                        try:
+                            email = extract_email_from_social_profile(profile_url, platform['name'])
+                            if email:
+                                logger.info(f"Found email on {platform['name']} for {company_name}: {email}")
+                                return email, f"{platform['name']} profile"
+                            
+                        except Exception as e:
+                            logger.warning(f"Error checking {platform['name']} profile {profile_url}: {str(e)}")
+                            continue
+                
+            except Exception as e:
+                logger.warning(f"Error searching {platform['name']}: {str(e)}")
+                continue
+        
+        return None
+        
+    except Exception as e:
+        logger.warning(f"Error in social media extraction: {str(e)}")
+        return None
+
+def extract_email_from_social_profile(profile_url, platform_name):
+    """Extract email from individual social media profile"""
+    try:
+        page = page_reader.fetch_page(profile_url, timeout=5)
+        page.raise_for_status()
+        
+        return extract_email_from_social_text(page.text)
+        
+    except Exception as e:
+        logger.warning(f"Error extracting from {platform_name} profile {profile_url}: {str(e)}")
+        return None
+
+# Website finders: the company's site URL, or None
+
+def search_website(search):
+    """Direct guesses over every TLD, then search engines"""
+    return search_company_website(search.name)
+
+def probe_common_domains(search):
+    """First of the profile's .com guesses that answers 200 (over each of its schemes in turn)"""
+    profile = search.profile
+    with metrics.stage('direct_guess'):
+        for domain in DOMAIN_GUESSERS[profile['probe_domains']](search.name):
+            for scheme in profile['probe_schemes']:
+                url = f"{scheme}://{domain}"
+                try:
+                    if profile['probe_method'] == 'HEAD':
+                        page = page_reader.fetch_head(url, timeout=profile['probe_timeout'])
+                    else:
+                        # Goes into the page cache, so the homepage check doesn't download it again
+                        page = page_reader.fetch_page(url, timeout=profile['probe_timeout'])
+                    if page.status == 200:
+                        return url
+                except Exception:
+                    continue
+    return None
+
+# Email steps: (email, source) once one is found, else None
+
+def page_email(search, url):
+    """The address the profile's filter picks from a page, or None"""
+    try:
+        candidates = page_reader.fetch_page_emails(url, timeout=search.profile['page_timeout'])
+    except Exception as e:
+        logger.debug(f"Error fetching {url}: {str(e)}")
+        return None
+    return EMAIL_FILTERS[search.profile['email_filter']](candidates)
+
+def homepage(search):
+    email = page_email(search, search.website)
+    if email:
+        return email, f"Homepage: {search.website}"
+    return None
+
+def contact_page(search):
+    """The profile's contact_paths, in order"""
+    for path in search.profile['contact_paths']:
+        url = search.website.rstrip('/') + path
+        email = page_email(search, url)
+        if email:
+            return email, f"Contact page: {url}"
+    return None
+
+def ranked_pages(search):
+    """ACCURATE_PAGES in the order that has found emails most often"""
+    for page in hit_stats.ranked('accurate_page', ACCURATE_PAGES):
+        url = f"{search.website.rstrip('/')}{page}" if page else search.website
+        email = page_email(search, url)
+        hit_stats.record('accurate_page', page, bool(email))
+        if email:
+            return email, f"Found on {search.website} ({page if page else 'homepage'})"
+    return None
+
+def site_pages(search):
+    """Homepage, contact paths and homepage contact links, fetched speculatively"""
+    return find_email_on_site_pages(search.website)
+
+def email_guess(search):
+    guessed_email = guess_email_format(search.company, search.website)
+    if guessed_email:
+        logger.info(f"Guessed email format for {search.company}: {guessed_email}")
+        return guessed_email, f"Email format guess: {search.website}"
+    return None
+
+def subdomains(search):
+    subdomain_email = check_subdomains_for_emails(search.website, search.company)
+    if subdomain_email:
+        return subdomain_email[0], f"Subdomain: {subdomain_email[1]}"
+    return None
+
+def social_media(search):
+    try:
+        social_email = extract_email_from_social_media(search.company)
+    except Exception as e:
+        logger.warning(f"Social media extraction failed for {search.company}: {str(e)}")
+        return None
+    if social_email:
+        return social_email[0], f"Social media: {social_email[1]}"
+    return None
+
+WEBSITE_FINDERS = {
+    'search': search_website,
+    'probe': probe_common_domains,
+}
+EMAIL_STEPS = {
+    'homepage': homepage,
+    'contact_page': contact_page,
+    'ranked_pages': ranked_pages,
+    'site_pages': site_pages,
+    'email_guess': email_guess,
+    'subdomains': subdomains,
+    'social_media': social_media,
+}
@@ -0,0 +1,516 @@
+import re
+import html
+import logging
+import pandas as pd
+from urllib.parse import urljoin, urldefrag
+
+logger = logging.getLogger(__name__)
+
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+
+# Page scan pattern: the lookbehind only lets a match start at the beginning of a run of
+# address characters, so long minified/base64 runs are not rescanned from every offset.
+# Also covers mailto: links, which the standard pattern's word boundaries can miss.
+PAGE_EMAIL_PATTERN = re.compile(
+    r'(?<![a-z0-9._%+-])[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}',
+    re.IGNORECASE
+)
+
+# Fake/template addresses and common non-business senders, matched anywhere in the address
+FAKE_EMAIL_MARKERS = (
+    'example.com', 'test.com', 'placeholder', 'yoursite', 'yourdomain',
+    'samplewebsite', 'domain.com', 'email.com', 'website.com',
+    'admin@admin', 'test@test', 'user@domain'
+)
+NON_BUSINESS_EMAIL_MARKERS = (
+    'noreply', 'no-reply', 'donotreply', 'unsubscribe', 'bounce',
+    'mailer-daemon', 'postmaster', 'root@', 'webmaster'
+)
+JUNK_EMAIL_MATCHER = re.compile('|'.join(map(re.escape, FAKE_EMAIL_MARKERS + NON_BUSINESS_EMAIL_MARKERS)))
+
+# "info@", "sales@", ... anywhere in the address means the local part ends with one of these
+BUSINESS_LOCAL_SUFFIXES = (
+    'info', 'contact', 'sales', 'support', 'hello', 'inquiry',
+    'business', 'office', 'admin', 'service', 'help'
+)
+
+# Comprehensive contact page list (major success rate boost)
+CONTACT_PAGES = [
+    '/contact', '/contact-us', '/contact_us', '/contactus',
+    '/about', '/about-us', '/about_us', '/aboutus',
+    '/support', '/help', '/customer-service', '/customer_service',
+    '/info', '/information', '/reach-us', '/reach_us',
+    '/get-in-touch', '/touch', '/connect', '/feedback',
+    '/sales', '/business', '/office', '/headquarters',
+    '/team', '/staff', '/management', '/leadership'
+]
+
+# Comprehensive TLD list for direct website guesses (major success rate boost)
+DIRECT_GUESS_TLDS = [
+    '.com', '.net', '.org', '.biz', '.co', '.us', '.io', '.co.uk',
+    '.info', '.shop', '.store', '.online', '.website', '.site',
+    '.business', '.company', '.corp', '.inc', '.ltd'
+]
+
+# Common business subdomains
+BUSINESS_SUBDOMAINS = ['blog', 'support', 'help', 'info', 'contact', 'about', 'team']
+
+
+def clean_company_name(name):
+    if pd.isna(name) or name is None or str(name).strip() == '':
+        return None
+
+    name = str(name).strip()
+    suffixes = [' LLC', ' Inc', ' Corp', ' Corporation', ' Ltd', ' Limited', ' Co', ' Company']
+    for suffix in suffixes:
+        if name.upper().endswith(suffix.upper()):
+            name = name[:-len(suffix)].strip()
+
+    return name if name else None
+
+def clean_company_name_conservative(name):
+    """clean_company_name that keeps short names and drops at most one suffix (the accurate profile's)"""
+    if pd.isna(name) or name is None or str(name).strip() == '' or str(name).lower() in ['nan', 'null', 'none', 'n/a']:
+        return None
+
+    name = str(name).strip()
+
+    # Don't clean if the name is too short (likely important)
+    if len(name) <= 2:
+        return name
+
+    # Only remove common business suffixes, but be more conservative
+    suffixes = [' LLC', ' Inc.', ' Inc', ' Corp.', ' Corp', ' Corporation', ' Ltd.', ' Ltd', ' Limited', ' Co.', ' Company']
+    for suffix in suffixes:
+        if name.upper().endswith(suffix.upper()):
+            cleaned = name[:-len(suffix)].strip()
+            # Only remove suffix if there's still a substantial company name left
+            if len(cleaned) >= 2:
+                name = cleaned
+            break
+
+    return name if name else None
+
+def find_email_candidates(text):
+    """All addresses in a piece of page text, lowercased, in first-seen order"""
+    if '@' not in text:
+        return []
+    return list(dict.fromkeys(email.lower() for email in PAGE_EMAIL_PATTERN.findall(text)))
+
+def prioritize_emails(candidates):
+    """Drop fake/non-business addresses and put business emails first"""
+    business_emails = []
+    other_emails = []
+
+    for email in candidates:
+        # Skip obvious fake/template emails and common non-business senders
+        if JUNK_EMAIL_MATCHER.search(email):
+            continue
+
+        local_part, _, domain = email.rpartition('@')
+
+        # Basic domain validation
+        if '.' not in domain:
+            continue
+
+        # Prioritize business-looking emails
+        if local_part.endswith(BUSINESS_LOCAL_SUFFIXES):
+            business_emails.append(email)
+        else:
+            other_emails.append(email)
+
+    # Return business emails first, then others
+    return business_emails + other_emails
+
+def extract_emails_from_html(html_content):
+    """Extract and prioritize emails from page content (business emails first)"""
+    # One scan of the page; duplicates collapse but first-seen order is kept
+    return prioritize_emails(find_email_candidates(html_content))
+
+def build_search_engines(clean_name):
+    """Search engine queries used for website discovery"""
+    return [
+        {
+            'name': 'Bing',
+            'url': f"https://www.bing.com/search?q=\"{clean_name}\"+site%3A{clean_name.replace(' ', '')}.com",
+            'timeout': 3
+        },
+        {
+            'name': 'Yahoo',
+            'url': f"https://search.yahoo.com/search?p=\"{clean_name}\"+website",
+            'timeout': 3
+        }
+    ]
+
+def generate_direct_website_guesses(company_name, tlds=None):
+    """Generate comprehensive website URL guesses for maximum success rate (tlds overrides the TLD order)"""
+    urls = []
+
+    # Clean the name for URL generation
+    clean = re.sub(r'[^a-zA-Z0-9\s]', '', company_name.lower())
+    clean_no_spaces = re.sub(r'\s+', '', clean)  # Remove all spaces
+
+    # Get first word and abbreviation
+    words = clean.split()
+    first_word = words[0] if words else clean
+    abbreviation = ''.join([word[0] for word in words if len(word) > 0])[:6]  # Max 6 chars
+
+    # Base domains to try
+    base_names = []
+
+    if clean_no_spaces and len(clean_no_spaces) > 2:
+        base_names.append(clean_no_spaces)
+
+    # Add dash variations for multi-word companies
+    if len(words) > 1:
+        dash_name = '-'.join(words)
+        base_names.append(dash_name)
+
+        # Try first word only
+        if len(first_word) > 3:
+            base_names.append(first_word)
+
+    # Add abbreviation if meaningful
+    if len(abbreviation) >= 2 and abbreviation != clean_no_spaces:
+        base_names.append(abbreviation)
+
+    # Add "the" prefix removal
+    if clean.startswith('the '):
+        no_the = clean[4:].replace(' ', '')
+        if no_the and len(no_the) > 2:
+            base_names.append(no_the)
+
+    # Generate all combinations
+    for base_name in base_names:
+        if base_name and len(base_name) > 1:
+            for tld in (DIRECT_GUESS_TLDS if tlds is None else tlds):
+                urls.extend([
+                    f"https://www.{base_name}{tld}",
+                    f"https://{base_name}{tld}"
+                ])
+
+    return urls
+
+def quick_domain_guesses(company_name):
+    """The three .com names the fast profile checks: joined, dashed, first word"""
+    name = company_name.lower()
+    return [
+        f"{name.replace(' ', '')}.com",
+        f"{name.replace(' ', '-')}.com",
+        f"{name.split()[0]}.com" if ' ' in name else f"{name}.com"
+    ]
+
+def simple_domain_guesses(company_name):
+    """The .com names the accurate profile checks: alphanumerics only, joined, dashed"""
+    name = company_name.lower()
+    return [
+        f"{re.sub(r'[^a-z0-9]', '', name)}.com",
+        f"{name.replace(' ', '')}.com",
+        f"{name.replace(' ', '-')}.com"
+    ]
+
+def guessed_tld(url):
+    """Which DIRECT_GUESS_TLDS entry a guessed URL was built with (longest match), or None"""
+    host = re.sub(r'^https?://', '', url).split('/')[0].lower()
+    matches = [tld for tld in DIRECT_GUESS_TLDS if host.endswith(tld)]
+    return max(matches, key=len) if matches else None
+
+def contact_path_of(url, website):
+    """The CONTACT_PAGES entry a contact URL was built from"""
+    return url[len(website.rstrip('/')):] or '/'
+
+def strategy_of(source):
+    """Strategy name from an email_source string ("Contact page: https://..." -> "Contact page")"""
+    return (source or 'Not found').split(':')[0].strip()
+
+def extract_business_urls_from_search(html_content, company_name):
+    """Extract business URLs from search engine results"""
+    urls = []
+
+    # Simple regex to find URLs in search results
+    url_pattern = re.compile(r'https?://(?:www\.)?([a-zA-Z0-9\-\.]+\.[a-zA-Z]{2,})', re.IGNORECASE)
+    matches = url_pattern.findall(html_content)
+
+    company_keywords = company_name.lower().split()
+
+    for match in matches:
+        full_url = f"https://{match}"
+        domain_lower = match.lower()
+
+        # Prioritize URLs that contain company name keywords
+        if any(keyword in domain_lower for keyword in company_keywords if len(keyword) > 3):
+            urls.insert(0, full_url)  # Put at beginning
+        else:
+            urls.append(full_url)
+
+    return urls[:10]  # Return top 10
+
+def is_valid_business_url(url):
+    """Enhanced URL validation for business websites"""
+    if not url or not isinstance(url, str):
+        return False
+
+    # Must be HTTP/HTTPS
+    if not url.startswith(('http://', 'https://')):
+        return False
+
+    # Extract domain
+    try:
+        domain = url.split('/')[2].lower()
+    except:
+        return False
+
+    # Must have proper domain structure
+    if '.' not in domain or len(domain) < 4:
+        return False
+
+    # Exclude search engines, social media, and common non-business sites
+    excluded_domains = [
+        'google.com', 'bing.com', 'yahoo.com', 'duckduckgo.com', 'startpage.com',
+        'facebook.com', 'twitter.com', 'linkedin.com', 'instagram.com', 'youtube.com',
+        'wikipedia.org', 'amazon.com', 'ebay.com', 'alibaba.com', 'aliexpress.com',
+        'pinterest.com', 'tiktok.com', 'snapchat.com', 'reddit.com', 'tumblr.com'
+    ]
+
+    for excluded in excluded_domains:
+        if excluded in domain:
+            return False
+
+    # Prefer business-like domains
+    business_indicators = ['.com', '.net', '.org', '.biz', '.co', '.us', '.shop', '.store']
+    if any(indicator in domain for indicator in business_indicators):
+        return True
+
+    return len(domain.split('.')) >= 2  # At least domain.tld format
+
+def guess_email_format(company_name, website_url):
+    """Guess common email formats when website found but no emails displayed"""
+    try:
+        # Extract domain from website URL
+        domain = website_url.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0]
+
+        # Common business email prefixes (ordered by likelihood)
+        email_prefixes = [
+            'info', 'contact', 'hello', 'sales', 'support', 'inquiry',
+            'business', 'office', 'admin', 'service', 'help', 'mail',
+            'general', 'team', 'welcome', 'connect', 'reach'
+        ]
+
+        # Try each prefix with the domain
+        for prefix in email_prefixes:
+            candidate_email = f"{prefix}@{domain}"
+
+            # Quick validation check (could be enhanced with actual email verification)
+            if is_valid_email_format(candidate_email):
+                return candidate_email
+
+        return None
+
+    except Exception as e:
+        logger.warning(f"Error guessing email format: {str(e)}")
+        return None
+
+def is_valid_email_format(email):
+    """Basic email format validation"""
+    return '@' in email and '.' in email.split('@')[-1] and len(email.split('@')) == 2
+
+# Keywords that mark a homepage link as a likely contact page
+CONTACT_LINK_KEYWORDS = (
+    'contact', 'about', 'support', 'help', 'reach', 'touch', 'connect',
+    'info', 'team', 'staff', 'office', 'location', 'feedback', 'inquiry'
+)
+
+ANCHOR_OPEN_TAG = re.compile(r'<a\s[^>]*>', re.IGNORECASE)
+ANCHOR_CLOSE_TAG = re.compile(r'</a\s*>', re.IGNORECASE)
+ANCHOR_HREF = re.compile(r'(?<![\w-])href\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.IGNORECASE)
+MARKUP_TAG = re.compile(r'<[^>]*>')
+ANCHOR_TEXT_LIMIT = 2000
+
+def iter_anchor_links(html_content):
+    """(href, text) for every <a href> in a page, found with a tag scan instead of a DOM parse"""
+    if isinstance(html_content, bytes):
+        html_content = html_content.decode('utf-8', errors='replace')
+
+    opening_tags = list(ANCHOR_OPEN_TAG.finditer(html_content))
+    for i, tag in enumerate(opening_tags):
+        href = ANCHOR_HREF.search(tag.group(0))
+        if not href:
+            continue
+
+        # Link text runs to </a>, or to the next <a> when the tag is never closed
+        text_end = opening_tags[i + 1].start() if i + 1 < len(opening_tags) else len(html_content)
+        text_end = min(text_end, tag.end() + ANCHOR_TEXT_LIMIT)
+        closing_tag = ANCHOR_CLOSE_TAG.search(html_content, tag.end(), text_end)
+        if closing_tag:
+            text_end = closing_tag.start()
+        text = html.unescape(MARKUP_TAG.sub('', html_content[tag.end():text_end])).strip()
+
+        yield html.unescape(next(value for value in href.groups() if value is not None)).strip(), text
+
+def extract_contact_links(html_content, website_url, keywords=None, limit=10):
+    """Find contact page links in already-fetched homepage HTML"""
+    keywords = CONTACT_LINK_KEYWORDS if keywords is None else keywords
+    homepage = urldefrag(website_url)[0].rstrip('/')
+    contact_links = []
+
+    for href, text in iter_anchor_links(html_content):
+        if not href:
+            continue
+
+        href_lower = href.lower()
+        link_text = text.lower()
+
+        # Check if link or text contains contact keywords
+        if not any(keyword in href_lower or keyword in link_text for keyword in keywords):
+            continue
+
+        # Resolve relative URLs against the page; skip mailto:, javascript:, same-page anchors
+        full_url = urldefrag(urljoin(website_url, href))[0]
+        if not full_url.startswith(('http://', 'https://')) or full_url.rstrip('/') == homepage:
+            continue
+
+        if full_url not in contact_links:
+            contact_links.append(full_url)
+            if len(contact_links) >= limit:
+                break
+
+    return contact_links
+
+def subdomain_base(main_website):
+    """Base domain used for subdomain checks"""
+    return main_website.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0]
+
+def build_social_platforms(clean_name):
+    """Social media platforms to check"""
+    return [
+        {
+            'name': 'Instagram',
+            'search_url': f"https://www.google.com/search?q=site:instagram.com+\"{clean_name}\"",
+            'profile_indicators': ['instagram.com/', '@'],
+            'timeout': 4
+        },
+        {
+            'name': 'Facebook',
+            'search_url': f"https://www.google.com/search?q=site:facebook.com+\"{clean_name}\"",
+            'profile_indicators': ['facebook.com/', 'fb.com/'],
+            'timeout': 4
+        },
+        {
+            'name': 'LinkedIn',
+            'search_url': f"https://www.google.com/search?q=site:linkedin.com/company+\"{clean_name}\"",
+            'profile_indicators': ['linkedin.com/company/', 'linkedin.com/in/'],
+            'timeout': 4
+        },
+        {
+            'name': 'Twitter',
+            'search_url': f"https://www.google.com/search?q=site:twitter.com+\"{clean_name}\"",
+            'profile_indicators': ['twitter.com/', 'x.com/', '@'],
+            'timeout': 4
+        }
+    ]
+
+def extract_social_media_urls(html_content, indicators, company_name):
+    """Extract social media profile URLs from search results"""
+    urls = []
+
+    # Find URLs in the HTML that match social media patterns
+    url_pattern = re.compile(r'https?://(?:www\.)?([^/\s]+(?:/[^\s"\'<>]*)?)', re.IGNORECASE)
+    matches = url_pattern.findall(html_content)
+
+    company_keywords = company_name.lower().split()
+
+    for match in matches:
+        full_url = f"https://{match}"
+
+        # Check if URL is from target platform
+        if any(indicator in full_url.lower() for indicator in indicators):
+            # Prioritize URLs that seem to match the company name
+            if any(keyword in full_url.lower() for keyword in company_keywords if len(keyword) > 3):
+                urls.insert(0, full_url)  # Priority placement
+            else:
+                urls.append(full_url)
+
+    return urls[:5]  # Return top 5 URLs
+
+# Email patterns optimized for social media profiles, tried in order
+SOCIAL_EMAIL_PATTERNS = [
+    EMAIL_PATTERN,  # Standard pattern
+    re.compile(r'contact[:\s]*([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', re.IGNORECASE),
+    re.compile(r'email[:\s]*([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', re.IGNORECASE),
+    re.compile(r'reach[:\s]+us[:\s]*([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', re.IGNORECASE),
+    re.compile(r'business[:\s]+inquiries[:\s]*([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', re.IGNORECASE),
+]
+
+def extract_email_from_social_text(page_text):
+    """Pick the first valid email from a social media profile page"""
+    page_text = page_text.lower()
+    for pattern in SOCIAL_EMAIL_PATTERNS:
+        emails = pattern.findall(page_text)
+        if emails:
+            # Filter and validate emails
+            for email in emails:
+                if is_valid_email_format(email) and not is_fake_email(email):
+                    return email
+
+    return None
+
+def is_fake_email(email):
+    """Check if email appears to be fake or template"""
+    fake_indicators = [
+        'example.com', 'test.com', 'placeholder', 'yoursite', 'yourdomain',
+        'samplewebsite', 'domain.com', 'email.com', 'website.com',
+        'noreply', 'no-reply', 'donotreply', 'unsubscribe'
+    ]
+
+    email_lower = email.lower()
+    return any(indicator in email_lower for indicator in fake_indicators)
+
+# Personal mailboxes and no-reply senders the fast profile skips
+BASIC_SKIP_MARKERS = ('gmail.com', 'yahoo.com', 'hotmail.com', 'noreply')
+
+def pick_any_email(candidates):
+    """First address that isn't a personal mailbox or no-reply sender (the fast profile's filter)"""
+    for email in candidates:
+        if not any(skip in email.lower() for skip in BASIC_SKIP_MARKERS):
+            return email
+    return None
+
+# Addresses the accurate profile never reports, matched anywhere in the address
+STRICT_SKIP_MARKERS = (
+    # Personal email providers
+    'gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'aol.com', 'bellsouth.net',
+    'comcast.net', 'verizon.net', 'att.net', 'live.com', 'msn.com',
+    # Service/placeholder emails
+    'noreply', 'no-reply', 'donotreply', 'example.com', 'youremail.com', 'yoursite.com',
+    'test.com', 'placeholder', 'sample.com', 'demo.com',
+    # Website builder and service providers
+    'webador.com', 'wixpress.com', 'sentry', 'shopify.com', 'squarespace.com',
+    'wordpress.com', 'weebly.com', 'godaddy.com', 'bluehost.com',
+    # Technical/system emails
+    'mailer-daemon', 'postmaster', 'admin@localhost', 'root@',
+    # Image/file extensions (to avoid capturing filenames)
+    '.png', '.jpg', '.jpeg', '.gif', '.pdf', '.doc', '.zip'
+)
+STRICT_BUSINESS_PREFIXES = ('info@', 'contact@', 'sales@', 'support@', 'hello@', 'orders@', 'admin@')
+SITE_BUILDER_MARKERS = ('webador', 'wix', 'shopify', 'squarespace', 'wordpress')
+
+def pick_business_email(candidates):
+    """Best address for the accurate profile: info@/contact@/... first, then any other that
+    isn't hosted by a site builder; None when nothing passes the filter"""
+    emails = [
+        email.lower() for email in candidates
+        if len(email) > 4 and '@' in email and not any(skip in email.lower() for skip in STRICT_SKIP_MARKERS)
+    ]
+    for email in emails:
+        if email.startswith(STRICT_BUSINESS_PREFIXES):
+            return email
+    for email in emails:
+        domain = email.split('@')[1]
+        if len(domain) > 4 and not any(service in domain for service in SITE_BUILDER_MARKERS):
+            return email
+    return None
+
+def pick_prioritized_email(candidates):
+    """First address prioritize_emails keeps (the exhaustive profile's filter)"""
+    emails = prioritize_emails(candidates)
+    return emails[0] if emails else None
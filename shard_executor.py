@@ -0,0 +1,161 @@
+import os
+import math
+import time
+import queue
+import logging
+import multiprocessing
+import async_engine
+import deadline
+import hit_stats
+import host_scheduler
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Worker processes a large batch is split across (1 = everything in this process)
+SHARD_PROCESSES = int(os.environ.get('SHARD_PROCESSES', os.cpu_count() or 1))
+# Batches smaller than this aren't worth the process start-up cost
+SHARD_MIN_COMPANIES = int(os.environ.get('SHARD_MIN_COMPANIES', 200))
+# How often the parent checks for shards that died without reporting back (seconds)
+SHARD_POLL_INTERVAL = float(os.environ.get('SHARD_POLL_INTERVAL', 1.0))
+
+
+def shard_indexes(count, shards):
+    """Split range(count) into interleaved shards (0, n, 2n, ... / 1, n+1, ...) so slow stretches of a file spread out"""
+    return [list(range(shard, count, shards)) for shard in range(shards) if shard < count]
+
+
+def remaining_job_budget(job_budget, started):
+    """What is left at this point of a job budget that started counting at started (monotonic).
+
+    job_budget is passed through when it means no limit (None with JOB_TIME_BUDGET unset, or 0).
+    """
+    seconds = deadline.JOB_TIME_BUDGET if job_budget is None else job_budget
+    if not seconds or seconds <= 0:
+        return job_budget
+    # Never 0 or below, which JobBudget reads as no limit; a sliver leaves every company cut off
+    return max(seconds - (time.monotonic() - started), 0.001)
+
+
+def _run_shard(shard, indexed_names, concurrency, job_budget, trace_path, scheduler_settings, results):
+    """Process entry point: run one shard through the async engine, streaming results to the parent"""
+    logging.basicConfig(level=logging.INFO)
+    # Search engine and social budgets are shared with the other shards
+    host_scheduler.set_scheduler(host_scheduler.HostScheduler(**scheduler_settings))
+    try:
+        indexes = [index for index, _ in indexed_names]
+        names = [name for _, name in indexed_names]
+
+        def on_result(position, company_name, result):
+            results.put(('result', shard, (indexes[position], result)))
+
+        async_engine.run_companies(
+            names, concurrency=concurrency, on_result=on_result, job_budget=job_budget, trace_path=trace_path
+        )
+        outcome = ('done', shard, None)
+    except Exception as e:
+        outcome = ('error', shard, str(e))
+    finally:
+        # Child processes skip atexit handlers
+        hit_stats.flush()
+    # The shard's timings, counters and breaker state end up in the parent's /metrics
+    results.put(('metrics', shard, metrics.export_state()))
+    results.put(outcome)
+
+
+def run_companies(company_names, concurrency=None, on_result=None, job_budget=None, processes=None, trace_path=None):
+    """async_engine.run_companies spread over worker processes.
+
+    The list is split into shards, one per process, each running its own event loop with a
+    share of the concurrency and of the search engine and social budgets (see
+    HostScheduler.for_processes). on_result(index, company_name, result) is called in this process
+    as results stream in, and the returned list is in the same order as company_names.
+    Companies of a shard whose process died are re-run here, within what is left of the job
+    budget. All shards write their company traces to the same trace_path.
+    """
+    company_names = list(company_names)
+    processes = SHARD_PROCESSES if processes is None else processes
+    processes = min(processes, len(company_names))
+    if processes <= 1 or len(company_names) < SHARD_MIN_COMPANIES:
+        return async_engine.run_companies(
+            company_names, concurrency=concurrency, on_result=on_result, job_budget=job_budget, trace_path=trace_path
+        )
+
+    started = time.monotonic()
+    # Total concurrency stays the same; each process gets its share
+    per_process = max(1, math.ceil((concurrency or async_engine.COMPANY_CONCURRENCY) / processes))
+    # spawn, not fork: the parent is multi-threaded (job workers, heartbeats, Flask)
+    context = multiprocessing.get_context('spawn')
+    results_queue = context.Queue()
+    shards = shard_indexes(len(company_names), processes)
+    scheduler_settings = host_scheduler.get_scheduler().for_processes(context, len(shards))
+    workers = [
+        context.Process(
+            target=_run_shard,
+            args=(shard, [(index, company_names[index]) for index in indexes], per_process, job_budget, trace_path,
+                  scheduler_settings, results_queue),
+            daemon=True
+        )
+        for shard, indexes in enumerate(shards)
+    ]
+    for worker in workers:
+        worker.start()
+    logger.info(f"Sharded {len(company_names)} companies over {len(workers)} processes ({per_process} concurrent each)")
+
+    results = [None] * len(company_names)
+    pending = set(range(len(workers)))
+
+    def handle(kind, shard, payload):
+        if kind == 'result':
+            index, result = payload
+            if results[index] is not None:
+                return
+            results[index] = result
+            if on_result:
+                try:
+                    on_result(index, company_names[index], result)
+                except Exception as e:
+                    logger.warning(f"Result callback failed for {company_names[index]}: {str(e)}")
+        elif kind == 'metrics':
+            metrics.merge_state(payload, process=f"shard-{shard}")
+        else:
+            if kind == 'error':
+                logger.error(f"Shard {shard} failed: {payload}")
+            pending.discard(shard)
+
+    while pending:
+        try:
+            handle(*results_queue.get(timeout=SHARD_POLL_INTERVAL))
+        except queue.Empty:
+            for shard in list(pending):
+                if not workers[shard].is_alive():
+                    logger.warning(f"Shard {shard} exited with code {workers[shard].exitcode} before finishing")
+                    pending.discard(shard)
+
+    for worker in workers:
+        worker.join(timeout=5)
+    # Late messages from a shard that exited while it was being checked
+    while True:
+        try:
+            handle(*results_queue.get_nowait())
+        except queue.Empty:
+            break
+
+    # Whatever a failed shard didn't deliver is searched here
+    missing = [index for index, result in enumerate(results) if result is None]
+    if missing:
+        logger.warning(f"Re-running {len(missing)} companies from failed shards in-process")
+
+        def on_missing_result(position, company_name, result):
+            if on_result:
+                on_result(missing[position], company_name, result)
+
+        # Only what is left of the job's budget: a crash-looping shard mustn't stretch the job
+        rerun = async_engine.run_companies(
+            [company_names[index] for index in missing], concurrency=concurrency, on_result=on_missing_result,
+            job_budget=remaining_job_budget(job_budget, started), trace_path=trace_path
+        )
+        for index, result in zip(missing, rerun):
+            results[index] = result
+
+    return results
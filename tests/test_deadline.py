@@ -0,0 +1,89 @@
+import time
+import asyncio
+import pytest
+import deadline
+import dns_filter
+import host_scheduler
+import page_cache
+import page_reader
+import async_engine
+
+
+@pytest.fixture
+def no_pacing():
+    previous = host_scheduler.get_scheduler()
+    host_scheduler.set_scheduler(host_scheduler.HostScheduler(min_interval=0, budgets={}))
+    yield
+    host_scheduler.set_scheduler(previous)
+
+
+@pytest.fixture
+def slow_dns():
+    """Every lookup blocks its thread for 10 s"""
+    def resolver(hostname):
+        time.sleep(10)
+        return ['127.0.0.1']
+    dns_filter.set_resolver(resolver)
+    yield
+    dns_filter.set_resolver(None)
+
+
+@pytest.fixture
+def hanging_hosts(monkeypatch):
+    """Async fetches go through the host slot like the real ones, then get no answer before
+    their (budget-clamped) timeout"""
+    async def hang(session, url, timeout=5, **kwargs):
+        async with host_scheduler.slot_async(url, timeout) as timeout:
+            await asyncio.sleep(timeout)
+            raise asyncio.TimeoutError()
+
+    for name in ('fetch_page_async', 'fetch_head_async', 'fetch_page_emails_async'):
+        monkeypatch.setattr(page_reader, name, hang)
+
+
+def test_clamp_without_budget_keeps_timeout():
+    assert deadline.clamp(5) == 5
+    assert deadline.clamp(None) is None
+
+
+def test_clamp_caps_timeout_at_remaining_budget():
+    with deadline.scope(2):
+        assert deadline.clamp(5) <= 2
+        assert deadline.clamp(1) == 1
+        assert 0 < deadline.clamp(None) <= 2
+
+
+def test_clamp_raises_once_budget_is_spent():
+    with deadline.scope(0.01):
+        time.sleep(0.02)
+        with pytest.raises(deadline.BudgetExceeded):
+            deadline.clamp(5)
+        with pytest.raises(deadline.BudgetExceeded):
+            deadline.check()
+
+
+def test_nested_scope_never_extends_outer_deadline():
+    with deadline.scope(1) as outer:
+        with deadline.scope(10) as inner:
+            assert inner is outer
+        with deadline.scope(0.5) as inner:
+            assert inner is not outer and inner.budget == 0.5
+
+
+def test_job_with_small_budget_finishes_within_budget(monkeypatch, no_pacing, slow_dns, hanging_hosts):
+    monkeypatch.setattr(deadline, 'MIN_COMPANY_BUDGET', 0.5)
+    budget = 2
+    started = time.monotonic()
+    results = async_engine.run_companies(['Bella Moda', 'Luna Threads'], concurrency=2, job_budget=budget)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < budget + 1
+    assert [deadline.is_cut_off(result['source']) for result in results] == [True, True]
+
+
+def test_sync_body_read_stops_with_budget(no_pacing, drip_server):
+    started = time.monotonic()
+    with page_cache.scope(), deadline.scope(1):
+        with pytest.raises(deadline.BudgetExceeded):
+            page_reader.fetch_page(drip_server, timeout=5)
+    assert time.monotonic() - started < 2
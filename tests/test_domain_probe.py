@@ -0,0 +1,53 @@
+import time
+import threading
+import pytest
+import deadline
+import domain_probe
+
+
+def test_first_result_is_first_in_list_order():
+    def fetch(candidate):
+        # Later candidates answer first
+        time.sleep(0.05 * (3 - candidate))
+        return candidate >= 1
+
+    assert domain_probe.first_result([0, 1, 2], fetch) == (1, True)
+
+
+def test_losing_probes_stop_at_their_next_request():
+    went_on = []
+    stopped = threading.Event()
+
+    def fetch(candidate):
+        if candidate == 'winner':
+            return True
+        time.sleep(0.2)
+        try:
+            # Where host_scheduler.slot and the body read loops check
+            deadline.check()
+        except deadline.BudgetExceeded:
+            stopped.set()
+            raise
+        went_on.append(candidate)
+
+    assert domain_probe.first_result(['winner', 'loser'], fetch) == ('winner', True)
+    assert stopped.wait(2)
+    assert went_on == []
+
+
+def test_branch_without_budget_leaves_timeouts_alone():
+    branch = deadline.branch()
+    with deadline.use(branch):
+        assert deadline.clamp(5) == 5
+        assert deadline.remaining() is None
+        branch.cancel()
+        with pytest.raises(deadline.BudgetExceeded):
+            deadline.clamp(5)
+    assert deadline.current() is None
+
+
+def test_branch_running_out_of_time_cuts_the_outer_budget_short():
+    with deadline.scope(10) as outer:
+        with deadline.use(deadline.branch()):
+            deadline.exceeded()
+        assert outer.expired
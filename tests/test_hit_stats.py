@@ -0,0 +1,25 @@
+import asyncio
+import threading
+import hit_stats
+
+
+def test_record_flushes_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(hit_stats, 'HIT_STATS_FLUSH_INTERVAL', 0)
+    flush = hit_stats.flush
+    writes = []
+    flushed = threading.Event()
+
+    def tracked_flush():
+        writes.append(threading.current_thread())
+        flush()
+        flushed.set()
+
+    monkeypatch.setattr(hit_stats, 'flush', tracked_flush)
+
+    async def step():
+        hit_stats.record('test_kind', 'candidate', True)
+
+    asyncio.run(step())
+    assert flushed.wait(5)
+    assert threading.current_thread() not in writes
+    assert hit_stats.load(refresh=True)['test_kind']['candidate'] == (1, 1)
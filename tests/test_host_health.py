@@ -0,0 +1,69 @@
+import time
+import asyncio
+import pytest
+import requests
+import deadline
+import host_health
+
+URL = 'https://www.shop.example.com/contact'
+KEY = 'shop.example.com'
+
+
+@pytest.fixture
+def registry():
+    """Opens after two failures, for 0.05 s at first"""
+    return host_health.HostHealthRegistry(failure_threshold=2, cooldown=0.05, max_cooldown=1)
+
+
+def _trip(registry):
+    for _ in range(2):
+        registry.record(registry.admit(URL), 0.1, requests.exceptions.ConnectTimeout())
+
+
+def test_breaker_opens_after_threshold_and_covers_subdomains(registry):
+    _trip(registry)
+    with pytest.raises(host_health.HostUnavailable):
+        registry.admit(URL)
+    # Its parent domain is still fine; only the host and what's under it are skipped
+    assert registry.admit('https://example.com/') == 'example.com'
+    assert registry.is_open('https://img.shop.example.com/logo.png')
+
+
+def test_half_open_lets_one_trial_through(registry):
+    _trip(registry)
+    time.sleep(0.06)
+    # A check alone doesn't take the trial
+    registry.admit(URL, trial=False)
+    assert registry.admit(URL) == KEY
+    with pytest.raises(host_health.HostUnavailable):
+        registry.admit(URL)
+
+    registry.record(KEY, 0.1)
+    assert registry.snapshot()['hosts'] == {}
+    registry.admit(URL)
+
+
+def test_failed_trial_reopens_for_twice_as_long(registry):
+    _trip(registry)
+    time.sleep(0.06)
+    registry.record(registry.admit(URL), 0.1, requests.exceptions.ConnectionError())
+    assert registry.snapshot()['hosts'][KEY]['state'] == 'open'
+    time.sleep(0.06)
+    # Second cooldown is 0.1 s
+    assert registry.is_open(URL)
+    time.sleep(0.06)
+    assert not registry.is_open(URL)
+
+
+@pytest.mark.parametrize('error', [
+    asyncio.CancelledError(), deadline.BudgetExceeded(), requests.exceptions.TooManyRedirects()
+])
+def test_aborted_trial_leaves_host_half_open(registry, error):
+    _trip(registry)
+    time.sleep(0.06)
+    registry.record(registry.admit(URL), 0.1, error)
+    # Nothing was learnt about the host: the next request is the trial
+    assert registry.snapshot()['hosts'][KEY]['state'] == 'half_open'
+    assert registry.admit(URL) == KEY
+    with pytest.raises(host_health.HostUnavailable):
+        registry.admit(URL)
@@ -0,0 +1,35 @@
+import multiprocessing
+import host_scheduler
+
+
+def _start_delays(settings, url, count, delays):
+    scheduler = host_scheduler.HostScheduler(**settings)
+    key, interval, _ = scheduler.budget_for(url)
+    for _ in range(count):
+        delays.put(scheduler._reserve(key, interval))
+
+
+def test_for_processes_splits_concurrency():
+    scheduler = host_scheduler.HostScheduler(budgets={'bing.com': (1.0, 1), 'facebook.com': (0.5, 4)})
+    settings = scheduler.for_processes(multiprocessing.get_context('spawn'), 2)
+    assert settings['budgets'] == {'bing.com': (1.0, 1), 'facebook.com': (0.5, 2)}
+
+
+def test_shard_processes_share_search_engine_spacing():
+    context = multiprocessing.get_context('spawn')
+    scheduler = host_scheduler.HostScheduler(budgets={'bing.com': (1.0, 1)})
+    settings = scheduler.for_processes(context, 2)
+    delays = context.Queue()
+    workers = [
+        context.Process(target=_start_delays, args=(settings, 'https://www.bing.com/search?q=x', 2, delays))
+        for _ in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+    booked = sorted(delays.get(timeout=5) for _ in range(4))
+
+    # Four bookings on one clock: starts 1 s apart across both processes (the first process
+    # may have started after the first slot)
+    assert booked[-1] >= 2.0
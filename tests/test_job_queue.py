@@ -0,0 +1,61 @@
+import time
+import pytest
+import job_queue
+
+
+@pytest.fixture
+def queue_db(tmp_path, monkeypatch):
+    """An empty job database of its own"""
+    monkeypatch.setattr(job_queue, 'JOB_DB_PATH', str(tmp_path / 'jobs.db'))
+    monkeypatch.setattr(job_queue, 'JOB_FILES_DIR', str(tmp_path / 'jobs'))
+    monkeypatch.setattr(job_queue, '_initialized', False)
+
+
+def _enqueue(job_id):
+    job_queue.enqueue(job_id, f"/tmp/{job_id}.csv", f"{job_id}.csv", 'company')
+    # created_at orders the queue
+    time.sleep(0.01)
+
+
+def _age_heartbeat(job_id, seconds):
+    conn = job_queue._connect()
+    try:
+        conn.execute('UPDATE jobs SET heartbeat_at = ? WHERE id = ?', (time.time() - seconds, job_id))
+    finally:
+        conn.close()
+
+
+def test_claim_next_takes_oldest_queued_job_once(queue_db):
+    _enqueue('first')
+    _enqueue('second')
+
+    job = job_queue.claim_next('worker-1')
+    assert (job['id'], job['status'], job['worker'], job['attempts']) == ('first', 'running', 'worker-1', 1)
+    assert job_queue.claim_next('worker-2')['id'] == 'second'
+    assert job_queue.claim_next('worker-3') is None
+
+
+def test_requeue_stale_only_touches_orphaned_jobs(queue_db):
+    _enqueue('orphaned')
+    _enqueue('alive')
+    job_queue.claim_next('worker-1')
+    job_queue.claim_next('worker-2')
+    _age_heartbeat('orphaned', job_queue.JOB_STALE_AFTER + 1)
+
+    assert job_queue.requeue_stale() == 1
+    assert job_queue.get_job('orphaned')['status'] == 'queued'
+    assert job_queue.get_job('orphaned')['worker'] is None
+    assert job_queue.get_job('alive')['status'] == 'running'
+    # Claimed again, it counts as a second attempt
+    assert job_queue.claim_next('worker-3')['attempts'] == 2
+
+
+def test_requeue_stale_fails_job_after_max_attempts(queue_db, monkeypatch):
+    monkeypatch.setattr(job_queue, 'JOB_MAX_ATTEMPTS', 1)
+    _enqueue('crashy')
+    job_queue.claim_next('worker-1')
+    _age_heartbeat('crashy', job_queue.JOB_STALE_AFTER + 1)
+
+    assert job_queue.requeue_stale() == 0
+    job = job_queue.get_job('crashy')
+    assert job['status'] == 'failed' and job['error'] == 'Worker stopped too many times'
@@ -0,0 +1,30 @@
+import metrics
+
+
+def test_merged_collector_output_is_labelled_by_process(monkeypatch):
+    trips = {'value': 3}
+
+    def breakers():
+        return [
+            ('test_breakers_open', 'gauge', 'Open breakers', [({}, trips['value'])]),
+            ('test_breaker_trips_total', 'counter', 'Breaker trips', [({}, trips['value'])]),
+        ]
+
+    def shared_file():
+        return [('test_shared', 'gauge', 'Read off a shared file', [({}, 1)])]
+
+    monkeypatch.setattr(metrics, '_collectors', [(breakers, True), (shared_file, False)])
+    monkeypatch.setattr(metrics, '_merged_collected', {})
+
+    state = metrics.export_state()
+    assert [family[0] for family in state['collected']] == ['test_breakers_open', 'test_breaker_trips_total']
+    metrics.merge_state(state, process='shard-0')
+    trips['value'] = 2
+    metrics.merge_state(metrics.export_state(), process='shard-0')
+
+    lines = metrics.render().splitlines()
+    # Gauges keep the latest export, counters add up; one family per name
+    assert 'test_breakers_open{process="shard-0"} 2' in lines
+    assert 'test_breaker_trips_total{process="shard-0"} 5' in lines
+    assert lines.count('# TYPE test_breakers_open gauge') == 1
+    assert 'test_shared{process="shard-0"} 1' not in lines
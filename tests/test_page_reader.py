@@ -0,0 +1,94 @@
+import time
+import threading
+import pytest
+import requests
+import host_scheduler
+import page_cache
+import page_reader
+
+
+@pytest.fixture
+def one_at_a_time():
+    """Pacing off, one request per host at a time"""
+    previous = host_scheduler.get_scheduler()
+    scheduler = host_scheduler.HostScheduler(min_interval=0, concurrency=1, budgets={})
+    host_scheduler.set_scheduler(scheduler)
+    yield scheduler
+    host_scheduler.set_scheduler(previous)
+
+
+def test_sync_body_read_stops_at_request_timeout(one_at_a_time, drip_server):
+    started = time.monotonic()
+    with page_cache.scope():
+        with pytest.raises(requests.exceptions.Timeout):
+            page_reader.fetch_page(drip_server, timeout=1)
+    assert time.monotonic() - started < 2
+
+
+def test_host_slot_is_held_while_the_body_is_read(one_at_a_time, drip_server):
+    key = host_scheduler.host_key(drip_server)
+    slot_free = []
+
+    def fetch():
+        with page_cache.scope():
+            try:
+                page_reader.fetch_page(drip_server, timeout=1)
+            except requests.exceptions.Timeout:
+                pass
+
+    reader = threading.Thread(target=fetch)
+    reader.start()
+    time.sleep(0.5)
+    # The reader is in the middle of the body
+    slot_free.append(one_at_a_time._thread_slots[key].acquire(blocking=False))
+    reader.join()
+    assert slot_free == [False]
+
+
+PAGE = b'<p>Orders: orders@belladesign.com, press: press@belladesign.com</p>'
+
+
+def _scan(chunks, url='https://belladesign.com/', **kwargs):
+    scanner = page_reader.EmailStreamScanner(url, **kwargs)
+    for chunk in chunks:
+        if scanner.feed(chunk):
+            break
+    scanner.close()
+    return scanner
+
+
+@pytest.mark.parametrize('split', range(1, len(PAGE)))
+def test_scanner_finds_addresses_split_across_chunks(split):
+    scanner = _scan([PAGE[:split], PAGE[split:]])
+    assert scanner.candidates == ['orders@belladesign.com', 'press@belladesign.com']
+
+
+def test_scanner_handles_one_byte_chunks_and_multibyte_text():
+    page = 'Café — écrivez à orders@belladesign.com'.encode('utf-8')
+    scanner = _scan([page[i:i + 1] for i in range(len(page))])
+    assert scanner.candidates == ['orders@belladesign.com']
+
+
+def test_scanner_reads_a_page_of_exactly_max_bytes_in_full():
+    scanner = _scan([PAGE[:30], PAGE[30:]], max_bytes=len(PAGE), keep_body=True)
+    assert not scanner.truncated
+    assert bytes(scanner.body) == PAGE
+    assert scanner.candidates == ['orders@belladesign.com', 'press@belladesign.com']
+
+
+def test_scanner_stops_at_max_bytes():
+    cap = PAGE.index(b'press@')
+    scanner = _scan([PAGE[:30], PAGE[30:]], max_bytes=cap, keep_body=True)
+    assert scanner.truncated
+    assert scanner.bytes_read == cap and bytes(scanner.body) == PAGE[:cap]
+    assert scanner.candidates == ['orders@belladesign.com']
+
+
+def test_scanner_stops_early_on_priority_address_of_own_domain():
+    page = b'<p>info@belladesign.com</p>' + b'x' * 100
+    scanner = page_reader.EmailStreamScanner('https://www.belladesign.com/')
+    assert scanner.feed(page[:40])
+    assert scanner.stopped_early and scanner.candidates == ['info@belladesign.com']
+    # Someone else's info@ is not a reason to stop
+    other = page_reader.EmailStreamScanner('https://www.belladesign.com/')
+    assert not other.feed(b'<p>info@example.org</p> ' + b'x' * 20)
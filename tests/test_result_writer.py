@@ -0,0 +1,69 @@
+import pytest
+import result_writer
+
+
+class ListWriter:
+    def __init__(self):
+        self.rows = []
+        self.closed = False
+
+    def write(self, row):
+        self.rows.append(row)
+
+    def close(self):
+        self.closed = True
+
+
+def _format(row, company_name, result):
+    return (row['line'], company_name, result)
+
+
+def test_unique_companies_drop_results_once_written():
+    rows = [({'line': line}, name) for line, name in enumerate(['a', 'b', 'c'])]
+    output = result_writer.OrderedResultWriter(ListWriter(), rows, _format, unique_companies=True)
+    output.add('b', 'B')
+    assert output._results == {'b': 'B'}
+    output.add('a', 'A')
+    assert output._results == {}
+    output.add('c', 'C')
+    output.close()
+    assert output.writer.rows == [(0, 'a', 'A'), (1, 'b', 'B'), (2, 'c', 'C')]
+
+
+def test_rows_are_written_in_input_order_as_soon_as_they_can_be():
+    rows = [({'line': line}, name) for line, name in enumerate(['a', 'b', 'a', 'c'])]
+    output = result_writer.OrderedResultWriter(ListWriter(), rows, _format)
+    output.add('c', 'C')
+    output.add('b', 'B')
+    # Nothing before a's result
+    assert output.writer.rows == []
+    output.add('a', 'A')
+    # Both of a's rows (companies may repeat without unique_companies)
+    assert output.writer.rows == [(0, 'a', 'A'), (1, 'b', 'B'), (2, 'a', 'A'), (3, 'c', 'C')]
+    output.close()
+    assert output.writer.closed
+
+
+def test_rows_are_read_lazily():
+    consumed = []
+
+    def rows():
+        for line, name in enumerate(['a', 'b', 'c']):
+            consumed.append(name)
+            yield {'line': line}, name
+
+    output = result_writer.OrderedResultWriter(ListWriter(), rows(), _format)
+    output.add('b', 'B')
+    assert consumed == ['a']
+    output.add('a', 'A')
+    assert consumed == ['a', 'b', 'c']
+
+
+@pytest.mark.parametrize('size,chunk_size', [(0, 4), (5, 4), (8, 4), (10, 3), (100, 7)])
+def test_iter_file_prefix_stops_at_size(tmp_path, size, chunk_size):
+    path = tmp_path / 'output.csv'
+    path.write_bytes(b'0123456789abcdef')
+    prefix = b''.join(result_writer.iter_file_prefix(str(path), size, chunk_size=chunk_size))
+    # Never more than size bytes, and no more than the file holds
+    assert prefix == b'0123456789abcdef'[:size]
+    assert all(len(chunk) <= chunk_size for chunk in result_writer.iter_file_prefix(str(path), size, chunk_size))
@@ -0,0 +1,410 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+TRACE_ENABLED = os.environ.get('TRACE_ENABLED', '1') != '0'
+# Requests kept per company trace (the rest are only counted)
+TRACE_MAX_EVENTS = int(os.environ.get('TRACE_MAX_EVENTS', 300))
+# Finished traces are written in batches of this many, or after TRACE_FLUSH_INTERVAL seconds
+TRACE_FLUSH_EVERY = int(os.environ.get('TRACE_FLUSH_EVERY', 20))
+TRACE_FLUSH_INTERVAL = float(os.environ.get('TRACE_FLUSH_INTERVAL', 5))
+
+
+def _seconds(value):
+    return round(value, 4) if value is not None else None
+
+
+class RequestEvent:
+    """Timeline of one request made while a company trace is active.
+
+    Times are monotonic; to_dict reports them as offsets/durations in seconds. dns and
+    connect are only known for aiohttp requests (from its trace hooks).
+    """
+
+    __slots__ = ('url', 'method', 'stage', 'created', 'admitted', 'sent', 'dns', 'connect', '_dns_started',
+                 '_connect_started', 'headers_at', 'ttfb', 'body_done', 'status', 'bytes', 'outcome', 'error', 'closed')
+
+    def __init__(self, url, method, stage):
+        self.url = url
+        self.method = method
+        self.stage = stage
+        self.created = time.monotonic()
+        self.admitted = None
+        self.sent = None
+        self.dns = None
+        self.connect = None
+        self._dns_started = None
+        self._connect_started = None
+        self.headers_at = None
+        self.ttfb = None
+        self.body_done = None
+        self.status = None
+        self.bytes = 0
+        self.outcome = None
+        self.error = None
+        self.closed = None
+
+    def mark_admitted(self):
+        """The host scheduler let the request go (queueing and pacing are over)"""
+        self.admitted = time.monotonic()
+
+    def mark_response(self, status, elapsed=None):
+        """Response headers arrived; elapsed is the client's own send-to-headers time if it has one"""
+        self.headers_at = time.monotonic()
+        self.status = status
+        sent = self.sent or self.admitted
+        if elapsed is not None:
+            self.ttfb = elapsed
+        elif sent is not None:
+            self.ttfb = self.headers_at - sent - (self.dns or 0) - (self.connect or 0)
+
+    def mark_body(self, size):
+        self.body_done = time.monotonic()
+        self.bytes = size
+
+    def fail(self, error):
+        self.outcome = _outcome_of(error)
+        self.error = f"{type(error).__name__}: {str(error)}"[:200]
+
+    def close(self):
+        self.closed = time.monotonic()
+        if self.outcome is None:
+            self.outcome = 'ok' if self.status is not None and self.status < 400 else 'http_error'
+
+    def to_dict(self, origin):
+        download = self.body_done - self.headers_at if self.body_done and self.headers_at else None
+        return {
+            'url': self.url,
+            'method': self.method,
+            'stage': self.stage,
+            'start': _seconds(self.created - origin),
+            'queued': _seconds(self.admitted - self.created) if self.admitted else None,
+            'dns': _seconds(self.dns),
+            'connect': _seconds(self.connect),
+            'ttfb': _seconds(self.ttfb),
+            'download': _seconds(download),
+            'total': _seconds(self.closed - self.created) if self.closed else None,
+            'status': self.status,
+            'bytes': self.bytes,
+            'outcome': self.outcome,
+            'error': self.error
+        }
+
+
+class _NoEvent:
+    """Stand-in when no trace is active, so call sites don't have to check"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+_NO_EVENT = _NoEvent()
+
+
+def _outcome_of(error):
+    # Imported here: both import metrics, which imports this module
+    import host_health
+    import deadline
+    if isinstance(error, host_health.HostUnavailable):
+        return 'short_circuit'
+    if isinstance(error, deadline.BudgetExceeded):
+        return 'budget'
+    if isinstance(error, host_health.TIMEOUT_ERRORS):
+        return 'timeout'
+    if isinstance(error, asyncio.CancelledError):
+        return 'cancelled'
+    return 'error'
+
+
+class CompanyTrace:
+    """Requests and ladder stages of one company's search"""
+
+    def __init__(self, company):
+        self.company = company
+        self.started = time.monotonic()
+        self.started_at = time.time()
+        self.events = []
+        self.requests = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.stages = {}
+
+    def add(self, event):
+        self.requests += 1
+        self.bytes += event.bytes
+        if len(self.events) < TRACE_MAX_EVENTS:
+            self.events.append(event)
+        else:
+            self.dropped += 1
+
+    def add_stage(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0) + seconds
+
+    def to_record(self, result, strategy):
+        return {
+            'company': self.company,
+            'started_at': self.started_at,
+            'elapsed': round(time.monotonic() - self.started, 3),
+            'strategy': strategy,
+            'email': result.get('email'),
+            'source': result.get('source'),
+            'website': result.get('website'),
+            'requests': self.requests,
+            'bytes': self.bytes,
+            'stages': {name: round(seconds, 3) for name, seconds in self.stages.items()},
+            'events': [event.to_dict(self.started) for event in self.events],
+            'dropped_events': self.dropped
+        }
+
+
+_trace = ContextVar('trace', default=None)
+_stage = ContextVar('trace_stage', default=None)
+_request = ContextVar('trace_request', default=None)
+
+
+@contextmanager
+def scope(company):
+    """Trace the enclosed search of one company; yields the CompanyTrace (None when disabled).
+
+    Like the page cache and deadline scopes, the trace follows the context into asyncio tasks
+    and into threads started with contextvars.copy_context().run.
+    """
+    if not TRACE_ENABLED:
+        yield None
+        return
+    token = _trace.set(CompanyTrace(company))
+    try:
+        yield _trace.get()
+    finally:
+        _trace.reset(token)
+
+
+def current():
+    return _trace.get()
+
+
+@contextmanager
+def stage(name):
+    """Mark the ladder stage requests made inside belong to; its duration goes into the trace"""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    token = _stage.set(name)
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        _stage.reset(token)
+        trace.add_stage(name, time.monotonic() - started)
+
+
+@contextmanager
+def request(url, method='GET'):
+    """Record one request of the active trace; yields its RequestEvent (a no-op stand-in without a trace)"""
+    trace = _trace.get()
+    if trace is None:
+        yield _NO_EVENT
+        return
+    event = RequestEvent(url, method, _stage.get())
+    token = _request.set(event)
+    try:
+        yield event
+    except BaseException as e:
+        event.fail(e)
+        raise
+    finally:
+        _request.reset(token)
+        event.close()
+        trace.add(event)
+
+
+def mark_admitted():
+    """Called by the host scheduler once the current request may go"""
+    event = _request.get()
+    if event is not None:
+        event.mark_admitted()
+
+
+def _event_of(trace_config_ctx):
+    event = getattr(trace_config_ctx, 'trace_request_ctx', None)
+    return event if isinstance(event, RequestEvent) else None
+
+
+async def _on_request_start(session, trace_config_ctx, params):
+    event = _event_of(trace_config_ctx)
+    if event is not None and event.sent is None:
+        event.sent = time.monotonic()
+
+
+async def _on_dns_start(session, trace_config_ctx, params):
+    event = _event_of(trace_config_ctx)
+    if event is not None:
+        event._dns_started = time.monotonic()
+
+
+async def _on_dns_end(session, trace_config_ctx, params):
+    event = _event_of(trace_config_ctx)
+    if event is not None and event._dns_started is not None:
+        event.dns = (event.dns or 0) + time.monotonic() - event._dns_started
+
+
+async def _on_connection_start(session, trace_config_ctx, params):
+    event = _event_of(trace_config_ctx)
+    if event is not None:
+        event._connect_started = time.monotonic()
+
+
+async def _on_connection_end(session, trace_config_ctx, params):
+    event = _event_of(trace_config_ctx)
+    if event is not None and event._connect_started is not None:
+        # Connection setup includes the lookup; connect is the TCP/TLS part only
+        took = time.monotonic() - event._connect_started
+        event.connect = (event.connect or 0) + max(0.0, took - (event.dns or 0))
+
+
+def aiohttp_trace_config():
+    """aiohttp TraceConfig filling in DNS and connect times of requests sent with trace_request_ctx=event"""
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(_on_request_start)
+    config.on_dns_resolvehost_start.append(_on_dns_start)
+    config.on_dns_resolvehost_end.append(_on_dns_end)
+    config.on_connection_create_start.append(_on_connection_start)
+    config.on_connection_create_end.append(_on_connection_end)
+    return config
+
+
+class TraceStore:
+    """Finished company traces of one job in a SQLite file (one row per company, the latest run wins).
+
+    Several processes (shards) can write to the same file. Writes are batched and done by a
+    writer thread, so save() never blocks the event loop on SQLite; close() stops the thread
+    and writes what is left (blocking - call it from an executor in async code).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._wake = threading.Event()
+        self._writer = None
+        self._closed = False
+
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS company_traces (
+                    company TEXT PRIMARY KEY,
+                    started_at REAL,
+                    elapsed REAL,
+                    strategy TEXT,
+                    email TEXT,
+                    source TEXT,
+                    website TEXT,
+                    requests INTEGER,
+                    bytes INTEGER,
+                    detail TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_company_traces_elapsed ON company_traces (elapsed)')
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def save(self, trace, result, strategy):
+        """Queue a finished trace for writing"""
+        record = trace.to_record(result, strategy)
+        with self._lock:
+            self._pending.append(record)
+            due = len(self._pending) >= TRACE_FLUSH_EVERY or time.monotonic() - self._last_flush > TRACE_FLUSH_INTERVAL
+            if due and self._writer is None and not self._closed:
+                self._writer = threading.Thread(target=self._write_loop, name='trace-writer', daemon=True)
+                self._writer.start()
+        if due:
+            self._wake.set()
+
+    def _write_loop(self):
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            conn = self._connect()
+            try:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO company_traces '
+                    '(company, started_at, elapsed, strategy, email, source, website, requests, bytes, detail) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(
+                        record['company'], record['started_at'], record['elapsed'], record['strategy'],
+                        record['email'], record['source'], record['website'], record['requests'], record['bytes'],
+                        json.dumps({key: record[key] for key in ('stages', 'events', 'dropped_events')},
+                                   separators=(',', ':'))
+                    ) for record in pending]
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"Trace write failed: {str(e)}")
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        if self._writer is not None:
+            self._writer.join()
+        self.flush()
+
+    def _rows(self, query, params):
+        if not os.path.exists(self.path):
+            return []
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            return conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+    def get(self, company):
+        """Full trace of one company, or None"""
+        rows = self._rows('SELECT * FROM company_traces WHERE company = ?', (company,))
+        if not rows:
+            return None
+        record = dict(rows[0])
+        record.update(json.loads(record.pop('detail') or '{}'))
+        return record
+
+    def slowest(self, limit=20):
+        """The slowest companies with their per-stage times and slowest requests (no full request list)"""
+        report = []
+        for row in self._rows('SELECT * FROM company_traces ORDER BY elapsed DESC LIMIT ?', (limit,)):
+            record = dict(row)
+            detail = json.loads(record.pop('detail') or '{}')
+            record['stages'] = detail.get('stages', {})
+            record['slowest_requests'] = sorted(
+                detail.get('events', []), key=lambda event: event['total'] or 0, reverse=True
+            )[:3]
+            report.append(record)
+        return report
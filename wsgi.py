@@ -0,0 +1,190 @@
+"""Fast-starting WSGI entry point for the scraper apps.
+
+    python wsgi.py                                   # serves SCRAPER_APP on $PORT
+    python wsgi.py --app email_scraper_final         # another app module
+    python wsgi.py --profile-imports                 # log what each heavy import costs
+    gunicorn wsgi:app
+
+create_app() imports Flask only, so the server is listening and /health answers within a few
+hundred milliseconds. The app module itself (pandas, openpyxl, requests, aiohttp, ...) is
+imported by a background thread once the socket is bound, or by the first request that needs
+it, whichever comes first. /startup reports how long that took; python -X importtime breaks
+it down further.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import importlib
+import threading
+import multiprocessing
+from flask import Flask, jsonify
+
+# When this module was first imported (the startup times below count from here)
+STARTED = time.monotonic()
+
+logger = logging.getLogger(__name__)
+
+# Module whose Flask `app` serves the site
+SCRAPER_APP = os.environ.get('SCRAPER_APP', 'email_scraper_accurate')
+# Import the app in the background as soon as the server is up (0 = on the first request instead)
+WARM_START = os.environ.get('WARM_START', '1') != '0'
+# Time the heavy third-party imports one by one and log them
+PROFILE_IMPORTS = os.environ.get('PROFILE_IMPORTS', '0') != '0'
+# Imported ahead of the app when profiling, so each gets its own line (cost of a module = its
+# own import plus whatever it pulls in that isn't loaded yet)
+PROFILED_MODULES = ('requests', 'bs4', 'aiohttp', 'pandas', 'openpyxl')
+
+# Paths the entry point answers itself (/health only until the app is loaded)
+STARTUP_PATH = '/startup'
+HEALTH_PATH = '/health'
+
+
+def _elapsed(since=STARTED):
+    return round(time.monotonic() - since, 3)
+
+
+class LazyApp:
+    """The app module's Flask app, imported on first use (once, whichever thread gets there first)"""
+
+    def __init__(self, module_name, profile=False):
+        self.module_name = module_name
+        self.profile = profile
+        self.import_seconds = {}
+        self.ready_after = None
+        self.error = None
+        self._app = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._app is not None
+
+    def load(self):
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    self._app = self._import()
+        return self._app
+
+    def _timed_import(self, name):
+        started = time.monotonic()
+        module = importlib.import_module(name)
+        self.import_seconds[name] = _elapsed(started)
+        return module
+
+    def _import(self):
+        if self.profile:
+            for name in PROFILED_MODULES:
+                if name in sys.modules:
+                    continue
+                try:
+                    self._timed_import(name)
+                except ImportError as e:
+                    logger.warning(f"Import profile: {name} not importable: {str(e)}")
+        try:
+            app = self._timed_import(self.module_name).app
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {str(e)}"
+            raise
+        self.error = None
+        self.ready_after = _elapsed()
+        logger.info(f"{self.module_name} loaded {self.ready_after * 1000:.0f} ms after start")
+        if self.profile:
+            for name, seconds in sorted(self.import_seconds.items(), key=lambda item: item[1], reverse=True):
+                logger.info(f"Import profile: {name} {seconds * 1000:.0f} ms")
+        return app
+
+    def warm(self):
+        """Import the app on a daemon thread"""
+        def run():
+            try:
+                self.load()
+            except Exception:
+                logger.exception(f"Loading {self.module_name} failed (retried on the next request)")
+        threading.Thread(target=run, name='app-warmup', daemon=True).start()
+
+
+class StartupDispatcher:
+    """WSGI app in front of a LazyApp: /health and /startup answer without it, everything
+    else waits for it to load"""
+
+    def __init__(self, shell, lazy):
+        self.shell = shell
+        self.lazy = lazy
+
+    def warm(self):
+        # Shard worker processes (spawn) import this module again; they never serve requests
+        if multiprocessing.current_process().name == 'MainProcess':
+            self.lazy.warm()
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path == STARTUP_PATH or (path == HEALTH_PATH and not self.lazy.ready):
+            return self.shell(environ, start_response)
+        return self.lazy.load()(environ, start_response)
+
+
+def create_app(module_name=None, warm=None, profile=None):
+    """WSGI app serving module_name's app (SCRAPER_APP by default); only Flask is imported here.
+
+    warm (WARM_START by default) starts importing the app in the background right away; pass
+    False and call .warm() once the server is bound instead.
+    """
+    lazy = LazyApp(module_name or SCRAPER_APP, PROFILE_IMPORTS if profile is None else profile)
+    shell = Flask(__name__)
+
+    @shell.route(HEALTH_PATH)
+    def health():
+        """Up while the app is still loading (the app's own /health takes over once it's in)"""
+        return jsonify({
+            'status': 'healthy',
+            'ready': lazy.ready,
+            'app': lazy.module_name,
+            'uptime': _elapsed(),
+            'error': lazy.error
+        }), 200
+
+    @shell.route(STARTUP_PATH)
+    def startup():
+        return jsonify({
+            'app': lazy.module_name,
+            'ready': lazy.ready,
+            'ready_after': lazy.ready_after,
+            'error': lazy.error,
+            'import_seconds': lazy.import_seconds
+        })
+
+    dispatcher = StartupDispatcher(shell, lazy)
+    if WARM_START if warm is None else warm:
+        dispatcher.warm()
+    return dispatcher
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a scraper app behind the fast-starting entry point')
+    parser.add_argument('--app', default=SCRAPER_APP, help=f'app module (default {SCRAPER_APP})')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--profile-imports', action='store_true', default=PROFILE_IMPORTS,
+                        help='time the heavy imports one by one and log them')
+    parser.add_argument('--no-warm', action='store_true', default=not WARM_START,
+                        help='import the app on the first request instead of right after binding')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from werkzeug.serving import make_server
+    dispatcher = create_app(args.app, warm=False, profile=args.profile_imports)
+    # The socket is bound here; the platform health check can pass from now on
+    server = make_server(args.host, args.port, dispatcher, threaded=True)
+    logger.info(f"Listening on {args.host}:{args.port} {_elapsed() * 1000:.0f} ms after start")
+    if not args.no_warm:
+        dispatcher.warm()
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
+else:
+    app = create_app()